@@ -0,0 +1,215 @@
+# app/core/admission.py
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+from jose import jwt, JWTError
+from app.core.config import settings
+from app.models.user import UserLevel
+
+
+@dataclass
+class LevelLimits:
+    """单个用户等级的准入配额"""
+    concurrency: int        # 最大并发请求数
+    rate: float             # 令牌桶每秒补充速率
+    burst: float            # 令牌桶容量
+    queue_timeout: float    # 排队最长等待秒数
+    max_queue: int          # 最大排队数
+
+
+# 除按用户等级分流外，另有两个独立的请求类别：
+# - auth：登录/注册/刷新令牌等匿名接口，不与免费用户共用令牌桶；
+# - bulk：流式批量写入和账单导入，单个请求可持续数分钟，单独限制并发，
+#   其耗时也不计入普通请求的耗时均值
+AUTH_CLASS = "auth"
+BULK_CLASS = "bulk"
+
+AUTH_PATHS = (
+    "/users/login", "/users/register", "/users/token/refresh", "/users/token/revoke", "/users/reset-password",
+)
+BULK_PATHS = ("/records:bulk", "/records:import")
+
+DEFAULT_LIMITS = {
+    UserLevel.FREE.value: LevelLimits(concurrency=16, rate=20, burst=40, queue_timeout=0.5, max_queue=64),
+    UserLevel.MEMBER.value: LevelLimits(concurrency=32, rate=50, burst=100, queue_timeout=1.0, max_queue=128),
+    UserLevel.PREMIUM.value: LevelLimits(concurrency=64, rate=100, burst=200, queue_timeout=2.0, max_queue=256),
+    AUTH_CLASS: LevelLimits(concurrency=32, rate=50, burst=100, queue_timeout=1.0, max_queue=128),
+    # 长连接不排队：并发已满时立即 503，由客户端稍后重试
+    BULK_CLASS: LevelLimits(concurrency=4, rate=1, burst=8, queue_timeout=0, max_queue=0),
+}
+
+
+class TokenBucket:
+    """令牌桶（单事件循环内使用，无需加锁）"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+
+    def try_acquire(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def retry_after(self) -> float:
+        return max((1 - self.tokens) / self.rate, 0) if self.rate > 0 else 1.0
+
+
+class LevelState:
+    """单个用户等级的运行状态与统计"""
+
+    def __init__(self, limits: LevelLimits):
+        self.limits = limits
+        self.bucket = TokenBucket(limits.rate, limits.burst)
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rate_limited = 0
+        self.shed_early = 0
+        self.shed_timeout = 0
+        # 请求耗时的指数滑动平均，用于预估排队等待时间
+        self.avg_service_time = 0.05
+
+    def get_semaphore(self) -> asyncio.Semaphore:
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.limits.concurrency)
+        return self.semaphore
+
+    def estimated_wait(self) -> float:
+        return (self.queued + 1) / self.limits.concurrency * self.avg_service_time
+
+    def observe(self, duration: float):
+        self.avg_service_time = self.avg_service_time * 0.9 + duration * 0.1
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.limits.concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queued,
+            "admitted": self.admitted,
+            "rate_limited": self.rate_limited,
+            "shed_early": self.shed_early,
+            "shed_timeout": self.shed_timeout,
+            "avg_service_ms": round(self.avg_service_time * 1000, 2),
+        }
+
+
+def _load_limits() -> Dict[str, LevelLimits]:
+    """默认配额，可通过 ADMISSION_LIMITS（JSON，按等级或类别名覆盖部分字段）调整"""
+    limits = {name: LevelLimits(**vars(value)) for name, value in DEFAULT_LIMITS.items()}
+    overrides = json.loads(settings.ADMISSION_LIMITS) if settings.ADMISSION_LIMITS else {}
+    for name, fields in overrides.items():
+        if name not in limits:
+            raise ValueError(f"未知的准入类别: {name}")
+        limits[name] = LevelLimits(**{**vars(limits[name]), **fields})
+    return limits
+
+
+admission_levels = {name: LevelState(limits) for name, limits in _load_limits().items()}
+
+
+class AdmissionControlMiddleware:
+    """按用户等级做准入控制的 ASGI 中间件
+
+    每个等级独立的并发上限和令牌桶；令牌不足返回 429，
+    预计排队时间超过期限或排队超时返回 503，避免免费用户的突发流量拖慢付费用户。
+    匿名认证接口和流式批量接口各自使用独立的类别（见 AUTH_PATHS / BULK_PATHS）。
+    """
+
+    def __init__(self, app, exempt_paths=("/", "/metrics"), auth_paths=AUTH_PATHS, bulk_paths=BULK_PATHS):
+        self.app = app
+        self.exempt_paths = set(exempt_paths)
+        self.auth_paths = set(auth_paths)
+        self.bulk_paths = set(bulk_paths)
+        self.levels = admission_levels
+
+    def _resolve_class(self, scope) -> str:
+        path = scope["path"]
+        if path in self.bulk_paths:
+            return BULK_CLASS
+        if path in self.auth_paths:
+            return AUTH_CLASS
+        return self._resolve_level(scope).value
+
+    def _resolve_level(self, scope) -> UserLevel:
+        """从访问令牌的 lvl 声明中取用户等级，匿名或无效令牌按免费用户处理"""
+        for name, value in scope.get("headers", ()):
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() != "bearer" or not token:
+                    break
+                try:
+                    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+                    return UserLevel(payload.get("lvl", UserLevel.FREE.value))
+                except (JWTError, ValueError):
+                    break
+        return UserLevel.FREE
+
+    async def _reject(self, send, status_code: int, detail: str, retry_after: float):
+        body = json.dumps({"detail": detail}, ensure_ascii=False).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(int(retry_after + 0.999), 1)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.ADMISSION_ENABLED or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        state = self.levels[self._resolve_class(scope)]
+        limits = state.limits
+
+        if not state.bucket.try_acquire():
+            state.rate_limited += 1
+            await self._reject(send, 429, "请求过于频繁，请稍后重试", state.bucket.retry_after())
+            return
+
+        semaphore = state.get_semaphore()
+        if semaphore.locked():
+            # 预计等不到就立即拒绝，不占用排队位置
+            if state.queued >= limits.max_queue or state.estimated_wait() > limits.queue_timeout:
+                state.shed_early += 1
+                await self._reject(send, 503, "服务繁忙，请稍后重试", state.estimated_wait())
+                return
+            state.queued += 1
+            try:
+                await asyncio.wait_for(semaphore.acquire(), limits.queue_timeout)
+            except asyncio.TimeoutError:
+                state.shed_timeout += 1
+                await self._reject(send, 503, "服务繁忙，请稍后重试", limits.queue_timeout)
+                return
+            finally:
+                state.queued -= 1
+        else:
+            await semaphore.acquire()
+
+        state.admitted += 1
+        state.in_flight += 1
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            state.in_flight -= 1
+            state.observe(time.monotonic() - started)
+            semaphore.release()
+
+
+def get_admission_stats() -> dict:
+    """各等级/类别的排队深度、在途请求数与拒绝计数"""
+    return {name: state.stats() for name, state in admission_levels.items()}
@@ -0,0 +1,77 @@
+# app/core/bloom.py
+import hashlib
+import math
+import threading
+from typing import Optional
+from app.core.config import settings
+from app.models.user import User
+
+
+class BloomFilter:
+    """布隆过滤器：判定"一定不存在"时可跳过数据库查询，存在误判但不会漏判"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(capacity, 1)
+        self.num_bits = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.num_hashes = max(int(round(self.num_bits / capacity * math.log(2))), 1)
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str):
+        with self._lock:
+            for pos in self._positions(key):
+                self._bits[pos >> 3] |= 1 << (pos & 7)
+            self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class IdentifierFilter:
+    """已注册邮箱/手机号过滤器，启动时重建，注册成功后追加"""
+
+    def __init__(self):
+        self._filter: Optional[BloomFilter] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._filter is not None
+
+    def might_be_taken(self, email: Optional[str] = None, phone: Optional[str] = None) -> bool:
+        # 尚未完成重建时不能断言"一定不存在"
+        if self._filter is None:
+            return True
+        return (bool(email) and f"email:{email}" in self._filter) or \
+            (bool(phone) and f"phone:{phone}" in self._filter)
+
+    def add(self, email: Optional[str] = None, phone: Optional[str] = None):
+        if self._filter is None:
+            return
+        if email:
+            self._filter.add(f"email:{email}")
+        if phone:
+            self._filter.add(f"phone:{phone}")
+
+    def rebuild(self, db):
+        """从 users 表重建过滤器（包含已软删除用户，唯一索引同样约束它们）"""
+        new_filter = BloomFilter(settings.IDENTIFIER_FILTER_CAPACITY, settings.IDENTIFIER_FILTER_ERROR_RATE)
+        rows = db.query(User.email, User.phone).execution_options(include_deleted=True).yield_per(10000)
+        for email, phone in rows:
+            if email:
+                new_filter.add(f"email:{email}")
+            if phone:
+                new_filter.add(f"phone:{phone}")
+        self._filter = new_filter
+        return new_filter.count
+
+
+identifier_filter = IdentifierFilter()
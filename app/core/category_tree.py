@@ -0,0 +1,247 @@
+# app/core/category_tree.py
+import logging
+from typing import Dict, List, Optional
+from fastapi import HTTPException
+from sqlalchemy import event, inspect, select, delete, insert, update, literal, func
+from sqlalchemy.orm import Session
+from app.core.counters import CounterDeltas
+from app.core.money import to_cents
+from app.models.category import Category
+from app.models.category_closure import CategoryClosure
+from app.models.record import Record
+from app.models.record_archive import RecordArchiveSegment, RecordArchiveRollup
+from app.core.segment_codec import decode_segment, encode_segment
+
+logger = logging.getLogger(__name__)
+
+MAX_CATEGORY_LEVEL = 3
+closure = CategoryClosure.__table__
+
+
+# ---------------------------------------------------------------------------
+# 闭包表维护：新增分类、修改 parent_id、物理删除时在同一事务内更新
+# ---------------------------------------------------------------------------
+
+def _insert_node(connection, category_id: int, parent_id: Optional[int]):
+    connection.execute(insert(closure).values(ancestor_id=category_id, descendant_id=category_id, depth=0))
+    if parent_id is not None:
+        connection.execute(insert(closure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(closure.c.ancestor_id, literal(category_id), closure.c.depth + 1)
+            .where(closure.c.descendant_id == parent_id)
+        ))
+
+
+def _move_subtree(connection, category_id: int, new_parent_id: Optional[int]):
+    """把以 category_id 为根的子树挂到新父分类下"""
+    subtree = dict(connection.execute(
+        select(closure.c.descendant_id, closure.c.depth).where(closure.c.ancestor_id == category_id)
+    ).all())
+    if new_parent_id in subtree:
+        raise ValueError("分类不能移动到自身或其子分类下")
+    ids = list(subtree)
+    # 子查询引用目标表在 MySQL 中不允许，先取出子树 ID
+    connection.execute(delete(closure).where(
+        closure.c.descendant_id.in_(ids), closure.c.ancestor_id.notin_(ids)
+    ))
+    if new_parent_id is None:
+        return
+    ancestors = connection.execute(
+        select(closure.c.ancestor_id, closure.c.depth).where(closure.c.descendant_id == new_parent_id)
+    ).all()
+    connection.execute(insert(closure), [
+        {"ancestor_id": ancestor, "descendant_id": node, "depth": up + down + 1}
+        for ancestor, up in ancestors
+        for node, down in subtree.items()
+    ])
+
+
+@event.listens_for(Session, "before_flush")
+def _remove_deleted_closure_rows(session: Session, flush_context, instances):
+    """物理删除分类前先删除闭包行：闭包表外键引用 categories，分类行删除后再删会违反外键约束"""
+    removed = [obj.id for obj in session.deleted if isinstance(obj, Category) and obj.id is not None]
+    if removed:
+        session.connection().execute(delete(closure).where(
+            closure.c.descendant_id.in_(removed) | closure.c.ancestor_id.in_(removed)
+        ))
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_category_closure(session: Session, flush_context):
+    new = [obj for obj in session.new if isinstance(obj, Category)]
+    moved = [obj for obj in session.dirty if isinstance(obj, Category)
+             and inspect(obj).attrs.parent_id.history.has_changes()]
+    if not (new or moved):
+        return
+
+    connection = session.connection()
+    # 同一次刷新中父子分类可能同时新增，先插入父分类
+    pending = {obj.id: obj for obj in new}
+    done = set()
+    while pending:
+        ready = [obj for obj in pending.values() if obj.parent_id not in pending or obj.parent_id in done]
+        if not ready:
+            raise ValueError("分类父子关系存在循环")
+        for obj in ready:
+            _insert_node(connection, obj.id, obj.parent_id)
+            done.add(obj.id)
+            del pending[obj.id]
+    for obj in moved:
+        _move_subtree(connection, obj.id, obj.parent_id)
+
+
+def rebuild_category_closure(db: Session) -> int:
+    """按 parent_id 全量重建闭包表（首次建表回填或修复时使用）"""
+    # 已软删除的分类仍可能被归档记录引用，闭包行一并保留
+    parents = dict(db.execute(select(Category.id, Category.parent_id),
+                              execution_options={"include_deleted": True}).all())
+    rows = []
+    for category_id in parents:
+        node, depth, seen = category_id, 0, set()
+        while node is not None and node not in seen:
+            seen.add(node)
+            rows.append({"ancestor_id": node, "descendant_id": category_id, "depth": depth})
+            node, depth = parents.get(node), depth + 1
+    db.execute(delete(closure))
+    for i in range(0, len(rows), 1000):
+        db.execute(insert(closure), rows[i:i + 1000])
+    db.commit()
+    return len(rows)
+
+
+# ---------------------------------------------------------------------------
+# 查询
+# ---------------------------------------------------------------------------
+
+def subtree_ids(db: Session, category_id: int) -> List[int]:
+    return list(db.scalars(select(closure.c.descendant_id).where(closure.c.ancestor_id == category_id)))
+
+
+def ancestor_map(db: Session, category_ids) -> Dict[int, List[int]]:
+    """后代分类 -> 全部祖先（含自身）"""
+    result: Dict[int, List[int]] = {}
+    ids = [c for c in set(category_ids) if c is not None]
+    if not ids:
+        return result
+    for ancestor, descendant in db.execute(
+        select(closure.c.ancestor_id, closure.c.descendant_id).where(closure.c.descendant_id.in_(ids))
+    ):
+        result.setdefault(descendant, []).append(ancestor)
+    return result
+
+
+def _refresh_paths(db: Session, ids: List[int]):
+    """按闭包表重新计算子树内分类的 level 与 full_path（如 餐饮/早餐/包子）"""
+    rows = db.execute(
+        select(closure.c.descendant_id, Category.name, closure.c.depth)
+        .join(Category, Category.id == closure.c.ancestor_id)
+        .where(closure.c.descendant_id.in_(ids))
+    ).all()
+    paths: Dict[int, list] = {}
+    for descendant, name, depth in rows:
+        paths.setdefault(descendant, []).append((depth, name))
+    for category_id, chain in paths.items():
+        chain.sort(reverse=True)
+        db.execute(update(Category).where(Category.id == category_id).values(
+            level=len(chain), full_path="/".join(name for _, name in chain)
+        ), execution_options={"synchronize_session": "fetch"})
+
+
+# ---------------------------------------------------------------------------
+# 移动与合并
+# ---------------------------------------------------------------------------
+
+def _subtree_height(db: Session, category_id: int) -> int:
+    return db.scalar(select(func.max(closure.c.depth)).where(closure.c.ancestor_id == category_id)) or 0
+
+
+def move_category(db: Session, category_id: int, new_parent_id: Optional[int], commit: bool = True) -> Category:
+    """移动分类（含子树）到新父分类下，同步更新闭包表、层级和完整路径"""
+    category = db.get(Category, category_id)
+    if category is None or category.is_deleted:
+        raise HTTPException(status_code=404, detail="分类不存在")
+    if category.is_system:
+        raise HTTPException(status_code=400, detail="系统预设分类不能移动")
+    new_level = 1
+    if new_parent_id is not None:
+        parent = db.get(Category, new_parent_id)
+        if parent is None or parent.is_deleted:
+            raise HTTPException(status_code=404, detail="目标父分类不存在")
+        if parent.account_id != category.account_id:
+            raise HTTPException(status_code=400, detail="只能移动到同一账本的分类下")
+        if new_parent_id in subtree_ids(db, category_id):
+            raise HTTPException(status_code=400, detail="分类不能移动到自身或其子分类下")
+        new_level = (parent.level or 1) + 1
+    if new_level + _subtree_height(db, category_id) > MAX_CATEGORY_LEVEL:
+        raise HTTPException(status_code=400, detail=f"分类层级不能超过{MAX_CATEGORY_LEVEL}级")
+
+    category.parent_id = new_parent_id
+    db.flush()
+    _refresh_paths(db, subtree_ids(db, category_id))
+    if commit:
+        db.commit()
+    return category
+
+
+def _rewrite_archived_category(db: Session, source_id: int, target_id: int):
+    """归档段内的 category_id 一并改写（合并很少发生，直接重写受影响的段）"""
+    segment_ids = db.scalars(
+        select(RecordArchiveRollup.segment_id).where(RecordArchiveRollup.category_id == source_id).distinct()
+    ).all()
+    for segment in db.scalars(select(RecordArchiveSegment).where(RecordArchiveSegment.id.in_(segment_ids))):
+        rows = decode_segment(segment.payload)
+        for row in rows:
+            if row["category_id"] == source_id:
+                row["category_id"] = target_id
+        segment.payload, segment.checksum = encode_segment(rows)
+    db.execute(update(RecordArchiveRollup).where(RecordArchiveRollup.category_id == source_id)
+               .values(category_id=target_id), execution_options={"synchronize_session": False})
+
+
+def _record_types(db: Session, category_id: int) -> set:
+    """分类下已有记录（含归档）的记录类型；分类表没有类型字段，以实际记账类型为准"""
+    hot = select(Record.record_type).where(Record.category_id == category_id, Record.is_deleted == False)
+    archived = select(RecordArchiveRollup.record_type).where(RecordArchiveRollup.category_id == category_id)
+    return set(db.scalars(hot.distinct())) | set(db.scalars(archived.distinct()))
+
+
+def merge_categories(db: Session, source_id: int, target_id: int) -> int:
+    """把 source 分类合并到 target：记录改挂 target，子分类移到 target 下，source 软删除
+
+    两个分类须属于同一账本且记录类型一致（两边都有记录时），系统预设分类不能作为 source。
+    返回改挂的记录数。计数字段直接按 source 的计数转移，不逐条触发刷新事件。
+    """
+    if source_id == target_id:
+        raise HTTPException(status_code=400, detail="不能合并到自身")
+    source, target = db.get(Category, source_id), db.get(Category, target_id)
+    if source is None or target is None or source.is_deleted or target.is_deleted:
+        raise HTTPException(status_code=404, detail="分类不存在")
+    if source.is_system:
+        raise HTTPException(status_code=400, detail="系统预设分类不能被合并")
+    if source.account_id != target.account_id:
+        raise HTTPException(status_code=400, detail="只能合并同一账本的分类")
+    source_types, target_types = _record_types(db, source_id), _record_types(db, target_id)
+    if source_types and target_types and source_types != target_types:
+        raise HTTPException(status_code=400, detail="分类的记录类型不一致，不能合并")
+    if target_id in subtree_ids(db, source_id):
+        raise HTTPException(status_code=400, detail="不能合并到自身的子分类")
+
+    for child in db.scalars(select(Category).where(Category.parent_id == source_id, Category.is_deleted == False)).all():
+        move_category(db, child.id, target_id, commit=False)
+
+    moved = db.execute(update(Record).where(Record.category_id == source_id).values(category_id=target_id),
+                       execution_options={"synchronize_session": False}).rowcount
+    _rewrite_archived_category(db, source_id, target_id)
+
+    deltas = CounterDeltas()
+    cents = to_cents(source.total_amount)
+    deltas.categories[target_id].update(record_count=source.record_count or 0, total_amount=cents)
+    deltas.categories[source_id].update(record_count=-(source.record_count or 0), total_amount=-cents)
+    deltas.apply(db.connection())
+
+    # 软删除的 source 已没有记录和子分类，闭包行保留不影响汇总
+    source.is_deleted = True
+    db.commit()
+    db.expire(target)
+    logger.info("分类 %s 合并到 %s，改挂记录 %d 条", source_id, target_id, moved)
+    return moved
@@ -10,11 +10,77 @@ class Settings(BaseSettings):
     
     # 数据库配置
     DATABASE_URL: str = os.getenv("DATABASE_URL") 
+    # 异步连接地址，留空时由 DATABASE_URL 推导（mysql+pymysql -> mysql+aiomysql, sqlite -> sqlite+aiosqlite）
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")
+    ASYNC_DB_POOL_SIZE: int = int(os.getenv("ASYNC_DB_POOL_SIZE", "20"))
+    ASYNC_DB_MAX_OVERFLOW: int = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", "40"))
+    # 只读副本，逗号分隔；写入后 READ_YOUR_WRITES_SECONDS 秒内该用户的读请求走主库
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    READ_YOUR_WRITES_SECONDS: float = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+    REPLICA_RETRY_SECONDS: float = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+
+    # SQL 监控配置（SQL_ECHO 会同步打印每条语句，仅用于本地调试）
+    SQL_ECHO: bool = os.getenv("SQL_ECHO", "False").lower() == "true"
+    SQL_SLOW_QUERY_MS: float = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))
+    SQL_SLOW_QUERY_SAMPLE_RATE: float = float(os.getenv("SQL_SLOW_QUERY_SAMPLE_RATE", "1.0"))
+    SQL_N_PLUS_ONE_THRESHOLD: int = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
     DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
     SECRET_KEY: str = os.getenv("SECRET_KEY", "changeme")
     # JWT配置
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+
+    # 密码哈希进程池配置
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 2))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))  # 排队上限，超过返回503
+
+    # 登录用户缓存配置
+    USER_CACHE_SIZE: int = int(os.getenv("USER_CACHE_SIZE", "10000"))
+    USER_CACHE_TTL_SECONDS: int = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+
+    # 已注册邮箱/手机号布隆过滤器配置
+    IDENTIFIER_FILTER_CAPACITY: int = int(os.getenv("IDENTIFIER_FILTER_CAPACITY", "1000000"))
+    IDENTIFIER_FILTER_ERROR_RATE: float = 0.01
+
+    # 准入控制配置（默认关闭），ADMISSION_LIMITS 为 JSON，按等级（free/member/premium）
+    # 或类别（auth/bulk）覆盖，例如 {"free": {"concurrency": 8, "rate": 10}}
+    ADMISSION_ENABLED: bool = os.getenv("ADMISSION_ENABLED", "False").lower() == "true"
+    ADMISSION_LIMITS: str = os.getenv("ADMISSION_LIMITS", "")
+
+    # 账本/分类/用户计数对账间隔（秒），0 表示不启动后台对账
+    COUNTER_RECONCILE_INTERVAL_SECONDS: int = int(os.getenv("COUNTER_RECONCILE_INTERVAL_SECONDS", "3600"))
+
+    # 分页总数：候选记录不超过 COUNT_EXACT_THRESHOLD 条时精确计数，否则抽样 COUNT_SAMPLE_SIZE 条估算
+    COUNT_EXACT_THRESHOLD: int = int(os.getenv("COUNT_EXACT_THRESHOLD", "5000"))
+    COUNT_SAMPLE_SIZE: int = int(os.getenv("COUNT_SAMPLE_SIZE", "1000"))
+
+    # 流式批量写入记录：每 RECORD_BULK_CHUNK_SIZE 条提交一次，单行/单帧上限 RECORD_BULK_MAX_ITEM_BYTES
+    RECORD_BULK_CHUNK_SIZE: int = int(os.getenv("RECORD_BULK_CHUNK_SIZE", "1000"))
+    RECORD_BULK_MAX_ITEM_BYTES: int = int(os.getenv("RECORD_BULK_MAX_ITEM_BYTES", str(1024 * 1024)))
+
+    # 账单导入：每 IMPORT_CHUNK_SIZE 行查重并提交一次；上传文件超过 1MB 时暂存到磁盘
+    IMPORT_CHUNK_SIZE: int = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+    IMPORT_MAX_BYTES: int = int(os.getenv("IMPORT_MAX_BYTES", str(50 * 1024 * 1024)))
+
+    # 索引建议：开启后采集查询形状，通过 /metrics/index-advisor 查看 EXPLAIN 结果和建议索引
+    INDEX_ADVISOR_ENABLED: bool = os.getenv("INDEX_ADVISOR_ENABLED", "False").lower() == "true"
+    INDEX_ADVISOR_MAX_SHAPES: int = int(os.getenv("INDEX_ADVISOR_MAX_SHAPES", "500"))
+
+    # 冷数据归档：保留最近 ARCHIVE_HOT_MONTHS 个月在热表，更早的整年压缩为归档段
+    ARCHIVE_HOT_MONTHS: int = int(os.getenv("ARCHIVE_HOT_MONTHS", "24"))
+    ARCHIVE_INTERVAL_SECONDS: int = int(os.getenv("ARCHIVE_INTERVAL_SECONDS", "86400"))  # 0 表示不启动后台归档
+    ARCHIVE_SEGMENT_CACHE_SIZE: int = int(os.getenv("ARCHIVE_SEGMENT_CACHE_SIZE", "32"))  # 解压后缓存的归档段数
+
+    # 未声明加载配置的 ORM 查询禁止懒加载关系（测试/CI 环境开启，N+1 直接报错）
+    ORM_RAISE_ON_LAZY_LOAD: bool = os.getenv("ORM_RAISE_ON_LAZY_LOAD", "False").lower() == "true"
+
+    # 软删除记录保留天数，超过且已同步到所有设备后由后台任务物理删除
+    SOFT_DELETE_RETENTION_DAYS: int = int(os.getenv("SOFT_DELETE_RETENTION_DAYS", "30"))
+    SOFT_DELETE_PURGE_INTERVAL_SECONDS: int = int(os.getenv("SOFT_DELETE_PURGE_INTERVAL_SECONDS", "86400"))  # 0 表示不启动
+
+    # uuid 列存储为 BINARY(16)（默认 CHAR(36)）；已有库切换前先执行 app/core/uuid_storage.py 中的迁移
+    UUID_BINARY_STORAGE: bool = os.getenv("UUID_BINARY_STORAGE", "False").lower() == "true"
     
     # Redis配置
     REDIS_URL: str = "redis://localhost:6379"
@@ -0,0 +1,401 @@
+# app/core/counters.py
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import event, inspect, select, update, bindparam, func, case, and_, or_, extract
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.core.money import to_cents, from_cents, cents_column
+from app.models.account import Account
+from app.models.category import Category
+from app.models.record import Record, RecordType
+from app.models.record_archive import RecordArchiveRollup
+from app.models.record_count import RecordMonthCount
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# 各表维护的计数字段
+ACCOUNT_COUNTERS = ("total_income", "total_expense", "balance", "total_records")
+CATEGORY_COUNTERS = ("record_count", "total_amount")
+USER_COUNTERS = ("total_records",)
+
+# 金额类计数字段：增量按整数分累加，写库时转回 Decimal
+AMOUNT_COUNTERS = frozenset(("total_income", "total_expense", "balance", "total_amount"))
+
+# 影响计数的记录字段
+RECORD_COUNTER_FIELDS = ("account_id", "category_id", "creator_id", "record_type", "amount", "record_date", "is_deleted")
+
+
+class CounterDeltas:
+    """计数增量累加器：按 (表, 主键) 合并增量，每张表一次批量 UPDATE
+
+    ORM 刷新事件自动使用；绕过 ORM 的批量写入可直接调用 add_record / apply。
+    金额字段（AMOUNT_COUNTERS）的增量以整数分表示。
+    """
+
+    def __init__(self):
+        self.accounts = defaultdict(lambda: dict.fromkeys(ACCOUNT_COUNTERS, 0))
+        self.categories = defaultdict(lambda: dict.fromkeys(CATEGORY_COUNTERS, 0))
+        self.users = defaultdict(lambda: dict.fromkeys(USER_COUNTERS, 0))
+        # (账本, 月份, 类型) -> 记录数增量
+        self.months = defaultdict(int)
+
+    def __bool__(self):
+        return bool(self.accounts or self.categories or self.users or self.months)
+
+    def add_record(self, values: dict, sign: int = 1):
+        """累加一条记录的贡献，sign=1 计入，sign=-1 扣除；已软删除的记录不计数"""
+        if values.get("is_deleted") or values.get("account_id") is None:
+            return
+        record_type = values.get("record_type")
+        if isinstance(record_type, str):
+            record_type = RecordType(record_type)
+        amount = to_cents(values.get("amount")) * sign
+
+        account = self.accounts[values["account_id"]]
+        account["total_records"] += sign
+        record_date = values.get("record_date")
+        if record_date is not None and record_type is not None:
+            month = f"{record_date.year:04d}-{record_date.month:02d}"
+            self.months[(values["account_id"], month, record_type)] += sign
+        if record_type == RecordType.INCOME:
+            account["total_income"] += amount
+            account["balance"] += amount
+        elif record_type == RecordType.EXPENSE:
+            account["total_expense"] += amount
+            account["balance"] -= amount
+
+        if values.get("category_id") is not None:
+            category = self.categories[values["category_id"]]
+            category["record_count"] += sign
+            # 转账不计入分类金额
+            if record_type != RecordType.TRANSFER:
+                category["total_amount"] += amount
+
+        if values.get("creator_id") is not None:
+            self.users[values["creator_id"]]["total_records"] += sign
+
+    def merge(self, other: "CounterDeltas"):
+        for mine, theirs in ((self.accounts, other.accounts), (self.categories, other.categories),
+                             (self.users, other.users)):
+            for key, deltas in theirs.items():
+                target = mine[key]
+                for field, value in deltas.items():
+                    target[field] += value
+        for key, value in other.months.items():
+            self.months[key] += value
+
+    def apply(self, connection):
+        """把累积的增量写入数据库（每张表一条 executemany），之后清空"""
+        for model, rows, fields in (
+            (Account, self.accounts, ACCOUNT_COUNTERS),
+            (Category, self.categories, CATEGORY_COUNTERS),
+            (User, self.users, USER_COUNTERS),
+        ):
+            params = [
+                {"_id": key, **{
+                    f"d_{field}": from_cents(value) if field in AMOUNT_COUNTERS else value
+                    for field, value in deltas.items()
+                }}
+                for key, deltas in rows.items()
+                if any(deltas.values())
+            ]
+            if not params:
+                continue
+            table = model.__table__
+            stmt = update(table).where(table.c.id == bindparam("_id")).values({
+                field: func.coalesce(table.c[field], 0) + bindparam(f"d_{field}") for field in fields
+            })
+            connection.execute(stmt, params)
+        month_rows = [
+            {"account_id": account_id, "month": month, "record_type": record_type, "record_count": value}
+            for (account_id, month, record_type), value in self.months.items()
+            if value
+        ]
+        if month_rows:
+            _upsert_month_counts(connection, month_rows, increment=True)
+        self.accounts.clear()
+        self.categories.clear()
+        self.users.clear()
+        self.months.clear()
+
+
+def _upsert_month_counts(connection, rows: list, increment: bool):
+    """月度计数行不存在时插入，存在时累加（increment）或覆盖；并发写同一行也不会冲突"""
+    table = RecordMonthCount.__table__
+    dialect = connection.dialect.name
+    if dialect == "mysql":
+        stmt = mysql.insert(table)
+        value = stmt.inserted.record_count
+        stmt = stmt.on_duplicate_key_update(record_count=table.c.record_count + value if increment else value)
+    elif dialect in ("sqlite", "postgresql"):
+        stmt = (sqlite if dialect == "sqlite" else postgresql).insert(table)
+        value = stmt.excluded.record_count
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.account_id, table.c.month, table.c.record_type],
+            set_={"record_count": table.c.record_count + value if increment else value},
+        )
+    else:
+        raise NotImplementedError(f"月度计数不支持数据库 {dialect}")
+    connection.execute(stmt, rows)
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+# 计算扣除量需要修改前的旧值，未加载的属性被赋值时也先加载旧值
+for _field in RECORD_COUNTER_FIELDS:
+    event.listen(getattr(Record, _field), "set", _keep_old_value, active_history=True)
+
+
+def _current_values(record: Record) -> dict:
+    return {field: getattr(record, field) for field in RECORD_COUNTER_FIELDS}
+
+
+def _previous_values(record: Record) -> Optional[dict]:
+    """刷新前的字段值；计数相关字段均未变化时返回 None"""
+    state = inspect(record)
+    values = {}
+    changed = False
+    for field in RECORD_COUNTER_FIELDS:
+        history = state.attrs[field].history
+        if history.has_changes():
+            changed = True
+            values[field] = history.deleted[0] if history.deleted else None
+        else:
+            values[field] = getattr(record, field)
+    return values if changed else None
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_counter_deltas(session: Session, flush_context):
+    deltas = CounterDeltas()
+    for obj in session.new:
+        if isinstance(obj, Record):
+            deltas.add_record(_current_values(obj))
+    for obj in session.dirty:
+        if isinstance(obj, Record):
+            previous = _previous_values(obj)
+            if previous is not None:
+                deltas.add_record(previous, -1)
+                deltas.add_record(_current_values(obj))
+    for obj in session.deleted:
+        if isinstance(obj, Record):
+            previous = _previous_values(obj) or _current_values(obj)
+            deltas.add_record(previous, -1)
+    if not deltas:
+        return
+
+    touched = session.info.setdefault("counter_touched", set())
+    touched.update((Account, key) for key in deltas.accounts)
+    touched.update((Category, key) for key in deltas.categories)
+    touched.update((User, key) for key in deltas.users)
+    deltas.apply(session.connection())
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _expire_stale_counters(session: Session, flush_context):
+    """会话中已加载的账本/分类/用户的计数字段已过期，下次访问时重新加载"""
+    touched = session.info.pop("counter_touched", None)
+    if not touched:
+        return
+    for model, key in touched:
+        obj = session.identity_map.get(session.identity_key(model, key))
+        if obj is not None:
+            fields = {Account: ACCOUNT_COUNTERS, Category: CATEGORY_COUNTERS, User: USER_COUNTERS}[model]
+            session.expire(obj, list(fields))
+
+
+# ---------------------------------------------------------------------------
+# 对账：按 records 与归档汇总重新聚合，发现漂移时用关联子查询原子地修复
+# ---------------------------------------------------------------------------
+
+def _active_records(*conditions):
+    return and_(Record.is_deleted == False, *conditions)
+
+
+def _account_expected():
+    amount = func.coalesce(Record.amount, 0)
+    income = func.coalesce(func.sum(case((Record.record_type == RecordType.INCOME, amount), else_=0)), 0)
+    expense = func.coalesce(func.sum(case((Record.record_type == RecordType.EXPENSE, amount), else_=0)), 0)
+    return income, expense, func.count(Record.id)
+
+
+def _archived(column, *conditions):
+    """归档段月度汇总中的合计（归档记录仍计入计数）"""
+    return select(func.coalesce(func.sum(column), 0)).where(*conditions).scalar_subquery()
+
+
+def _account_repair_values(account_id_column):
+    income, expense, count = _account_expected()
+    where = _active_records(Record.account_id == account_id_column)
+    rollup = RecordArchiveRollup
+    archived_income = _archived(rollup.total_amount, rollup.account_id == account_id_column,
+                                rollup.record_type == RecordType.INCOME)
+    archived_expense = _archived(rollup.total_amount, rollup.account_id == account_id_column,
+                                 rollup.record_type == RecordType.EXPENSE)
+    return {
+        "total_income": select(income).where(where).scalar_subquery() + archived_income,
+        "total_expense": select(expense).where(where).scalar_subquery() + archived_expense,
+        "balance": select(income - expense).where(where).scalar_subquery() + archived_income - archived_expense,
+        "total_records": select(count).where(where).scalar_subquery()
+        + _archived(rollup.record_count, rollup.account_id == account_id_column),
+    }
+
+
+def _category_repair_values(category_id_column):
+    where = _active_records(Record.category_id == category_id_column)
+    amount = case((Record.record_type != RecordType.TRANSFER, func.coalesce(Record.amount, 0)), else_=0)
+    rollup = RecordArchiveRollup
+    return {
+        "record_count": select(func.count(Record.id)).where(where).scalar_subquery()
+        + _archived(rollup.record_count, rollup.category_id == category_id_column),
+        "total_amount": select(func.coalesce(func.sum(amount), 0)).where(where).scalar_subquery()
+        + _archived(rollup.total_amount, rollup.category_id == category_id_column,
+                    rollup.record_type != RecordType.TRANSFER),
+    }
+
+
+def _user_repair_values(user_id_column):
+    where = _active_records(Record.creator_id == user_id_column)
+    return {
+        "total_records": select(func.count(Record.id)).where(where).scalar_subquery()
+        + _archived(RecordArchiveRollup.record_count, RecordArchiveRollup.creator_id == user_id_column),
+    }
+
+
+def _differs(column, expected):
+    # 金额列在 SQLite 中以浮点存储，换算成整数分后比较避免误报
+    if column.key not in AMOUNT_COUNTERS:
+        return or_(column.is_(None), column != expected)
+    return or_(column.is_(None), cents_column(column) != cents_column(expected))
+
+
+def find_drift(db: Session, limit: int = 1000) -> Dict[str, list]:
+    """找出计数与明细不一致的账本/分类/用户 ID"""
+    account_values = _account_repair_values(Account.id)
+    category_values = _category_repair_values(Category.id)
+    user_values = _user_repair_values(User.id)
+    return {
+        "accounts": db.scalars(select(Account.id).where(or_(
+            *(_differs(getattr(Account, f), v) for f, v in account_values.items())
+        )).limit(limit)).all(),
+        "categories": db.scalars(select(Category.id).where(or_(
+            *(_differs(getattr(Category, f), v) for f, v in category_values.items())
+        )).limit(limit)).all(),
+        "users": db.scalars(select(User.id).where(or_(
+            *(_differs(getattr(User, f), v) for f, v in user_values.items())
+        )).limit(limit)).all(),
+    }
+
+
+def _month_bounds(month: str):
+    year, month_number = int(month[:4]), int(month[5:7])
+    start = datetime(year, month_number, 1)
+    end = datetime(year + month_number // 12, month_number % 12 + 1, 1)
+    return start, end
+
+
+def find_month_count_drift(db: Session) -> Dict[tuple, int]:
+    """月度计数与明细（热表 + 归档汇总）不一致的行：(账本, 月份, 类型) -> 期望值"""
+    year, month = extract("year", Record.record_date), extract("month", Record.record_date)
+    expected = defaultdict(int)
+    for account_id, y, m, record_type, count in db.execute(
+        select(Record.account_id, year, month, Record.record_type, func.count(Record.id))
+        .where(Record.is_deleted == False)
+        .group_by(Record.account_id, year, month, Record.record_type)
+    ):
+        expected[(account_id, f"{int(y):04d}-{int(m):02d}", record_type)] += count
+    rollup = RecordArchiveRollup
+    for account_id, month_key, record_type, count in db.execute(
+        select(rollup.account_id, rollup.month, rollup.record_type, func.sum(rollup.record_count))
+        .group_by(rollup.account_id, rollup.month, rollup.record_type)
+    ):
+        expected[(account_id, month_key, record_type)] += int(count)
+    actual = {
+        (row.account_id, row.month, row.record_type): row.record_count
+        for row in db.execute(select(RecordMonthCount.__table__))
+    }
+    return {key: expected.get(key, 0) for key in expected.keys() | actual.keys()
+            if expected.get(key, 0) != actual.get(key)}
+
+
+def _repair_month_counts(db: Session, keys):
+    """缺失的行先补 0，再用关联子查询原子地重算，避免覆盖对账期间的并发增量"""
+    connection = db.connection()
+    _upsert_month_counts(connection, [
+        {"account_id": account_id, "month": month, "record_type": record_type, "record_count": 0}
+        for account_id, month, record_type in keys
+    ], increment=True)
+    table, rollup = RecordMonthCount.__table__, RecordArchiveRollup.__table__
+    records = Record.__table__
+    record_type = bindparam("_type", type_=table.c.record_type.type)
+    hot = select(func.count(records.c.id)).where(
+        records.c.account_id == bindparam("_account"), records.c.record_type == record_type,
+        records.c.is_deleted == False,
+        records.c.record_date >= bindparam("_start"), records.c.record_date < bindparam("_end"),
+    ).scalar_subquery()
+    archived = select(func.coalesce(func.sum(rollup.c.record_count), 0)).where(
+        rollup.c.account_id == bindparam("_account"), rollup.c.month == bindparam("_month"),
+        rollup.c.record_type == record_type,
+    ).scalar_subquery()
+    stmt = update(table).where(
+        table.c.account_id == bindparam("_account"), table.c.month == bindparam("_month"),
+        table.c.record_type == record_type,
+    ).values(record_count=hot + archived)
+    params = []
+    for account_id, month, record_type_value in keys:
+        start, end = _month_bounds(month)
+        params.append({"_account": account_id, "_month": month, "_type": record_type_value,
+                       "_start": start, "_end": end})
+    connection.execute(stmt, params)
+
+
+def backfill_month_counts(db: Session):
+    """按热表与归档汇总回填月度计数（建表后首次启动）"""
+    keys = list(find_month_count_drift(db))
+    if keys:
+        _repair_month_counts(db, keys)
+
+
+def reconcile_counters(db: Session, repair: bool = True, limit: int = 1000) -> Dict[str, int]:
+    """对账并修复漂移，返回各表发现的漂移行数"""
+    drift = find_drift(db, limit)
+    month_drift = list(find_month_count_drift(db))[:limit]
+    if repair:
+        for model, ids, values in (
+            (Account, drift["accounts"], _account_repair_values(Account.id)),
+            (Category, drift["categories"], _category_repair_values(Category.id)),
+            (User, drift["users"], _user_repair_values(User.id)),
+        ):
+            if ids:
+                db.execute(update(model).where(model.id.in_(ids)).values(values),
+                           execution_options={"synchronize_session": False})
+        if month_drift:
+            _repair_month_counts(db, month_drift)
+        db.commit()
+    result = {name: len(ids) for name, ids in drift.items()}
+    result["months"] = len(month_drift)
+    if any(result.values()):
+        logger.warning("计数对账发现漂移: %s", result)
+    return result
+
+
+def _reconcile_once() -> Dict[str, int]:
+    from app.core.database import SessionLocal  # database 导入本模块注册事件，这里延迟导入避免循环
+    with SessionLocal(info={"use_primary": True}) as db:
+        return reconcile_counters(db)
+
+
+async def run_reconcile_loop(interval: float):
+    """后台定时对账，在线程中执行以免阻塞事件循环"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(_reconcile_once)
+        except Exception:
+            logger.exception("计数对账失败")
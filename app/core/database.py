@@ -1,9 +1,21 @@
 # app/core/database.py
+from fastapi import Request
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from app.models import Base
 from app.core.config import settings
+from app.core import sql_metrics  # 导入即注册 SQL 监控的引擎事件
+from app.core import counters  # 导入即注册计数维护的刷新事件
+from app.core import index_advisor  # 导入即注册查询形状采集事件
+from app.core import tag_index  # 导入即注册标签倒排索引的刷新事件
+from app.core import category_tree  # 导入即注册分类闭包表的刷新事件
+from app.core import loaders  # 导入即注册关系加载配置的查询事件
+from app.core import soft_delete  # 导入即注册全局软删除过滤
+from app.core.routing import RoutingSession, ReplicaSet
 import os
+import ssl
 
 # 支持 TiDB Cloud 的 CA 文件（生产）或本地关闭证书校验（测试）
 connect_args = {}
@@ -16,15 +28,98 @@ if "mysql+pymysql" in settings.DATABASE_URL:
         # 本地测试临时关闭证书验证（生产不要这么做）
         connect_args["ssl"] = {"ssl_verify_cert": False, "ssl_verify_identity": False}
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    echo=True,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    connect_args=connect_args
-)
+def _create_sync_engine(url: str):
+    return create_engine(
+        url,
+        echo=settings.SQL_ECHO,
+        pool_pre_ping=True,
+        pool_recycle=300,
+        connect_args=connect_args if "mysql+pymysql" in url else {}
+    )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = _create_sync_engine(settings.DATABASE_URL)
+
+# 只读副本（逗号分隔，可为空）；未配置时所有读写都走主库
+REPLICA_URLS = [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+replica_engines = [_create_sync_engine(url) for url in REPLICA_URLS]
+
+class SyncRoutingSession(RoutingSession):
+    primary_engine = engine
+    replica_set = ReplicaSet(replica_engines) if replica_engines else None
+
+SessionLocal = sessionmaker(class_=SyncRoutingSession, autocommit=False, autoflush=False)
+
+# 异步引擎：按需创建，未使用异步路由的部署不需要安装异步驱动
+# 同步驱动 -> 异步驱动 映射，可通过 ASYNC_DATABASE_URL 直接指定
+ASYNC_DRIVERS = {
+    "mysql+pymysql": "mysql+aiomysql",
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+_async_engine = None
+_async_replica_engines = []
+_async_session_factory = None
+
+def _to_async_url(sync_url: str) -> str:
+    url = make_url(sync_url)
+    driver = ASYNC_DRIVERS.get(url.drivername, url.drivername)
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+def get_async_database_url() -> str:
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    return _to_async_url(settings.DATABASE_URL)
+
+def _async_connect_args(url: str) -> dict:
+    if not url.startswith("mysql+aiomysql"):
+        return {}
+    # aiomysql 需要 SSLContext
+    if TIDB_CA_PATH:
+        context = ssl.create_default_context(cafile=TIDB_CA_PATH)
+    else:
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    return {"ssl": context}
+
+def _create_async_engine(url: str):
+    options = {"pool_pre_ping": True, "pool_recycle": 300}
+    if not url.startswith("sqlite"):
+        options.update(pool_size=settings.ASYNC_DB_POOL_SIZE, max_overflow=settings.ASYNC_DB_MAX_OVERFLOW)
+    return create_async_engine(url, connect_args=_async_connect_args(url), **options)
+
+def get_async_engine():
+    global _async_engine, _async_replica_engines
+    if _async_engine is None:
+        _async_engine = _create_async_engine(get_async_database_url())
+        _async_replica_engines = [_create_async_engine(_to_async_url(url)) for url in REPLICA_URLS]
+    return _async_engine
+
+def AsyncSessionLocal(**kw) -> AsyncSession:
+    global _async_session_factory
+    if _async_session_factory is None:
+        primary = get_async_engine()
+        # AsyncSession 内部使用同步 Session 选择连接，路由到各异步引擎对应的 sync_engine
+        routing_class = type("AsyncRoutingSession", (RoutingSession,), {
+            "primary_engine": primary.sync_engine,
+            "replica_set": ReplicaSet([e.sync_engine for e in _async_replica_engines]) if _async_replica_engines else None,
+        })
+        _async_session_factory = async_sessionmaker(
+            sync_session_class=routing_class, autoflush=False, expire_on_commit=False
+        )
+    return _async_session_factory(**kw)
+
+async def dispose_async_engine():
+    global _async_engine, _async_replica_engines, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        for replica in _async_replica_engines:
+            await replica.dispose()
+        _async_engine = None
+        _async_replica_engines = []
+        _async_session_factory = None
 
 def create_tables():
     Base.metadata.create_all(bind=engine)
@@ -36,3 +131,108 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+class UnitOfWork:
+    """请求级工作单元（同步会话）
+
+    首次访问 session 时才创建会话，提交或 release 后立即归还连接，之后再访问会重新创建。
+    只读模式走只读副本且禁止写入；读写模式固定走主库。
+    """
+
+    def __init__(self, request=None, read_only: bool = False):
+        self.request = request
+        self.read_only = read_only
+        self._session = None
+
+    @property
+    def active(self) -> bool:
+        return self._session is not None
+
+    def _session_info(self) -> dict:
+        info = {"read_only": True} if self.read_only else {"use_primary": True}
+        user_id = getattr(self.request.state, "user_id", None) if self.request is not None else None
+        if user_id is not None:
+            info["user_id"] = user_id
+        return info
+
+    @property
+    def session(self):
+        if self._session is None:
+            # 提交后会立即关闭会话，已加载对象需保持可用
+            self._session = SessionLocal(info=self._session_info(), expire_on_commit=False)
+        return self._session
+
+    def set_user_id(self, user_id: int):
+        """记录当前用户，供读写分离按用户判断写入水位"""
+        if self.request is not None:
+            self.request.state.user_id = user_id
+        if self._session is not None:
+            self._session.info["user_id"] = user_id
+
+    def commit(self):
+        if self.read_only:
+            raise RuntimeError("只读工作单元不能提交写入")
+        if self._session is not None:
+            self._session.commit()
+        self.release()
+
+    def release(self):
+        """结束会话并归还连接，未提交的修改将回滚"""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+class AsyncUnitOfWork(UnitOfWork):
+    """请求级工作单元（异步会话）"""
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = AsyncSessionLocal(info=self._session_info())
+        return self._session
+
+    async def commit(self):
+        if self.read_only:
+            raise RuntimeError("只读工作单元不能提交写入")
+        if self._session is not None:
+            await self._session.commit()
+        await self.release()
+
+    async def release(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+def get_read_uow(request: Request):
+    uow = UnitOfWork(request, read_only=True)
+    try:
+        yield uow
+    finally:
+        uow.release()
+
+def get_write_uow(request: Request):
+    uow = UnitOfWork(request, read_only=False)
+    try:
+        yield uow
+    finally:
+        uow.release()
+
+async def get_async_read_uow(request: Request):
+    uow = AsyncUnitOfWork(request, read_only=True)
+    try:
+        yield uow
+    finally:
+        await uow.release()
+
+async def get_async_write_uow(request: Request):
+    uow = AsyncUnitOfWork(request, read_only=False)
+    try:
+        yield uow
+    finally:
+        await uow.release()
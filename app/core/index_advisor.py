@@ -0,0 +1,240 @@
+# app/core/index_advisor.py
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import Index, MetaData, UniqueConstraint, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm.util import LoaderCriteriaOption
+from sqlalchemy.schema import CreateIndex, Table
+from sqlalchemy.sql import Select, operators
+from sqlalchemy.sql.elements import BinaryExpression, BooleanClauseList, Grouping, UnaryExpression
+from sqlalchemy.sql.schema import Column
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_EQUALITY_OPS = {operators.eq, operators.in_op, operators.is_}
+_RANGE_OPS = {operators.gt, operators.ge, operators.lt, operators.le, operators.between_op}
+
+
+@dataclass(frozen=True)
+class QueryShape:
+    """查询形状：表 + 等值条件列 + 范围条件列 + 排序列"""
+    table: str
+    equality: Tuple[str, ...]
+    ranges: Tuple[str, ...]
+    order_by: Tuple[str, ...]
+    soft_delete_filter: bool = False
+
+
+@dataclass
+class ShapeStats:
+    count: int = 0
+    sample_sql: Optional[str] = None
+    sample_params: object = None
+    plan: Optional[List[str]] = None
+
+
+@dataclass
+class IndexProposal:
+    table: str
+    columns: Tuple[str, ...]
+    partial: bool
+    shapes: List[QueryShape] = field(default_factory=list)
+    executions: int = 0
+
+    @property
+    def name(self) -> str:
+        return f"idx_{self.table}_{'_'.join(self.columns)}"[:64]
+
+
+def _column_of(element) -> Optional[Column]:
+    return element if isinstance(element, Column) and isinstance(element.table, Table) else None
+
+
+def _conjuncts(clause):
+    """只取 AND 连接的顶层比较条件；OR 分支内的条件（如键集分页的 created_at = ?）不能作为索引前缀"""
+    if isinstance(clause, Grouping):
+        yield from _conjuncts(clause.element)
+    elif isinstance(clause, BooleanClauseList):
+        if clause.operator is operators.and_:
+            for element in clause.clauses:
+                yield from _conjuncts(element)
+    elif isinstance(clause, BinaryExpression):
+        yield clause
+
+
+def extract_shape(stmt: Select) -> Optional[QueryShape]:
+    """从 SELECT 中提取单表查询形状，多表时取 FROM 中的第一张表"""
+    tables = [t for t in stmt.get_final_froms() if isinstance(t, Table)]
+    if not tables:
+        return None
+    table = tables[0]
+
+    # 全局软删除过滤以 with_loader_criteria 选项附加，不在 whereclause 中
+    soft_delete = "is_deleted" in table.c and any(
+        isinstance(option, LoaderCriteriaOption) for option in getattr(stmt, "_with_options", ())
+    )
+    equality, ranges = [], []
+    if stmt.whereclause is not None:
+        for element in _conjuncts(stmt.whereclause):
+            column = _column_of(element.left)
+            if column is None or column.table is not table:
+                continue
+            if element.operator in _EQUALITY_OPS:
+                if column.name == "is_deleted":
+                    soft_delete = True
+                elif column.name not in equality:
+                    equality.append(column.name)
+            elif element.operator in _RANGE_OPS and column.name not in ranges:
+                ranges.append(column.name)
+
+    order_by = []
+    for clause in stmt._order_by_clauses:
+        column = _column_of(clause.element if isinstance(clause, UnaryExpression) else clause)
+        if column is not None and column.table is table:
+            order_by.append(column.name)
+
+    if not (equality or ranges or order_by):
+        return None
+    return QueryShape(table.name, tuple(equality), tuple(ranges), tuple(order_by), soft_delete)
+
+
+class IndexAdvisor:
+    """基于真实查询负载的复合索引建议
+
+    开启 INDEX_ADVISOR_ENABLED 后收集查询形状，report() 对样本语句执行 EXPLAIN，
+    按"等值列 -> 排序列 -> 范围列"的顺序生成候选索引，并排除已被现有索引前缀覆盖的候选。
+    """
+
+    def __init__(self, max_shapes: int):
+        self.max_shapes = max_shapes
+        self.shapes: Dict[QueryShape, ShapeStats] = {}
+        self._lock = threading.Lock()
+
+    def capture(self, stmt: Select, sql: str, params):
+        shape = extract_shape(stmt)
+        if shape is None:
+            return
+        with self._lock:
+            stats = self.shapes.get(shape)
+            if stats is None:
+                if len(self.shapes) >= self.max_shapes:
+                    return
+                stats = self.shapes[shape] = ShapeStats(sample_sql=sql, sample_params=params)
+            stats.count += 1
+
+    def explain(self, engine) -> None:
+        """对每种形状的样本语句执行 EXPLAIN，结果记入 plan"""
+        prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+        with engine.connect() as conn:
+            for stats in list(self.shapes.values()):
+                try:
+                    rows = conn.exec_driver_sql(prefix + stats.sample_sql, stats.sample_params or ()).fetchall()
+                    stats.plan = [" | ".join(str(v) for v in row) for row in rows]
+                except Exception as exc:
+                    stats.plan = [f"EXPLAIN 失败: {exc}"]
+
+    @staticmethod
+    def _covered(columns: Tuple[str, ...], table: Table) -> bool:
+        """候选列是现有索引（或唯一约束、主键）的前缀时视为已覆盖；首列 is_deleted 不计入前缀"""
+        existing = [tuple(c.name for c in index.columns) for index in table.indexes]
+        existing += [tuple(c.name for c in constraint.columns) for constraint in table.constraints
+                     if isinstance(constraint, UniqueConstraint)]
+        existing += [cols[1:] for cols in existing if cols[:1] == ("is_deleted",)]
+        existing.append(tuple(c.name for c in table.primary_key.columns))
+        return any(cols[:len(columns)] == columns for cols in existing)
+
+    def propose(self, metadata, dialect_name: str) -> List[IndexProposal]:
+        proposals: Dict[Tuple[str, Tuple[str, ...]], IndexProposal] = {}
+        # MySQL 不支持部分索引，软删除条件作为索引首列（与 live_index 一致）
+        partial_supported = dialect_name in ("sqlite", "postgresql")
+        for shape, stats in self.shapes.items():
+            table = metadata.tables.get(shape.table)
+            if table is None:
+                continue
+            columns = list(shape.equality)
+            columns += [c for c in shape.order_by if c not in columns]
+            # 范围列之后的列无法继续利用索引，只取第一个
+            columns += [c for c in shape.ranges[:1] if c not in columns]
+            partial = shape.soft_delete_filter and partial_supported
+            if shape.soft_delete_filter and not partial:
+                columns.insert(0, "is_deleted")
+            columns = tuple(columns)
+            if len(columns) < 2 or self._covered(columns, table):
+                continue
+            proposal = proposals.setdefault((shape.table, columns), IndexProposal(shape.table, columns, partial))
+            proposal.shapes.append(shape)
+            proposal.executions += stats.count
+        # 候选是同表另一候选的前缀时并入较长的候选，较长的索引同样能服务这些查询
+        for key, proposal in list(proposals.items()):
+            longer = next((other for other in proposals.values()
+                           if other is not proposal and other.table == proposal.table
+                           and other.partial == proposal.partial and len(other.columns) > len(proposal.columns)
+                           and other.columns[:len(proposal.columns)] == proposal.columns), None)
+            if longer is not None:
+                longer.shapes += proposal.shapes
+                longer.executions += proposal.executions
+                del proposals[key]
+        return sorted(proposals.values(), key=lambda p: p.executions, reverse=True)
+
+    @staticmethod
+    def to_index(proposal: IndexProposal, metadata) -> Index:
+        # 在表的副本上构造索引，避免把建议索引挂到应用的 metadata 上
+        table = metadata.tables[proposal.table].to_metadata(MetaData())
+        kwargs = {}
+        if proposal.partial:
+            condition = table.c.is_deleted == False
+            kwargs = {"sqlite_where": condition, "postgresql_where": condition}
+        return Index(proposal.name, *(table.c[c] for c in proposal.columns), **kwargs)
+
+    @staticmethod
+    def render_table_args(proposal: IndexProposal) -> str:
+        """生成可粘贴到模型 __table_args__ 中的 Index 声明（带软删除条件的用 live_index）"""
+        columns = [c for c in proposal.columns if c != "is_deleted"]
+        args = ", ".join(f'"{c}"' for c in columns)
+        if proposal.partial or len(columns) < len(proposal.columns):
+            return f'live_index("{proposal.name}", {args}),'
+        return f'Index("{proposal.name}", {args}),'
+
+    def report(self, engine, metadata, run_explain: bool = True) -> dict:
+        if run_explain:
+            self.explain(engine)
+        proposals = self.propose(metadata, engine.dialect.name)
+        return {
+            "shapes": [
+                {"shape": vars(shape), "count": stats.count, "plan": stats.plan}
+                for shape, stats in sorted(self.shapes.items(), key=lambda item: item[1].count, reverse=True)
+            ],
+            "proposals": [
+                {
+                    "table": p.table,
+                    "columns": list(p.columns),
+                    "partial": p.partial,
+                    "executions": p.executions,
+                    "table_args": self.render_table_args(p),
+                    "migration": str(CreateIndex(self.to_index(p, metadata)).compile(dialect=engine.dialect)),
+                }
+                for p in proposals
+            ],
+        }
+
+    def reset(self):
+        with self._lock:
+            self.shapes.clear()
+
+
+index_advisor = IndexAdvisor(settings.INDEX_ADVISOR_MAX_SHAPES)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _capture_query_shape(conn, cursor, statement, parameters, context, executemany):
+    if not settings.INDEX_ADVISOR_ENABLED or executemany:
+        return
+    compiled = getattr(context, "compiled", None)
+    if compiled is not None and isinstance(compiled.statement, Select):
+        try:
+            index_advisor.capture(compiled.statement, statement, parameters)
+        except Exception:
+            logger.debug("查询形状提取失败", exc_info=True)
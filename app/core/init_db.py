@@ -1,29 +1,187 @@
+import hashlib
+import os
+import socket
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, delete, inspect
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.orm import Session
-from app.core.database import SessionLocal, create_tables
+from sqlalchemy.schema import CreateTable, CreateIndex
+from sqlalchemy.sql.functions import now
+from app.core.database import SessionLocal, create_tables, engine
+from app.models import Base
 from app.models.category import Category
 from app.models.user import User, UserLevel
 from app.models.account import Account
+from app.models.schema_meta import SchemaMeta
+from app.models.record_tag import RecordTag
+from app.core.tag_index import backfill_tag_index
+from app.models.category_closure import CategoryClosure
+from app.core.category_tree import rebuild_category_closure
+from app.models.record_count import RecordMonthCount
+from app.core.counters import backfill_month_counts
 from app.core.security import get_password_hash
 
-def init_database():
-    create_tables()
-    db = SessionLocal()
+# 种子数据版本：修改默认分类、管理员等初始化数据时递增，使下次启动重新执行初始化
+SEED_DATA_VERSION = 1
+SCHEMA_FINGERPRINT_KEY = "schema_fingerprint"
+INIT_LOCK_KEY = "init_lock"
+TIMESTAMP_FORMAT_KEY = "sqlite_timestamp_format"
+INIT_LOCK_TIMEOUT = 120  # 秒，超过视为持锁进程已异常退出
+
+def compute_schema_fingerprint() -> str:
+    """由 ORM 元数据生成的 DDL 与种子数据版本计算 schema 指纹"""
+    dialect = engine.dialect
+    digest = hashlib.sha256(f"seed:{SEED_DATA_VERSION}".encode("utf-8"))
+    for table in Base.metadata.sorted_tables:
+        digest.update(str(CreateTable(table).compile(dialect=dialect)).encode("utf-8"))
+        for index in sorted(table.indexes, key=lambda i: i.name or ""):
+            digest.update(str(CreateIndex(index).compile(dialect=dialect)).encode("utf-8"))
+    return digest.hexdigest()
+
+def _read_meta(name: str):
+    """读取元信息，表不存在时返回 None"""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(SchemaMeta.value).where(SchemaMeta.name == name)).scalar()
+    except SQLAlchemyError:
+        return None
+
+@contextmanager
+def _init_lock():
+    """基于 schema_meta 主键的跨进程初始化锁，避免多个 worker 同时建表和写入种子数据"""
+    try:
+        SchemaMeta.__table__.create(bind=engine, checkfirst=True)
+    except SQLAlchemyError:
+        # 多个 worker 同时建表时只有一个能成功
+        if not inspect(engine).has_table(SchemaMeta.__tablename__):
+            raise
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    deadline = time.monotonic() + INIT_LOCK_TIMEOUT
+    while True:
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(SchemaMeta).values(
+                    name=INIT_LOCK_KEY, value=owner, updated_at=datetime.utcnow()
+                ))
+            break
+        except IntegrityError:
+            # 清理超时未释放的锁
+            with engine.begin() as conn:
+                conn.execute(delete(SchemaMeta).where(
+                    SchemaMeta.name == INIT_LOCK_KEY,
+                    SchemaMeta.updated_at < datetime.utcnow() - timedelta(seconds=INIT_LOCK_TIMEOUT)
+                ))
+            if time.monotonic() > deadline:
+                raise RuntimeError("等待数据库初始化锁超时")
+            time.sleep(0.5)
     try:
-        init_default_categories(db)
-        db.commit()
-        print("数据库初始化完成！")
-    except Exception as e:
-        print(f"数据库初始化失败: {e}")
-        db.rollback()
+        yield
     finally:
-        db.close()
+        with engine.begin() as conn:
+            conn.execute(delete(SchemaMeta).where(
+                SchemaMeta.name == INIT_LOCK_KEY, SchemaMeta.value == owner
+            ))
+
+def create_missing_columns():
+    """create_all 不会给已存在的表补列，这里按 ORM 元数据补齐（只处理可为空的新列）"""
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            with engine.begin() as conn:
+                conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type} NULL")
+            print(f"补建列 {table.name}.{column.name}")
+
+def create_missing_indexes():
+    """create_all 不会给已存在的表补建索引，这里按 ORM 元数据补齐"""
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=engine)
+                print(f"补建索引 {index.name}")
+
+def normalize_sqlite_timestamps():
+    """一次性把 SQLite 中旧格式的 now() 默认值（YYYY-MM-DD HH:MM:SS）补齐为带微秒的格式
+
+    now() 在 SQLite 上改为 STRFTIME 带微秒的格式后，旧行与新写入的值按文本比较时，
+    同一秒内的旧值总是更小，键集分页 created_at 相等的分支会漏掉这些行。
+    只处理服务端默认值为 now() 的列，完成后记入 schema_meta，之后不再扫描。
+    """
+    if engine.dialect.name != "sqlite" or _read_meta(TIMESTAMP_FORMAT_KEY):
+        return
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            for column in table.columns:
+                if column.server_default is None or not isinstance(getattr(column.server_default, "arg", None), now):
+                    continue
+                count = conn.exec_driver_sql(
+                    f"UPDATE {table.name} SET {column.name} = {column.name} || '.000000' "
+                    f"WHERE length({column.name}) = 19"
+                ).rowcount
+                if count:
+                    print(f"统一时间格式 {table.name}.{column.name}: {count} 行")
+        conn.execute(insert(SchemaMeta).values(name=TIMESTAMP_FORMAT_KEY, value="microseconds",
+                                               updated_at=datetime.utcnow()))
+
+def init_database():
+    # 快速路径：指纹一致说明表结构和种子数据都已就绪，一次查询即可跳过
+    fingerprint = compute_schema_fingerprint()
+    if _read_meta(SCHEMA_FINGERPRINT_KEY) == fingerprint:
+        print("数据库结构未变化，跳过初始化")
+        return
+
+    with _init_lock():
+        # 等锁期间其他 worker 可能已完成初始化
+        if _read_meta(SCHEMA_FINGERPRINT_KEY) == fingerprint:
+            return
+        # 标签索引表、分类闭包表首次创建时需要按已有数据回填
+        inspector = inspect(engine)
+        needs_tag_backfill = not inspector.has_table(RecordTag.__tablename__)
+        needs_closure_backfill = not inspector.has_table(CategoryClosure.__tablename__)
+        needs_count_backfill = not inspector.has_table(RecordMonthCount.__tablename__)
+        create_tables()
+        create_missing_columns()
+        create_missing_indexes()
+        normalize_sqlite_timestamps()
+        db = SessionLocal(info={"use_primary": True})
+        try:
+            init_default_categories(db)
+            if needs_tag_backfill:
+                backfill_tag_index(db)
+            if needs_closure_backfill:
+                rebuild_category_closure(db)
+            if needs_count_backfill:
+                backfill_month_counts(db)
+            db.merge(SchemaMeta(name=SCHEMA_FINGERPRINT_KEY, value=fingerprint))
+            db.commit()
+            print("数据库初始化完成！")
+        except Exception as e:
+            print(f"数据库初始化失败: {e}")
+            db.rollback()
+        finally:
+            db.close()
         
 
 def init_default_categories(db: Session):
-    """初始化默认系统分类"""
+    """初始化默认系统分类（只 flush，由调用方统一提交）"""
     # 检查是否已有系统分类
 
-    if db.query(Category).filter(Category.is_system == True).first():
+    # 种子数据检查包含已软删除的行，避免重复创建
+    if db.query(Category).execution_options(include_deleted=True).filter(Category.is_system == True).first():
         return
 
     default_categories = [
@@ -38,7 +196,7 @@ def init_default_categories(db: Session):
         {"name": "其他", "level": 1, "icon_name": "more", "color": "#636e72"},
     ]
     # 1. 确保管理员用户存在
-    admin = db.query(User).filter(User.username == "admin").first()
+    admin = db.query(User).execution_options(include_deleted=True).filter(User.username == "admin").first()
     if not admin:
         admin = User(
             username="admin",
@@ -49,23 +207,23 @@ def init_default_categories(db: Session):
             user_status='ACTIVE'        # 激活状态
         )
         db.add(admin)
-        db.commit()
+        db.flush()  # 生成 id
         print("创建默认管理员用户: admin/admin123")
 
 
     # 2. 确保默认账户存在
-    system_account = db.query(Account).filter_by(name='默认账户').first()
+    system_account = db.query(Account).execution_options(include_deleted=True).filter_by(name='默认账户').first()
     if not system_account:
         system_account = Account(
             name='默认账户',
             owner_id=admin.id  # 关联管理员
         )
         db.add(system_account)
-        db.commit()  # 生成 id
+        db.flush()  # 生成 id
 
     # 3. 创建默认分类
     for cat_data in default_categories:
-        existing = db.query(Category).filter_by(
+        existing = db.query(Category).execution_options(include_deleted=True).filter_by(
             name=cat_data["name"], account_id=system_account.id
         ).first()
         if not existing:
@@ -79,7 +237,6 @@ def init_default_categories(db: Session):
             )
             db.add(category)
 
-    db.commit()
-    print("数据库初始化完成！")
+    db.flush()
 
 
@@ -0,0 +1,94 @@
+# app/core/loaders.py
+from typing import Callable, Dict, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload, selectinload, raiseload
+from app.core.config import settings
+from app.models.account import Account
+from app.models.account_member import AccountMember
+from app.models.category import Category
+from app.models.payment_account import PaymentAccount
+from app.models.record import Record
+from app.models.user import User
+
+# 关系加载配置：按接口命名，集中声明每个接口需要预加载的关系。
+# 多对一用 joinedload（同一条 SQL），一对多用 selectinload（每个关系一次 IN 查询），
+# 其余关系一律 raiseload，序列化时误访问未声明的关系直接报错，而不是逐行懒加载。
+
+LOADER_PROFILES: Dict[str, Callable[[], Tuple]] = {
+    # 记录列表：分类、支付账户、创建者名称
+    "record_list": lambda: (
+        joinedload(Record.category).raiseload("*"),
+        joinedload(Record.payment_account).raiseload("*"),
+        joinedload(Record.target_payment_account).raiseload("*"),
+        joinedload(Record.creator).raiseload("*"),
+        raiseload("*"),
+    ),
+    # 记录详情：在列表基础上加所属账本
+    "record_detail": lambda: (
+        joinedload(Record.account).raiseload("*"),
+        *LOADER_PROFILES["record_list"](),
+    ),
+    # 账本首页：所有者、成员、支付账户、分类（不加载记录集合）
+    "account_dashboard": lambda: (
+        joinedload(Account.owner).raiseload("*"),
+        selectinload(Account.members).joinedload(AccountMember.user).raiseload("*"),
+        selectinload(Account.payment_accounts).raiseload("*"),
+        selectinload(Account.categories).raiseload("*"),
+        raiseload("*"),
+    ),
+    # 分类树：子分类逐层 IN 查询（最多三级）
+    "category_tree": lambda: (
+        selectinload(Category.children, recursion_depth=3),
+        raiseload("*"),
+    ),
+    # 支付账户列表
+    "payment_account_list": lambda: (
+        joinedload(PaymentAccount.account).raiseload("*"),
+        raiseload("*"),
+    ),
+    # 用户资料：名下账本
+    "user_profile": lambda: (
+        selectinload(User.accounts).raiseload("*"),
+        raiseload("*"),
+    ),
+}
+
+
+def loader_options(profile: str) -> Tuple:
+    factory = LOADER_PROFILES.get(profile)
+    if factory is None:
+        raise ValueError(f"未知的关系加载配置: {profile}")
+    return factory()
+
+
+def with_profile(statement, profile: str):
+    """为 ORM 查询套用加载配置，如 with_profile(select(Record), "record_list")"""
+    return statement.options(*loader_options(profile))
+
+
+def _loads_entities(orm_execute_state) -> bool:
+    return any(
+        desc.get("entity") is not None and desc.get("expr") is desc.get("entity")
+        for desc in orm_execute_state.statement.column_descriptions
+    )
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _apply_loader_profile(orm_execute_state):
+    """查询可通过执行选项 loader_profile 指定配置；
+
+    开启 ORM_RAISE_ON_LAZY_LOAD（测试/CI 环境）时，未指定配置的实体查询默认 raiseload，
+    N+1 回归会在测试中失败。个别确需懒加载的查询用执行选项 allow_lazy_load=True 放行。
+    """
+    if (
+        not orm_execute_state.is_select
+        or orm_execute_state.is_column_load
+        or orm_execute_state.is_relationship_load
+    ):
+        return
+    options = orm_execute_state.execution_options
+    profile = options.get("loader_profile")
+    if profile:
+        orm_execute_state.statement = with_profile(orm_execute_state.statement, profile)
+    elif settings.ORM_RAISE_ON_LAZY_LOAD and not options.get("allow_lazy_load") and _loads_entities(orm_execute_state):
+        orm_execute_state.statement = orm_execute_state.statement.options(raiseload("*"))
@@ -0,0 +1,38 @@
+# app/core/money.py
+from decimal import Decimal, ROUND_HALF_UP
+from sqlalchemy import BigInteger, cast, func
+
+# 金额统一按“分”（int64 整数）参与聚合：
+# - SQL 端先把每行金额换算成整数分再 SUM，SQLite 的 REAL 列求和不再累积浮点误差，
+#   MySQL 的 DECIMAL 求和结果也直接是整数；
+# - 只在 API 返回、写回金额列时用 from_cents 转回 Decimal。
+# DECIMAL(15, 2) 的上限约 10^13 分，远小于 int64 范围。
+
+CENT = Decimal("0.01")
+
+
+def to_cents(value) -> int:
+    """金额（Decimal/float/str/int 元）-> 整数分，四舍五入到分"""
+    if value is None:
+        return 0
+    if isinstance(value, int):
+        return value * 100
+    if not isinstance(value, Decimal):
+        # float 先转成最短十进制表示，避免 0.1 之类的二进制误差进入取整
+        value = Decimal(repr(value) if isinstance(value, float) else str(value))
+    return int((value * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents) -> Decimal:
+    """整数分 -> 两位小数的 Decimal（API 边界使用）"""
+    return (Decimal(int(cents or 0)) * CENT).quantize(CENT)
+
+
+def cents_column(column):
+    """SQL 表达式：单行金额换算为整数分"""
+    return cast(func.round(column * 100), BigInteger)
+
+
+def sum_cents_column(column):
+    """SQL 表达式：整数分合计，无记录时为 0"""
+    return func.coalesce(func.sum(cents_column(column)), 0)
@@ -0,0 +1,42 @@
+# app/core/pagination.py
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+from fastapi import HTTPException
+
+# 不透明的键集分页游标：对客户端只是一个字符串，内部为 (方向, 排序键) 的 base64 JSON。
+# 排序键中的时间按 ISO 格式编码，其余值原样保存。
+
+NEXT, PREV = "next", "prev"
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"t": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        return datetime.fromisoformat(value["t"])
+    return value
+
+
+def encode_cursor(key: tuple, direction: str = NEXT) -> str:
+    payload = json.dumps([direction, [_encode_value(v) for v in key]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Tuple[Optional[tuple], str]:
+    """返回 (排序键, 方向)；未传游标时为 (None, next)"""
+    if not cursor:
+        return None, NEXT
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        direction, values = json.loads(raw)
+        if direction not in (NEXT, PREV):
+            raise ValueError(direction)
+        return tuple(_decode_value(v) for v in values), direction
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="无效的分页游标")
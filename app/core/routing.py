@@ -0,0 +1,147 @@
+# app/core/routing.py
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaSet:
+    """只读副本集合：轮询选择健康副本，出错的副本暂停使用一段时间后自动重试"""
+
+    def __init__(self, engines: List):
+        self.engines = list(engines)
+        self._unhealthy_until = {}
+        self._cycle = itertools.cycle(range(len(self.engines))) if self.engines else None
+        self._lock = threading.Lock()
+        for engine in self.engines:
+            event.listen(engine, "handle_error", self._on_error)
+
+    def _on_error(self, context):
+        if context.is_disconnect or isinstance(context.sqlalchemy_exception, OperationalError):
+            self.mark_unhealthy(context.engine)
+
+    def mark_unhealthy(self, engine):
+        with self._lock:
+            self._unhealthy_until[engine] = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+        logger.warning("只读副本不可用，暂时切回主库: %s", engine.url.render_as_string(hide_password=True))
+
+    def choose(self):
+        """返回一个健康副本，全部不可用时返回 None（由调用方回退到主库）"""
+        if not self.engines:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(len(self.engines)):
+                engine = self.engines[next(self._cycle)]
+                until = self._unhealthy_until.get(engine)
+                if until is None or until <= now:
+                    self._unhealthy_until.pop(engine, None)
+                    return engine
+        return None
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            engine.url.render_as_string(hide_password=True): self._unhealthy_until.get(engine, 0) <= now
+            for engine in self.engines
+        }
+
+
+class RecentWrites:
+    """用户最近写入水位：写入后一段时间内该用户的读请求固定走主库（读己之写）
+
+    按最近写入时间排序，最早写入的在头部：过期的从头部弹出，超出 max_size 时淘汰最早的
+    （被淘汰的用户提前回到只读副本，只影响读己之写的时效）。每次写入均摊 O(1)。
+    """
+
+    def __init__(self, max_size: int = 100000):
+        self.max_size = max_size
+        self._until = OrderedDict()
+        self._lock = threading.Lock()
+
+    def mark(self, user_id: int):
+        now = time.monotonic()
+        with self._lock:
+            self._until[user_id] = now + settings.READ_YOUR_WRITES_SECONDS
+            self._until.move_to_end(user_id)
+            while self._until:
+                until = next(iter(self._until.values()))
+                if until > now and len(self._until) <= self.max_size:
+                    break
+                self._until.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._until)
+
+    def is_pinned(self, user_id: Optional[int]) -> bool:
+        if user_id is None:
+            return False
+        until = self._until.get(user_id)
+        return until is not None and until > time.monotonic()
+
+
+recent_writes = RecentWrites()
+
+
+class RoutingSession(Session):
+    """读写分离会话
+
+    写入（flush、DML、SELECT ... FOR UPDATE）走主库；会话一旦写过、显式要求主库
+    （info["use_primary"]），或当前用户（info["user_id"]）处于写入水位内时，读也走主库；
+    其余读请求分发到健康的只读副本。子类通过 primary_engine / replica_set 指定引擎。
+    info["read_only"] 标记的会话禁止任何写入。
+    """
+
+    primary_engine = None
+    replica_set: Optional[ReplicaSet] = None
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            self.replica_set is None
+            or self._flushing
+            or self.info.get("use_primary")
+            or self.info.get("wrote")
+            or (clause is not None and (
+                getattr(clause, "is_dml", False) or getattr(clause, "_for_update_arg", None) is not None
+            ))
+            or recent_writes.is_pinned(self.info.get("user_id"))
+        ):
+            return self.primary_engine
+        return self.replica_set.choose() or self.primary_engine
+
+
+def _reject_read_only_write(session):
+    if session.info.get("read_only"):
+        raise RuntimeError("只读会话不允许写入数据库")
+
+
+@event.listens_for(RoutingSession, "before_flush")
+def _guard_read_only_flush(session, flush_context, instances):
+    if session.new or session.dirty or session.deleted:
+        _reject_read_only_write(session)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_flush_write(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _mark_dml_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _reject_read_only_write(orm_execute_state.session)
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _mark_user_write(session):
+    if session.info.get("wrote") and session.info.get("user_id") is not None:
+        recent_writes.mark(session.info["user_id"])
@@ -1,30 +1,27 @@
 # app/core/security.py
+import hashlib
+import secrets
 from datetime import datetime, timedelta
 from typing import Any, Union, Optional
 from jose import jwt, JWTError
-from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from app.core.config import settings
-from app.core.database import get_db
-from app.models.user import User
+from app.core.database import UnitOfWork, AsyncUnitOfWork, get_read_uow, get_async_read_uow
+from app.models.user import User, UserStatus
+from app.models.refresh_token import RefreshToken
+from app.core.user_cache import user_cache, UserSnapshot
+from app.core.hashing import (
+    pwd_context, get_password_hash, verify_password,
+    get_password_hash_async, verify_password_async
+)
 
-# 密码加密
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 SUPER_VERIFICATION_CODE = "0000"  # 开发阶段超级验证码
 
 # JWT认证
 security = HTTPBearer()
 
-def get_password_hash(password: str) -> str:
-    """加密密码"""
-    return pwd_context.hash(password)
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """验证密码"""
-    return pwd_context.verify(plain_password, hashed_password)
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """创建访问令牌"""
     to_encode = data.copy()
@@ -37,6 +34,84 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+def create_user_access_token(user) -> str:
+    """为用户签发访问令牌，lvl 声明供准入控制按用户等级分流"""
+    level = user.user_level.value if user.user_level else "free"
+    return create_access_token({"sub": user.username, "lvl": level})
+
+def _hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def create_refresh_token(db: Session, user_id: int, family_id: Optional[str] = None) -> str:
+    """创建刷新令牌（不提交事务）"""
+    token = secrets.token_urlsafe(32)
+    db.add(RefreshToken(
+        user_id=user_id,
+        token_hash=_hash_refresh_token(token),
+        family_id=family_id or secrets.token_hex(16),
+        expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    ))
+    return token
+
+def _revoke_family(db: Session, family_id: str):
+    db.query(RefreshToken).filter(
+        RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None)
+    ).update({RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+
+def rotate_refresh_token(db: Session, token: str):
+    """轮换刷新令牌：旧令牌立即吊销并签发同族新令牌，返回 (用户, 新令牌)
+
+    已吊销的令牌再次出现视为泄露重用，整族令牌全部吊销。
+    """
+    invalid = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="刷新令牌无效或已过期",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    record = db.query(RefreshToken).filter(
+        RefreshToken.token_hash == _hash_refresh_token(token)
+    ).first()
+    if record is None:
+        raise invalid
+
+    now = datetime.utcnow()
+    # 条件更新保证并发刷新时只有一个请求能成功消费该令牌
+    consumed = db.query(RefreshToken).filter(
+        RefreshToken.id == record.id, RefreshToken.revoked_at.is_(None)
+    ).update({RefreshToken.revoked_at: now}, synchronize_session=False)
+    if not consumed:
+        _revoke_family(db, record.family_id)
+        db.commit()
+        raise invalid
+    if record.expires_at < now:
+        db.commit()
+        raise invalid
+
+    user = db.query(User).filter(User.id == record.user_id, User.is_deleted == False).first()
+    if user is None or user.user_status != UserStatus.ACTIVE:
+        _revoke_family(db, record.family_id)
+        db.commit()
+        raise invalid
+
+    new_token = create_refresh_token(db, user.id, record.family_id)
+    db.commit()
+    return user, new_token
+
+def revoke_refresh_token(db: Session, token: str):
+    """吊销刷新令牌所在的整族令牌（退出登录）"""
+    record = db.query(RefreshToken).filter(
+        RefreshToken.token_hash == _hash_refresh_token(token)
+    ).first()
+    if record is not None:
+        _revoke_family(db, record.family_id)
+        db.commit()
+
+def revoke_user_refresh_tokens(db: Session, user_id: int):
+    """吊销用户的全部刷新令牌（不提交事务）"""
+    db.query(RefreshToken).filter(
+        RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None)
+    ).update({RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+
 def verify_token(token: str) -> Optional[str]:
     """验证令牌"""
     try:
@@ -48,21 +123,17 @@ def verify_token(token: str) -> Optional[str]:
     except JWTError:
         return None
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """获取当前登录用户"""
-    token = credentials.credentials
-    username = verify_token(token)
-    
+def _verify_credentials(credentials: HTTPAuthorizationCredentials) -> str:
+    username = verify_token(credentials.credentials)
     if username is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="无效的认证令牌",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
+    return username
+
+def _load_user_snapshot(db: Session, username: str) -> UserSnapshot:
     user = db.query(User).filter(User.username == username, User.is_deleted == False).first()
     if user is None:
         raise HTTPException(
@@ -71,9 +142,39 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    return user
+    snapshot = UserSnapshot.from_user(user)
+    user_cache.put(username, snapshot)
+    return snapshot
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    uow: UnitOfWork = Depends(get_read_uow)
+) -> UserSnapshot:
+    """获取当前登录用户（优先读取缓存，未命中才查询数据库）"""
+    username = _verify_credentials(credentials)
+    snapshot = user_cache.get(username)
+    if snapshot is None:
+        snapshot = _load_user_snapshot(uow.session, username)
+        # 认证查询结束即归还连接，不在整个请求期间占用
+        uow.release()
+    # 供读写分离按用户判断写入水位
+    uow.set_user_id(snapshot.id)
+    return snapshot
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    uow: AsyncUnitOfWork = Depends(get_async_read_uow)
+) -> UserSnapshot:
+    """获取当前登录用户（异步会话版本）"""
+    username = _verify_credentials(credentials)
+    snapshot = user_cache.get(username)
+    if snapshot is None:
+        snapshot = await uow.session.run_sync(_load_user_snapshot, username)
+        await uow.release()
+    uow.set_user_id(snapshot.id)
+    return snapshot
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+def get_current_active_user(current_user: UserSnapshot = Depends(get_current_user)) -> UserSnapshot:
     """获取当前活跃用户"""
     if current_user.user_status.value != "active":
         raise HTTPException(
@@ -0,0 +1,51 @@
+# app/core/segment_codec.py
+import enum
+import hashlib
+import json
+import zlib
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Tuple
+from sqlalchemy import DateTime, Numeric
+from app.models.record import Record
+
+CODEC = "zlib-json"
+
+
+# ---------------------------------------------------------------------------
+# 编解码：归档段内记录按列名保存，与 records 表的 Core 查询结果格式一致
+# ---------------------------------------------------------------------------
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+_DATETIME_COLUMNS = {c.name for c in Record.__table__.columns if isinstance(c.type, DateTime)}
+_DECIMAL_COLUMNS = {c.name for c in Record.__table__.columns if isinstance(c.type, Numeric)}
+
+
+def _decode_row(item: dict) -> dict:
+    for name in _DATETIME_COLUMNS:
+        if item.get(name):
+            item[name] = datetime.fromisoformat(item[name])
+    for name in _DECIMAL_COLUMNS:
+        if item.get(name) is not None:
+            item[name] = Decimal(item[name])
+    return item
+
+
+def encode_segment(rows: List[dict]) -> Tuple[bytes, str]:
+    data = json.dumps([{k: _encode_value(v) for k, v in row.items()} for row in rows],
+                      ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    payload = zlib.compress(data, 9)
+    return payload, hashlib.sha256(payload).hexdigest()
+
+
+def decode_segment(payload: bytes) -> List[dict]:
+    return [_decode_row(item) for item in json.loads(zlib.decompress(payload))]
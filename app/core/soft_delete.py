@@ -0,0 +1,27 @@
+# app/core/soft_delete.py
+from sqlalchemy import event
+from sqlalchemy.orm import Session, with_loader_criteria
+from app.models.base import BaseModel
+
+# 全局软删除过滤：所有 ORM 查询（含关系加载）自动排除 is_deleted 的行，
+# 调用方不必再逐个查询补 is_deleted == False。
+# 需要看到已删除数据时（唯一性检查、种子数据、闭包重建、清理任务）显式放行：
+#   db.query(User).execution_options(include_deleted=True)
+#   db.execute(stmt, execution_options={"include_deleted": True})
+# 直接基于 Table 的 Core 查询不受影响。
+
+INCLUDE_DELETED = "include_deleted"
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _exclude_soft_deleted(orm_execute_state):
+    if (
+        not orm_execute_state.is_select
+        or orm_execute_state.is_column_load
+        or orm_execute_state.is_relationship_load
+        or orm_execute_state.execution_options.get(INCLUDE_DELETED, False)
+    ):
+        return
+    orm_execute_state.statement = orm_execute_state.statement.options(
+        with_loader_criteria(BaseModel, lambda cls: cls.is_deleted == False, include_aliases=True)
+    )
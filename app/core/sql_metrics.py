@@ -0,0 +1,176 @@
+# app/core/sql_metrics.py
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 归一化 SQL：合并空白，IN 列表等占位符序列折叠为一个，得到"语句形状"
+_WHITESPACE = re.compile(r"\s+")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))+\s*\)")
+_VALUES_LIST = re.compile(r"(VALUES\s*\([^)]*\))(?:\s*,\s*\([^)]*\))+", re.IGNORECASE)
+
+
+def statement_shape(statement: str) -> str:
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _VALUES_LIST.sub(r"\1", shape)
+    return _PLACEHOLDER_LIST.sub("(?)", shape)
+
+
+class RequestSQLStats:
+    """单个请求内的 SQL 统计"""
+
+    __slots__ = ("count", "total_time", "slowest_time", "slowest_statement", "shapes")
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement = None
+        self.shapes = Counter()
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.total_time += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated_shapes(self):
+        """同一请求内重复执行的相同形状语句（疑似 N+1）"""
+        threshold = settings.SQL_N_PLUS_ONE_THRESHOLD
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+
+_current_stats: ContextVar[Optional[RequestSQLStats]] = ContextVar("sql_request_stats", default=None)
+
+
+class SQLMetrics:
+    """全局聚合指标（按路由模板汇总）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.statements = 0
+        self.total_time = 0.0
+        self.slow_statements = 0
+        self.routes = {}
+
+    def record_statement(self, elapsed: float, slow: bool):
+        with self._lock:
+            self.statements += 1
+            self.total_time += elapsed
+            if slow:
+                self.slow_statements += 1
+
+    def record_request(self, route: str, stats: RequestSQLStats, n_plus_one: bool):
+        with self._lock:
+            item = self.routes.get(route)
+            if item is None:
+                item = self.routes[route] = {
+                    "requests": 0, "queries": 0, "db_time_ms": 0.0,
+                    "max_queries": 0, "max_db_time_ms": 0.0, "n_plus_one": 0,
+                }
+            db_time_ms = stats.total_time * 1000
+            item["requests"] += 1
+            item["queries"] += stats.count
+            item["db_time_ms"] += db_time_ms
+            item["max_queries"] = max(item["max_queries"], stats.count)
+            item["max_db_time_ms"] = max(item["max_db_time_ms"], db_time_ms)
+            if n_plus_one:
+                item["n_plus_one"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            routes = {}
+            for route, item in self.routes.items():
+                requests = item["requests"] or 1
+                routes[route] = {
+                    **item,
+                    "db_time_ms": round(item["db_time_ms"], 2),
+                    "max_db_time_ms": round(item["max_db_time_ms"], 2),
+                    "avg_queries": round(item["queries"] / requests, 2),
+                    "avg_db_time_ms": round(item["db_time_ms"] / requests, 2),
+                }
+            return {
+                "statements": self.statements,
+                "total_time_ms": round(self.total_time * 1000, 2),
+                "slow_statements": self.slow_statements,
+                "routes": routes,
+            }
+
+
+sql_metrics = SQLMetrics()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    slow = elapsed * 1000 >= settings.SQL_SLOW_QUERY_MS
+    sql_metrics.record_statement(elapsed, slow)
+
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+
+    # 慢查询日志按比例采样，避免高峰期日志本身成为瓶颈
+    if slow and random.random() < settings.SQL_SLOW_QUERY_SAMPLE_RATE:
+        logger.warning("慢查询 %.1fms: %s", elapsed * 1000, _WHITESPACE.sub(" ", statement)[:1000])
+
+
+class SQLMetricsMiddleware:
+    """按请求统计 SQL 条数、数据库耗时、最慢语句，并检测 N+1
+
+    DEBUG 模式下写入响应头，否则只汇总到全局指标。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestSQLStats()
+        token = _current_stats.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and settings.DEBUG:
+                repeated = stats.repeated_shapes()
+                headers = list(message.get("headers", []))
+                headers.extend([
+                    (b"x-db-queries", str(stats.count).encode()),
+                    (b"x-db-time-ms", f"{stats.total_time * 1000:.2f}".encode()),
+                    (b"x-db-slowest-ms", f"{stats.slowest_time * 1000:.2f}".encode()),
+                ])
+                if repeated:
+                    headers.append((b"x-db-n-plus-one", f"{repeated[0][1]}x".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_stats.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            repeated = stats.repeated_shapes()
+            if repeated:
+                shape, n = repeated[0]
+                logger.warning("疑似 N+1 查询 %s %s: 相同语句执行 %d 次: %s",
+                               scope.get("method"), route_path, n, shape[:500])
+            sql_metrics.record_request(f"{scope.get('method')} {route_path}", stats, bool(repeated))
@@ -0,0 +1,164 @@
+# app/core/tag_index.py
+import json
+import logging
+from typing import Iterable, List
+from sqlalchemy import event, inspect, select, delete, insert, update, bindparam
+from sqlalchemy.orm import Session
+from app.models.record import Record, RecordType
+from app.models.record_tag import RecordTag, RecordPerson
+from app.models.record_archive import RecordArchiveSegment
+from app.core.segment_codec import decode_segment
+
+logger = logging.getLogger(__name__)
+
+MAX_TERM_LENGTH = 50
+
+# 变化时需要重建索引行的记录字段
+INDEXED_FIELDS = ("tags", "related_people", "account_id", "record_type", "amount", "record_date", "is_deleted")
+# 索引词来源字段；其余字段是冗余到索引行上的值，变化时原地更新即可
+TERM_FIELDS = ("tags", "related_people")
+INDEX_VALUE_FIELDS = ("account_id", "record_type", "amount", "record_date")
+
+
+def normalize_terms(value) -> List[str]:
+    """标签/人员统一为去重后的字符串列表，兼容 JSON 数组、逗号分隔字符串和 {"name": ...} 对象"""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            value = value.split(",")
+    if isinstance(value, (str, dict)):
+        value = [value]
+    terms = []
+    for item in value:
+        if isinstance(item, dict):
+            item = item.get("name")
+        if item is None:
+            continue
+        term = str(item).strip()[:MAX_TERM_LENGTH]
+        if term and term not in terms:
+            terms.append(term)
+    return terms
+
+
+def _index_rows(values: dict):
+    """一条记录对应的标签行和人员行；已删除的记录不建索引"""
+    if values.get("is_deleted") or values.get("id") is None:
+        return [], []
+    record_type = values["record_type"]
+    base = {
+        "record_id": values["id"],
+        "account_id": values["account_id"],
+        "record_type": record_type if isinstance(record_type, RecordType) else RecordType(record_type),
+        "amount": values["amount"] or 0,
+        "record_date": values["record_date"],
+    }
+    tags = [{**base, "tag": tag} for tag in normalize_terms(values.get("tags"))]
+    people = [{**base, "person": person} for person in normalize_terms(values.get("related_people"))]
+    return tags, people
+
+
+def has_terms(values: dict) -> bool:
+    """记录是否有标签或关联人员（没有的记录不存在索引行）"""
+    return any(normalize_terms(values.get(field)) for field in TERM_FIELDS)
+
+
+def update_index_values(connection, rows: Iterable[dict]):
+    """标签/人员不变、只有金额日期等冗余值变化时，原地更新索引行，不删除重建"""
+    params = []
+    for row in rows:
+        record_type = row["record_type"]
+        params.append({
+            "_record_id": row["id"], "account_id": row["account_id"], "amount": row["amount"] or 0,
+            "record_type": record_type if isinstance(record_type, RecordType) else RecordType(record_type),
+            "record_date": row["record_date"],
+        })
+    if not params:
+        return
+    for table in (RecordTag.__table__, RecordPerson.__table__):
+        connection.execute(update(table).where(table.c.record_id == bindparam("_record_id")).values({
+            field: bindparam(field) for field in INDEX_VALUE_FIELDS
+        }), params)
+
+
+def reindex_records(connection, rows: Iterable[dict], deleted_ids: Iterable[int] = ()):
+    """重建一批记录的索引：先按 ID 删除旧行，再批量插入新行
+
+    rows 为记录字段字典（含 id）；deleted_ids 为只需删除索引的记录。
+    批量写入等绕过 ORM 的路径也使用此函数。
+    """
+    rows = list(rows)
+    ids = [row["id"] for row in rows] + list(deleted_ids)
+    if not ids:
+        return
+    tag_rows, person_rows = [], []
+    for row in rows:
+        tags, people = _index_rows(row)
+        tag_rows += tags
+        person_rows += people
+    for i in range(0, len(ids), 1000):
+        chunk = ids[i:i + 1000]
+        connection.execute(delete(RecordTag.__table__).where(RecordTag.__table__.c.record_id.in_(chunk)))
+        connection.execute(delete(RecordPerson.__table__).where(RecordPerson.__table__.c.record_id.in_(chunk)))
+    if tag_rows:
+        connection.execute(insert(RecordTag.__table__), tag_rows)
+    if person_rows:
+        connection.execute(insert(RecordPerson.__table__), person_rows)
+
+
+def _record_values(record: Record) -> dict:
+    return {"id": record.id, **{field: getattr(record, field) for field in INDEXED_FIELDS}}
+
+
+def _needs_reindex(record: Record) -> bool:
+    state = inspect(record)
+    return any(state.attrs[field].history.has_changes() for field in INDEXED_FIELDS)
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_tag_index(session: Session, flush_context):
+    rows, deleted_ids = [], []
+    for obj in session.new:
+        if isinstance(obj, Record) and (obj.tags or obj.related_people):
+            rows.append(_record_values(obj))
+    for obj in session.dirty:
+        if isinstance(obj, Record) and _needs_reindex(obj):
+            rows.append(_record_values(obj))
+    for obj in session.deleted:
+        if isinstance(obj, Record):
+            deleted_ids.append(obj.id)
+    if rows or deleted_ids:
+        reindex_records(session.connection(), rows, deleted_ids)
+
+
+def backfill_tag_index(db: Session, batch_size: int = 1000, start_id: int = 0) -> int:
+    """按主键分批为已有记录（含归档段）重建索引，每批单独提交，返回处理的记录数"""
+    records = Record.__table__
+    columns = [records.c.id] + [records.c[field] for field in INDEXED_FIELDS]
+    last_id, total = start_id, 0
+    while True:
+        batch = db.execute(
+            select(*columns).where(records.c.id > last_id).order_by(records.c.id).limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        rows = [dict(zip(("id",) + INDEXED_FIELDS, row)) for row in batch]
+        reindex_records(db.connection(), rows)
+        db.commit()
+        last_id = rows[-1]["id"]
+        total += len(rows)
+        logger.info("标签索引回填进度: 已处理 %d 条，最后 ID %d", total, last_id)
+
+    if start_id == 0:
+        segment_ids = db.scalars(select(RecordArchiveSegment.id).order_by(RecordArchiveSegment.id)).all()
+        for segment_id in segment_ids:
+            segment = db.get(RecordArchiveSegment, segment_id)
+            rows = decode_segment(segment.payload)
+            reindex_records(db.connection(), rows)
+            db.commit()
+            db.expunge(segment)
+            total += len(rows)
+        logger.info("标签索引回填完成: 共 %d 条（含 %d 个归档段）", total, len(segment_ids))
+    return total
@@ -0,0 +1,152 @@
+# app/core/user_cache.py
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.user import User, UserLevel, UserStatus
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """当前登录用户快照（只读，不绑定数据库会话）"""
+    id: int
+    uuid: str
+    username: str
+    email: Optional[str]
+    phone: Optional[str]
+    nickname: Optional[str]
+    avatar_url: Optional[str]
+    user_level: UserLevel
+    user_status: UserStatus
+    is_active: bool
+    version: int
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            uuid=user.uuid,
+            username=user.username,
+            email=user.email,
+            phone=user.phone,
+            nickname=user.nickname,
+            avatar_url=user.avatar_url,
+            user_level=user.user_level,
+            user_status=user.user_status,
+            is_active=user.is_active,
+            version=user.version or 1,
+        )
+
+
+class UserCache:
+    """登录用户缓存（TTL + LRU），按令牌 sub 缓存用户快照"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        # 失效时记录的最低版本，防止并发请求把旧版本快照写回缓存
+        self._min_versions = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Optional[UserSnapshot]:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires_at, snapshot = item
+            if expires_at < now:
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return snapshot
+
+    def put(self, key: str, snapshot: UserSnapshot):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if snapshot.version < self._min_versions.get(key, 0):
+                return
+            self._data[key] = (time.monotonic() + self.ttl, snapshot)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: str, min_version: int = 0):
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self.invalidations += 1
+            if min_version:
+                self._min_versions[key] = max(min_version, self._min_versions.get(key, 0))
+                self._min_versions.move_to_end(key)
+                while len(self._min_versions) > self.max_size:
+                    self._min_versions.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._min_versions.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+user_cache = UserCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL_SECONDS)
+
+# 影响登录态的字段，变更时递增 User.version 并使缓存失效
+_TRACKED_FIELDS = (
+    "username", "email", "phone", "nickname", "avatar_url", "password_hash",
+    "user_level", "user_status", "is_active", "is_deleted",
+)
+
+
+@event.listens_for(User, "before_update")
+def _bump_user_version(mapper, connection, target: User):
+    state = inspect(target)
+    changed = [f for f in _TRACKED_FIELDS if state.attrs[f].history.has_changes()]
+    if not changed:
+        return
+    target.version = (target.version or 1) + 1
+
+    # 提交后再失效，避免其他请求在提交前读到旧数据又写回缓存
+    pending = state.session.info.setdefault("user_cache_invalidate", {})
+    usernames = set(state.attrs.username.history.deleted or ()) | {target.username}
+    for username in usernames:
+        if username:
+            pending[username] = target.version
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session):
+    pending = session.info.pop("user_cache_invalidate", None)
+    if pending:
+        for username, version in pending.items():
+            user_cache.invalidate(username, version)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session: Session):
+    session.info.pop("user_cache_invalidate", None)
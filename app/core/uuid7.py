@@ -0,0 +1,45 @@
+# app/core/uuid7.py
+import os
+import threading
+import time
+import uuid
+
+# UUIDv7（RFC 9562）：前 48 位为毫秒时间戳，新行的 uuid 大致递增，
+# 唯一索引写入集中在 B+ 树右侧，不再像 uuid4 那样随机分裂页。
+# 同一毫秒内用 rand_a 的 12 位作计数器，保证本进程内严格递增。
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+
+def uuid7() -> uuid.UUID:
+    global _last_ms, _counter
+    with _lock:
+        ms = time.time_ns() // 1_000_000
+        if ms > _last_ms:
+            _last_ms = ms
+            # 计数器从随机值起步（留出一半空间），多进程同一毫秒内也不易重复
+            _counter = int.from_bytes(os.urandom(2), "big") & 0x7FF
+        else:
+            # 时钟回拨或同一毫秒：沿用上次时间戳，计数器溢出时借用下一毫秒
+            _counter += 1
+            if _counter > 0xFFF:
+                _last_ms += 1
+                _counter = 0
+        ms, counter = _last_ms, _counter
+    rand_b = int.from_bytes(os.urandom(8), "big") & 0x3FFFFFFFFFFFFFFF
+    value = (ms & 0xFFFFFFFFFFFF) << 80 | 0x7 << 76 | counter << 64 | 0b10 << 62 | rand_b
+    return uuid.UUID(int=value)
+
+
+def uuid7_str() -> str:
+    """用作模型 uuid 列的默认值"""
+    return str(uuid7())
+
+
+def uuid7_timestamp(value) -> float:
+    """UUIDv7 中的创建时间（秒）"""
+    if not isinstance(value, uuid.UUID):
+        value = uuid.UUID(str(value))
+    return (value.int >> 80) / 1000
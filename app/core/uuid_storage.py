@@ -0,0 +1,118 @@
+# app/core/uuid_storage.py
+import logging
+from typing import List
+from sqlalchemy import inspect, text
+from app.models import Base
+from app.models.base import UUIDType
+
+logger = logging.getLogger(__name__)
+
+# 已有库从 CHAR(36) 迁移到 BINARY(16)（MySQL）：
+#   1. 新增 uuid_bin 列，并建 INSERT/UPDATE 触发器让迁移期间新写入的行同步填 uuid_bin
+#   2. 按批回填存量行，每批单独提交，可在线执行
+#   3. LOCK TABLES ... WRITE 下补填最后一批遗漏的行、删除触发器，再删除旧 uuid 列和唯一索引，
+#      uuid_bin 改名为 uuid 并重建唯一索引；这一步会阻塞该表的读写，应在停写窗口执行
+#   4. 设置 UUID_BINARY_STORAGE=true 后重启应用
+# 第 3 步之后、第 4 步之前应用仍按字符串写 uuid，会写入错误的值，因此从第 3 步开始到重启完成都必须停写。
+# TiDB 不支持触发器，也默认不支持 LOCK TABLES：只能在完全停写后执行，不能在线迁移。
+# 新库直接设置 UUID_BINARY_STORAGE=true 即可，create_all 会按 BINARY(16) 建表。
+
+TEMP_COLUMN = "uuid_bin"
+
+
+def uuid_tables(metadata=Base.metadata) -> List:
+    return [t for t in metadata.sorted_tables if "uuid" in t.c and isinstance(t.c.uuid.type, UUIDType)]
+
+
+def _uuid_index_name(table) -> str:
+    for index in table.indexes:
+        if [c.name for c in index.columns] == ["uuid"]:
+            return index.name
+    return f"ix_{table.name}_uuid"
+
+
+def _is_binary(engine, table) -> bool:
+    for column in inspect(engine).get_columns(table.name):
+        if column["name"] == "uuid":
+            return "BINARY" in str(column["type"]).upper()
+    return False
+
+
+def add_column_sql(table) -> str:
+    return f"ALTER TABLE {table.name} ADD COLUMN {TEMP_COLUMN} BINARY(16) NULL"
+
+
+def _trigger_names(table) -> List[str]:
+    return [f"{table.name}_{TEMP_COLUMN}_insert", f"{table.name}_{TEMP_COLUMN}_update"]
+
+
+def trigger_sql(table) -> List[str]:
+    """迁移期间新增/修改的行由触发器同步写 uuid_bin，回填结束后不会留下空值"""
+    insert_trigger, update_trigger = _trigger_names(table)
+    value = f"SET NEW.{TEMP_COLUMN} = UNHEX(REPLACE(NEW.uuid, '-', ''))"
+    return [
+        f"CREATE TRIGGER {insert_trigger} BEFORE INSERT ON {table.name} FOR EACH ROW {value}",
+        f"CREATE TRIGGER {update_trigger} BEFORE UPDATE ON {table.name} FOR EACH ROW {value}",
+    ]
+
+
+def backfill_sql(table, batch_size: int = None) -> str:
+    sql = f"UPDATE {table.name} SET {TEMP_COLUMN} = UNHEX(REPLACE(uuid, '-', '')) WHERE {TEMP_COLUMN} IS NULL"
+    return f"{sql} LIMIT {batch_size}" if batch_size else sql
+
+
+def swap_sql(table) -> List[str]:
+    """写锁下执行：补填剩余的行，删除触发器，替换 uuid 列"""
+    index = _uuid_index_name(table)
+    return [
+        f"LOCK TABLES {table.name} WRITE",
+        backfill_sql(table),
+        *(f"DROP TRIGGER IF EXISTS {name}" for name in _trigger_names(table)),
+        f"ALTER TABLE {table.name} DROP INDEX {index}, DROP COLUMN uuid",
+        f"ALTER TABLE {table.name} CHANGE COLUMN {TEMP_COLUMN} uuid BINARY(16) NOT NULL, "
+        f"ADD UNIQUE INDEX {index} (uuid)",
+        "UNLOCK TABLES",
+    ]
+
+
+def migrate_uuid_to_binary(engine, batch_size: int = 10000, dry_run: bool = True) -> List[str]:
+    """把所有 uuid 列迁移为 BINARY(16)，返回（dry_run 时仅生成）执行的 SQL
+
+    回填可在线进行；每张表最后的替换步骤持有写锁，完成后到应用以 UUID_BINARY_STORAGE=true
+    重启之前必须停写（见模块开头的说明）。
+    """
+    if engine.dialect.name != "mysql":
+        raise ValueError("uuid 存储迁移仅支持 MySQL，其他数据库请重建表")
+    statements = []
+    for table in uuid_tables():
+        if _is_binary(engine, table):
+            continue
+        columns = {c["name"] for c in inspect(engine).get_columns(table.name)}
+        steps = ([] if TEMP_COLUMN in columns else [add_column_sql(table)]) + [
+            f"DROP TRIGGER IF EXISTS {name}" for name in _trigger_names(table)
+        ] + trigger_sql(table)
+        statements += steps + [backfill_sql(table, batch_size)] + swap_sql(table)
+        if dry_run:
+            continue
+        with engine.begin() as conn:
+            for sql in steps:
+                conn.execute(text(sql))
+        # 分批回填，每批单独提交，避免大事务
+        filled = 0
+        while True:
+            with engine.begin() as conn:
+                count = conn.execute(text(backfill_sql(table, batch_size))).rowcount
+            if not count:
+                break
+            filled += count
+            logger.info("%s uuid 回填进度: %d", table.name, filled)
+        # LOCK TABLES 与后续语句须在同一连接上执行；ALTER TABLE 隐式提交但不释放表锁
+        with engine.connect() as conn:
+            try:
+                for sql in swap_sql(table)[:-1]:
+                    conn.execute(text(sql))
+                conn.commit()
+            finally:
+                conn.execute(text("UNLOCK TABLES"))
+        logger.info("%s uuid 已迁移为 BINARY(16)", table.name)
+    return statements
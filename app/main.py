@@ -1,16 +1,69 @@
 # app/main.py
-from fastapi import FastAPI
+import asyncio
+from fastapi import FastAPI, HTTPException
+from app.core.config import settings
 from app.core.init_db import init_database
-from app.routes import user
+from app.core.hashing import shutdown_hash_pool, get_hash_pool_stats
+from app.core.database import SessionLocal, dispose_async_engine, engine
+from app.core.bloom import identifier_filter
+from app.core.admission import AdmissionControlMiddleware, get_admission_stats
+from app.core.user_cache import user_cache
+from app.core.sql_metrics import SQLMetricsMiddleware, sql_metrics
+from app.core.counters import run_reconcile_loop
+from app.services.record_archive import run_archive_loop
+from app.services.record_purge import run_purge_loop
+from app.core.index_advisor import index_advisor
+from app.models import Base
+from app.routes import user, record
 
 app = FastAPI(title="记账应用API", version="1.0.0")
+app.add_middleware(SQLMetricsMiddleware)
+app.add_middleware(AdmissionControlMiddleware)
 app.include_router(user.users_router)
+app.include_router(record.records_router)
 
 @app.on_event("startup")
 async def startup_event():
     """应用启动时初始化数据库"""
     init_database()
+    with SessionLocal() as db:
+        identifier_filter.rebuild(db)
+    if settings.COUNTER_RECONCILE_INTERVAL_SECONDS > 0:
+        app.state.counter_reconcile_task = asyncio.create_task(
+            run_reconcile_loop(settings.COUNTER_RECONCILE_INTERVAL_SECONDS)
+        )
+    if settings.ARCHIVE_INTERVAL_SECONDS > 0:
+        app.state.archive_task = asyncio.create_task(run_archive_loop(settings.ARCHIVE_INTERVAL_SECONDS))
+    if settings.SOFT_DELETE_PURGE_INTERVAL_SECONDS > 0:
+        app.state.purge_task = asyncio.create_task(run_purge_loop(settings.SOFT_DELETE_PURGE_INTERVAL_SECONDS))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭时停止后台任务，释放密码哈希进程池和异步连接池"""
+    for name in ("counter_reconcile_task", "archive_task", "purge_task"):
+        task = getattr(app.state, name, None)
+        if task is not None:
+            task.cancel()
+    shutdown_hash_pool()
+    await dispose_async_engine()
 
 @app.get("/")
 async def root():
-    return {"message": "记账应用API服务启动成功！"}
\ No newline at end of file
+    return {"message": "记账应用API服务启动成功！"}
+
+@app.get("/metrics")
+async def metrics():
+    """运行指标"""
+    return {
+        "admission": get_admission_stats(),
+        "user_cache": user_cache.stats(),
+        "password_hash_pool": get_hash_pool_stats(),
+        "sql": sql_metrics.stats(),
+    }
+
+@app.get("/metrics/index-advisor")
+def index_advisor_report():
+    """采集到的查询形状、EXPLAIN 结果与建议的复合索引"""
+    if not settings.INDEX_ADVISOR_ENABLED:
+        raise HTTPException(status_code=404, detail="索引建议未开启")
+    return index_advisor.report(engine, Base.metadata)
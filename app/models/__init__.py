@@ -12,3 +12,9 @@ from .record import Record
 from .admin_log import AdminLog
 from .devices import Device
 from .sync_logs import SyncLog
+from .refresh_token import RefreshToken
+from .schema_meta import SchemaMeta
+from .record_archive import RecordArchiveSegment, RecordArchiveRollup
+from .record_tag import RecordTag, RecordPerson
+from .category_closure import CategoryClosure
+from .record_count import RecordMonthCount
@@ -3,7 +3,7 @@ from sqlalchemy import Column, String, Integer, Text, ForeignKey, Enum,Boolean,D
 from sqlalchemy.types import DECIMAL  # 修改这行
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-from .base import BaseModel
+from .base import BaseModel, uuid_column
 import enum
 
 
@@ -18,7 +18,7 @@ class Account(BaseModel):
     __table_args__ = {'comment': '账本表'}
 
     id = Column(Integer, primary_key=True, index=True)
-    uuid = Column(String(36), unique=True, nullable=False, index=True)
+    uuid = uuid_column()
     
     # 基础信息
     name = Column(String(100), nullable=False, comment="账本名称")
@@ -40,7 +40,6 @@ class Account(BaseModel):
     # 创建者
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, comment="创建者ID")
     version = Column(Integer, default=1, comment="版本")
-    is_deleted = Column(Boolean, default=False, comment="是否删除")
 
     created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now(), comment="更新时间")
@@ -2,7 +2,7 @@
 from sqlalchemy import Column, Integer, ForeignKey, Enum, DateTime, String, Boolean
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-from .base import BaseModel
+from .base import BaseModel, uuid_column
 import enum
 
 class MemberRole(enum.Enum):
@@ -23,7 +23,7 @@ class AccountMember(BaseModel):
     __table_args__ = {'comment': '账本成员表'}
 
     id = Column(Integer, primary_key=True, index=True)
-    uuid = Column(String(36), unique=True, nullable=False, index=True)
+    uuid = uuid_column()
     
     account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False, comment="账本ID")
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, comment="用户ID")
@@ -37,7 +37,6 @@ class AccountMember(BaseModel):
     accepted_at = Column(DateTime(timezone=True), nullable=True, comment="接受时间")
 
     version = Column(Integer, default=1, comment="版本")
-    is_deleted = Column(Boolean, default=False, comment="是否删除")
     joined_at = Column(DateTime(timezone=True), server_default=func.now(), comment="加入时间")
     
     # 关系
@@ -1,6 +1,7 @@
 # app/models/admin_log.py
 from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Text, JSON
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from .base import BaseModel
 
 class AdminLog(BaseModel):
@@ -1,7 +1,62 @@
-from sqlalchemy import Column, Integer, DateTime, Boolean
+import uuid
+from sqlalchemy import Column, Integer, DateTime, Boolean, Index, String, BINARY, text
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.sql import func
+from sqlalchemy.sql.functions import now
+from sqlalchemy.types import TypeDecorator
+from app.core.config import settings
+from app.core.uuid7 import uuid7_str
 from . import Base
 
+@compiles(now, "sqlite")
+def _sqlite_now(element, compiler, **kw):
+    # SQLite 的 CURRENT_TIMESTAMP 只精确到秒，且格式与 SQLAlchemy 写入的 DateTime
+    # （带 6 位微秒）不同，文本比较会出错；统一为同一格式（毫秒精度）
+    return "STRFTIME('%Y-%m-%d %H:%M:%f000', 'NOW')"
+
+class UUIDType(TypeDecorator):
+    """uuid 列：默认 CHAR(36) 字符串；UUID_BINARY_STORAGE 开启时存为 BINARY(16)
+
+    两种存储对应用层都表现为标准字符串（xxxxxxxx-xxxx-...），转换只发生在读写数据库时。
+    """
+    impl = String(36)
+    cache_ok = True
+
+    def __init__(self, binary: bool = None):
+        super().__init__()
+        self.binary = settings.UUID_BINARY_STORAGE if binary is None else binary
+
+    def load_dialect_impl(self, dialect):
+        return dialect.type_descriptor(BINARY(16) if self.binary else String(36))
+
+    def process_bind_param(self, value, dialect):
+        if value is None or not self.binary:
+            return None if value is None else str(value)
+        if not isinstance(value, uuid.UUID):
+            value = uuid.UUID(str(value))
+        return value.bytes
+
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, str):
+            return value
+        return str(uuid.UUID(bytes=bytes(value)))
+
+def uuid_column() -> Column:
+    """业务 uuid 列：唯一索引，默认按 UUIDv7 生成（时间有序）"""
+    return Column(UUIDType(), unique=True, nullable=False, index=True, default=uuid7_str)
+
+def live_index(name: str, *columns: str) -> Index:
+    """只服务未删除数据的复合索引
+
+    SQLite/PostgreSQL 建部分索引（已删除的行不进入索引）；MySQL 不支持部分索引，
+    is_deleted 作为首列，查询条件 is_deleted = false 仍能走索引前缀。
+    """
+    return Index(
+        name, "is_deleted", *columns,
+        sqlite_where=text("is_deleted = 0"),
+        postgresql_where=text("is_deleted = false"),
+    )
+
 class BaseModel(Base):
     __abstract__ = True
     
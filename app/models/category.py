@@ -2,14 +2,14 @@
 from sqlalchemy import Column, String, DateTime, Integer, Numeric, ForeignKey, Text, Boolean
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-from .base import BaseModel
+from .base import BaseModel, uuid_column
 
 class Category(BaseModel):
     __tablename__ = "categories"
     __table_args__ = {'comment': '分类表（三级分类）'}
 
     id = Column(Integer, primary_key=True, index=True)
-    uuid = Column(String(36), unique=True, nullable=False, index=True)
+    uuid = uuid_column()
 
     # 基础信息
     name = Column(String(100), nullable=False, comment="分类名称")
@@ -35,7 +35,6 @@ class Category(BaseModel):
     total_amount = Column(Numeric(12, 2), default=0, comment="总计数据")
 
     version = Column(Integer, default=1, comment="版本")
-    is_deleted = Column(Boolean, default=False, comment="是否删除")
 
     created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now(), comment="更新时间")
@@ -0,0 +1,15 @@
+# app/models/category_closure.py
+from sqlalchemy import Column, Integer, ForeignKey, Index
+from . import Base
+
+class CategoryClosure(Base):
+    """分类闭包表：每对 (祖先, 后代) 一行，含自身（depth=0），由分类写入时同步维护"""
+    __tablename__ = "category_closure"
+    __table_args__ = (
+        Index("idx_category_closure_descendant", "descendant_id", "ancestor_id"),
+        {'comment': '分类闭包表'},
+    )
+
+    ancestor_id = Column(Integer, ForeignKey("categories.id"), primary_key=True, comment="祖先分类ID")
+    descendant_id = Column(Integer, ForeignKey("categories.id"), primary_key=True, comment="后代分类ID")
+    depth = Column(Integer, nullable=False, comment="层级距离")
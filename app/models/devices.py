@@ -3,7 +3,7 @@ from sqlalchemy import (
     Column, Integer, String, DateTime, ForeignKey
 )
 from sqlalchemy.sql import func
-from .base import BaseModel
+from .base import BaseModel, uuid_column
 
 # --------------------
 # 设备表
@@ -12,7 +12,7 @@ class Device(BaseModel):
     __tablename__ = "devices"
 
     id = Column(Integer, primary_key=True, index=True)
-    uuid = Column(String(36), unique=True, nullable=False, index=True)
+    uuid = uuid_column()
 
     user_id = Column(Integer, ForeignKey("users.id"))
     device_name = Column(String(100))
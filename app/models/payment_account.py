@@ -3,7 +3,7 @@ from sqlalchemy import DateTime, Column, String, Integer, ForeignKey, Enum, Bool
 from sqlalchemy.orm import relationship
 from sqlalchemy.types import DECIMAL
 from sqlalchemy.sql import func
-from .base import BaseModel
+from .base import BaseModel, uuid_column
 import enum    
 
 class PaymentAccountType(enum.Enum):
@@ -16,7 +16,7 @@ class PaymentAccount(BaseModel):
     __table_args__ = {'comment': '支付账户表'}
 
     id = Column(Integer, primary_key=True, index=True)
-    uuid = Column(String(36), unique=True, nullable=False, index=True)
+    uuid = uuid_column()
     
     name = Column(String(100), nullable=False, comment="账户名称")
     account_type = Column(Enum(PaymentAccountType), nullable=False, comment="账户类型")
@@ -38,7 +38,6 @@ class PaymentAccount(BaseModel):
     created_by = Column(Integer, ForeignKey("users.id"), comment="创建人")
 
     version = Column(Integer, default=1, comment="版本")
-    is_deleted = Column(Boolean, default=False, comment="是否删除")
 
     created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now(), comment="更新时间")
@@ -1,8 +1,8 @@
 # app/models/record.py
-from sqlalchemy import Column, String, JSON, Integer, ForeignKey, Enum, DateTime, Text, Boolean
+from sqlalchemy import Column, String, JSON, Integer, ForeignKey, Enum, DateTime, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.types import DECIMAL
-from .base import BaseModel
+from .base import BaseModel, live_index, uuid_column
 from sqlalchemy.sql import func
 import enum
 
@@ -13,10 +13,21 @@ class RecordType(enum.Enum):
 
 class Record(BaseModel):
     __tablename__ = "records"
-    __table_args__ = {'comment': '记账记录表'}
+    __table_args__ = (
+        # 只索引未删除的记录：账本内按 (record_date, created_at, id) 键集分页、按日期统计，
+        # 以及按类型+日期筛选
+        live_index("idx_records_live_account_cursor", "account_id", "record_date", "created_at", "id"),
+        live_index("idx_records_live_type_date", "account_id", "record_type", "record_date"),
+        # 清理任务按删除时间扫描已软删除的记录
+        Index("idx_records_deleted_updated", "is_deleted", "updated_at"),
+        # 账单导入按内容哈希去重（含已删除的记录，删掉的导入记录不会被重新导入）；
+        # 唯一索引兜底并发导入同一账单，未导入的记录 hash_value 为空，不受约束
+        Index("idx_records_account_hash", "account_id", "hash_value", unique=True),
+        {'comment': '记账记录表'},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    uuid = Column(String(36), unique=True, nullable=False, index=True)
+    uuid = uuid_column()
     
     record_type = Column(Enum(RecordType), nullable=False, comment="记录类型")
     amount = Column(DECIMAL(15, 2), nullable=False, comment="金额")
@@ -43,10 +54,11 @@ class Record(BaseModel):
     related_people = Column(JSON, nullable=True, comment="关联人员（JSON格式）")
 
     images = Column(JSON, nullable=True, comment="图片URLs（JSON格式）")
-    metadata = Column(JSON, default={}, comment="元数据")
+    # metadata 是 Declarative 保留属性名，数据库列名保持不变
+    extra_metadata = Column("metadata", JSON, default={}, comment="元数据")
 
     version = Column(Integer, default=1, comment="版本")
-    is_deleted = Column(Boolean, default=False, comment="是否删除")
+    hash_value = Column(String(64), nullable=True, comment="SHA256内容哈希（账单导入去重）")
 
     created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now(), comment="更新时间")
@@ -0,0 +1,57 @@
+# app/models/record_archive.py
+from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, LargeBinary, Enum, UniqueConstraint, Index
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import relationship
+from sqlalchemy.types import DECIMAL
+from .base import BaseModel
+from .record import RecordType
+
+# MySQL 的 BLOB 上限 64KB，归档段使用 LONGBLOB
+ArchivePayload = LargeBinary().with_variant(mysql.LONGBLOB(), "mysql")
+
+class RecordArchiveSegment(BaseModel):
+    """冷数据归档段：一个账本一年的记录，压缩后整体存储"""
+    __tablename__ = "record_archive_segments"
+    __table_args__ = (
+        UniqueConstraint("account_id", "year", name="uq_archive_segment_account_year"),
+        {'comment': '记录归档段表'},
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False, comment="账本ID")
+    year = Column(Integer, nullable=False, comment="归档年份")
+
+    record_count = Column(Integer, nullable=False, default=0, comment="记录数")
+    min_date = Column(DateTime(timezone=True), nullable=True, comment="最早记录日期")
+    max_date = Column(DateTime(timezone=True), nullable=True, comment="最晚记录日期")
+
+    codec = Column(String(20), nullable=False, default="zlib-json", comment="编码格式")
+    payload = Column(ArchivePayload, nullable=False, comment="压缩后的记录数据")
+    checksum = Column(String(64), nullable=False, comment="payload 的 SHA-256")
+
+    rollups = relationship("RecordArchiveRollup", back_populates="segment", cascade="all, delete-orphan")
+
+class RecordArchiveRollup(BaseModel):
+    """归档段的按月汇总：统计与计数对账无需解压归档段"""
+    __tablename__ = "record_archive_rollups"
+    __table_args__ = (
+        Index("idx_archive_rollup_account_month", "account_id", "month"),
+        {'comment': '归档记录月度汇总表'},
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    segment_id = Column(Integer, ForeignKey("record_archive_segments.id"), nullable=False, index=True, comment="归档段ID")
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False, comment="账本ID")
+    month = Column(String(7), nullable=False, comment="月份(YYYY-MM)")
+    record_type = Column(Enum(RecordType), nullable=False, comment="记录类型")
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=True, index=True, comment="分类ID")
+    creator_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True, comment="创建者ID")
+
+    record_count = Column(Integer, nullable=False, default=0, comment="记录数")
+    total_amount = Column(DECIMAL(15, 2), nullable=False, default=0, comment="金额合计")
+    max_amount = Column(DECIMAL(15, 2), nullable=True, comment="最大单笔金额")
+    min_amount = Column(DECIMAL(15, 2), nullable=True, comment="最小单笔金额")
+
+    segment = relationship("RecordArchiveSegment", back_populates="rollups")
@@ -0,0 +1,14 @@
+# app/models/record_count.py
+from sqlalchemy import Column, String, Integer, Enum
+from . import Base
+from .record import RecordType
+
+class RecordMonthCount(Base):
+    """账本按 (月份, 类型) 的记录数（含归档记录），随记录写入增量维护，用于分页总数"""
+    __tablename__ = "record_month_counts"
+    __table_args__ = {'comment': '记录月度计数表'}
+
+    account_id = Column(Integer, primary_key=True, comment="账本ID")
+    month = Column(String(7), primary_key=True, comment="月份 YYYY-MM")
+    record_type = Column(Enum(RecordType), primary_key=True, comment="记录类型")
+    record_count = Column(Integer, nullable=False, default=0, comment="记录数")
@@ -0,0 +1,40 @@
+# app/models/record_tag.py
+from sqlalchemy import Column, String, Integer, DateTime, Enum, Index
+from sqlalchemy.types import DECIMAL
+from . import Base
+from .record import RecordType
+
+# 倒排索引由 Record.tags / Record.related_people 派生，写入时同步维护。
+# record_id 不建外键：记录归档后索引行保留，标签统计仍包含归档数据。
+
+class RecordTag(Base):
+    """记录标签倒排索引（冗余金额和日期，统计无需回表）"""
+    __tablename__ = "record_tags"
+    __table_args__ = (
+        Index("idx_record_tags_account_tag_date", "account_id", "tag", "record_date"),
+        {'comment': '记录标签索引表'},
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    record_id = Column(Integer, nullable=False, index=True, comment="记录ID")
+    account_id = Column(Integer, nullable=False, comment="账本ID")
+    tag = Column(String(50), nullable=False, comment="标签")
+    record_type = Column(Enum(RecordType), nullable=False, comment="记录类型")
+    amount = Column(DECIMAL(15, 2), nullable=False, comment="金额")
+    record_date = Column(DateTime(timezone=True), nullable=False, comment="记录日期")
+
+class RecordPerson(Base):
+    """记录关联人员倒排索引"""
+    __tablename__ = "record_people"
+    __table_args__ = (
+        Index("idx_record_people_account_person_date", "account_id", "person", "record_date"),
+        {'comment': '记录关联人员索引表'},
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    record_id = Column(Integer, nullable=False, index=True, comment="记录ID")
+    account_id = Column(Integer, nullable=False, comment="账本ID")
+    person = Column(String(50), nullable=False, comment="关联人员")
+    record_type = Column(Enum(RecordType), nullable=False, comment="记录类型")
+    amount = Column(DECIMAL(15, 2), nullable=False, comment="金额")
+    record_date = Column(DateTime(timezone=True), nullable=False, comment="记录日期")
@@ -0,0 +1,21 @@
+# app/models/refresh_token.py
+from sqlalchemy import Column, String, Integer, ForeignKey, DateTime
+from sqlalchemy.orm import relationship
+from .base import BaseModel
+
+class RefreshToken(BaseModel):
+    __tablename__ = "refresh_tokens"
+    __table_args__ = {'comment': '刷新令牌表'}
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True, comment="用户ID")
+    # 只保存令牌的 SHA-256 摘要，不保存明文
+    token_hash = Column(String(64), unique=True, nullable=False, index=True, comment="令牌摘要")
+    # 同一次登录轮换出的令牌属于同一族，检测到重用时整族吊销
+    family_id = Column(String(32), nullable=False, index=True, comment="令牌族ID")
+
+    expires_at = Column(DateTime(timezone=True), nullable=False, comment="过期时间")
+    revoked_at = Column(DateTime(timezone=True), nullable=True, comment="吊销时间")
+
+    user = relationship("User")
@@ -0,0 +1,13 @@
+# app/models/schema_meta.py
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.sql import func
+from . import Base
+
+class SchemaMeta(Base):
+    """数据库元信息（键值表）：保存 schema 指纹、初始化锁等"""
+    __tablename__ = "schema_meta"
+    __table_args__ = {'comment': '数据库元信息表'}
+
+    name = Column(String(50), primary_key=True, comment="键")
+    value = Column(String(128), nullable=False, comment="值")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), comment="更新时间")
@@ -1,7 +1,7 @@
 # app/models/user.py
 from sqlalchemy import Column, String, Integer, Enum, DateTime, Text,Boolean
 from sqlalchemy.orm import relationship
-from .base import BaseModel
+from .base import BaseModel, uuid_column
 import enum
 from sqlalchemy.sql import func
 
@@ -24,7 +24,7 @@ class User(BaseModel):
     __table_args__ = {'comment': '用户表'}
 
     id = Column(Integer, primary_key=True, index=True)
-    uuid = Column(String(36), unique=True, nullable=False, index=True)
+    uuid = uuid_column()
     
     username = Column(String(50), unique=True, index=True, nullable=False, comment="用户名")
     email = Column(String(100), unique=True, index=True, nullable=True, comment="邮箱")
@@ -42,7 +42,6 @@ class User(BaseModel):
     member_expires_at = Column(DateTime(timezone=True), nullable=True, comment="会员到期时间")
     
     version = Column(Integer, default=1, comment="版本")
-    is_deleted = Column(Boolean, default=False, comment="是否删除")
 
     created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now(), comment="更新时间")
@@ -0,0 +1,247 @@
+import asyncio
+import json
+import logging
+from tempfile import SpooledTemporaryFile
+from typing import AsyncIterator, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import select, or_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.security import get_current_user_async
+from app.core.user_cache import UserSnapshot
+from app.models.account import Account
+from app.models.account_member import AccountMember, MemberRole, InviteStatus
+from app.schemas.records import RecordCreate, RecordUpdate, RecordBulkOperation
+from app.services.record_batch import batch_operations
+from app.services.record_import import get_mapping, iter_statement_chunks, import_rows
+
+logger = logging.getLogger(__name__)
+
+records_router = APIRouter(prefix="/records", tags=["records"])
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# 长度前缀格式：每项为 4 字节大端无符号长度 + UTF-8 JSON
+LENGTH_PREFIXED_MEDIA_TYPE = "application/octet-stream"
+
+
+class _BodyError(Exception):
+    """请求体格式错误，无法继续解析后续内容"""
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """边读请求体边返回结果的流式响应
+
+    请求体由响应迭代器自己读取；StreamingResponse 默认另起任务监听断开，
+    会与迭代器争抢 receive 消息、吞掉请求体，这里不再监听（断开时读取请求体会抛出 ClientDisconnect）。
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+async def _ndjson_items(stream: AsyncIterator[bytes], max_bytes: int) -> AsyncIterator[bytes]:
+    buffer = bytearray()
+    async for chunk in stream:
+        buffer += chunk
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            if end - start > max_bytes:
+                raise _BodyError(f"单行超过 {max_bytes} 字节")
+            yield bytes(buffer[start:end])
+            start = end + 1
+        del buffer[:start]
+        if len(buffer) > max_bytes:
+            raise _BodyError(f"单行超过 {max_bytes} 字节")
+    if buffer.strip():
+        yield bytes(buffer)
+
+
+async def _length_prefixed_items(stream: AsyncIterator[bytes], max_bytes: int) -> AsyncIterator[bytes]:
+    buffer = bytearray()
+    async for chunk in stream:
+        buffer += chunk
+        while len(buffer) >= 4:
+            size = int.from_bytes(buffer[:4], "big")
+            if size > max_bytes:
+                raise _BodyError(f"单条超过 {max_bytes} 字节")
+            if len(buffer) < 4 + size:
+                break
+            yield bytes(buffer[4:4 + size])
+            del buffer[:4 + size]
+    if buffer:
+        raise _BodyError("请求体不完整")
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in item['loc']) or 'data'}: {item['msg']}"
+                     for item in error.errors())
+
+
+def _parse_operation(raw: bytes) -> dict:
+    """一行/一帧 -> batch_operations 的操作；不带 op/data 的对象视为要新增的记录本身"""
+    try:
+        item = json.loads(raw)
+    except ValueError:
+        raise ValueError("JSON 格式错误")
+    if isinstance(item, dict) and "op" not in item and "data" not in item:
+        item = {"op": "create", "data": item}
+    try:
+        operation = RecordBulkOperation.model_validate(item)
+        if operation.op != "create" and operation.id is None:
+            raise ValueError("缺少记录ID")
+        data = None
+        if operation.op != "delete":
+            schema = RecordCreate if operation.op == "create" else RecordUpdate
+            data = schema.model_validate(operation.data or {}).model_dump(exclude_unset=True)
+    except ValidationError as e:
+        raise ValueError(_validation_message(e))
+    return {"op": operation.op, "id": operation.id, "data": data}
+
+
+def _check_write_access(db: Session, account_id: int, user_id: int):
+    """账本所有者或已加入的管理员/编辑成员才能写入记录"""
+    allowed = db.scalar(select(Account.id).where(Account.id == account_id, or_(
+        Account.owner_id == user_id,
+        Account.id.in_(select(AccountMember.account_id).where(
+            AccountMember.user_id == user_id,
+            AccountMember.invite_status == InviteStatus.ACCEPTED,
+            AccountMember.role.in_([MemberRole.ADMIN, MemberRole.EDITOR]),
+        )),
+    )))
+    if allowed is None:
+        raise HTTPException(status_code=404, detail="账本不存在或无写入权限")
+
+
+def _result_line(result: dict) -> bytes:
+    return json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+@records_router.post(":bulk", response_class=StreamingResponse)
+async def bulk_records(request: Request, account_id: int = Query(..., description="账本ID"),
+                       current_user: UserSnapshot = Depends(get_current_user_async)):
+    """批量写入记录（NDJSON 或长度前缀格式的流式请求体）
+
+    每行为 {"op": "create"|"update"|"delete", "id": ..., "data": {...}}，也可直接是一条要新增的记录。
+    边读边校验，每 RECORD_BULK_CHUNK_SIZE 条提交一次，逐行流式返回结果：
+    {"line": 行号, "success": ..., "id"/"error": ...}，最后一行为 {"summary": {...}}。
+    已提交的块不会因后续行出错而回滚；请求体格式错误或数据库写入失败时 summary 带 error，
+    summary.chunks 为已提交的块数，失败块及之后的内容均未写入。
+    """
+    async with AsyncSessionLocal(info={"use_primary": True}) as db:
+        await db.run_sync(_check_write_access, account_id, current_user.id)
+
+    content_type = request.headers.get("content-type", NDJSON_MEDIA_TYPE).split(";")[0].strip()
+    reader = _length_prefixed_items if content_type == LENGTH_PREFIXED_MEDIA_TYPE else _ndjson_items
+    chunk_size = settings.RECORD_BULK_CHUNK_SIZE
+
+    async def results():
+        summary = {"total": 0, "succeeded": 0, "failed": 0, "chunks": 0}
+        # 当前块中按行号排列的待输出项：(行号, 操作或 None, 解析错误)
+        pending: List[tuple] = []
+
+        async def flush(db):
+            operations = [operation for _, operation, _ in pending if operation is not None]
+            outcomes = iter((await db.run_sync(batch_operations, account_id, current_user.id, operations))["results"]
+                            if operations else ())
+            lines = []
+            for line, operation, error in pending:
+                if operation is None:
+                    result = {"line": line, "success": False, "error": error}
+                else:
+                    outcome = next(outcomes)
+                    result = {"line": line, "op": outcome["op"], "success": outcome["success"]}
+                    result.update({"id": outcome["id"]} if outcome["success"] else {"error": outcome["error"]})
+                summary["succeeded" if result["success"] else "failed"] += 1
+                lines.append(_result_line(result))
+            summary["chunks"] += 1 if operations else 0
+            pending.clear()
+            return b"".join(lines)
+
+        async with AsyncSessionLocal(info={"use_primary": True, "user_id": current_user.id}) as db:
+            line = 0
+            error: Optional[str] = None
+            try:
+                try:
+                    async for raw in reader(request.stream(), settings.RECORD_BULK_MAX_ITEM_BYTES):
+                        line += 1
+                        if not raw.strip():
+                            continue
+                        summary["total"] += 1
+                        try:
+                            pending.append((line, _parse_operation(raw), None))
+                        except ValueError as e:
+                            pending.append((line, None, str(e)))
+                        if len(pending) >= chunk_size:
+                            yield await flush(db)
+                except _BodyError as e:
+                    error = str(e)
+                if pending:
+                    yield await flush(db)
+            except SQLAlchemyError:
+                # 本块已回滚，之前的块已提交；仍然返回 summary，客户端据 chunks 判断写入到哪一块
+                logger.exception("账本 %s 流式批量写入失败", account_id)
+                await db.rollback()
+                error = f"数据库写入失败，第 {summary['chunks'] + 1} 块及之后的内容未写入"
+        if error:
+            summary["error"] = error
+        yield _result_line({"summary": summary})
+
+    return DuplexStreamingResponse(results(), media_type=NDJSON_MEDIA_TYPE)
+
+
+@records_router.post(":import", response_class=StreamingResponse)
+async def import_statement(request: Request, account_id: int = Query(..., description="账本ID"),
+                           payment_account_id: int = Query(..., description="导入到的支付账户ID"),
+                           source: str = Query(..., description="账单来源：alipay / wechat / bank"),
+                           file_format: str = Query("csv", pattern="^(csv|xlsx)$"),
+                           category_id: Optional[int] = Query(None, description="导入记录的默认分类"),
+                           current_user: UserSnapshot = Depends(get_current_user_async)):
+    """导入银行/支付宝/微信账单（请求体为文件内容）
+
+    按内容哈希跳过已导入的行，每 IMPORT_CHUNK_SIZE 行提交一次，逐块流式返回累计进度：
+    {"progress": {...}, "errors": [...]}，最后一行为 {"summary": {...}}。
+    """
+    mapping = get_mapping(source)
+    async with AsyncSessionLocal(info={"use_primary": True}) as db:
+        await db.run_sync(_check_write_access, account_id, current_user.id)
+
+    # 请求体先暂存（超过 1MB 写入磁盘），XLSX 需要可随机访问的文件
+    spool = SpooledTemporaryFile(max_size=1024 * 1024)
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > settings.IMPORT_MAX_BYTES:
+            spool.close()
+            raise HTTPException(status_code=413, detail="账单文件过大")
+        spool.write(chunk)
+    spool.seek(0)
+
+    async def results():
+        summary = {"rows": 0, "imported": 0, "skipped": 0, "failed": 0}
+        chunks = iter_statement_chunks(spool, mapping, file_format)
+        try:
+            async with AsyncSessionLocal(info={"use_primary": True, "user_id": current_user.id}) as db:
+                while True:
+                    # 解析在线程中进行，不阻塞事件循环
+                    rows = await asyncio.to_thread(next, chunks, None)
+                    if rows is None:
+                        break
+                    result = await db.run_sync(import_rows, account_id, current_user.id, payment_account_id,
+                                               rows, mapping.name, category_id)
+                    for key in summary:
+                        summary[key] += result[key]
+                    yield _result_line({"progress": summary, "errors": result["errors"]})
+        except HTTPException as e:
+            summary["error"] = e.detail
+        finally:
+            spool.close()
+        yield _result_line({"summary": summary})
+
+    return StreamingResponse(results(), media_type=NDJSON_MEDIA_TYPE)
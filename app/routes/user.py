@@ -1,105 +1,184 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app.core.database import SessionLocal
+from app.core.database import AsyncSessionLocal, AsyncUnitOfWork, get_async_write_uow
 from app.models.user import User, UserLevel, UserStatus
-from app.schemas.users import UserCreate, UserLogin, UserUpdate, ResetPassword, Token
-from app.core.security import get_password_hash, verify_password, create_access_token, SUPER_VERIFICATION_CODE
+from app.schemas.users import UserCreate, UserLogin, UserUpdate, ResetPassword, Token, RefreshTokenRequest
+from app.core.security import (
+    get_password_hash_async, verify_password_async, create_user_access_token, get_current_user_async,
+    create_refresh_token, rotate_refresh_token, revoke_refresh_token, revoke_user_refresh_tokens,
+    SUPER_VERIFICATION_CODE
+)
+from app.core.user_cache import UserSnapshot
+from app.core.bloom import identifier_filter
+from app.core.uuid7 import uuid7
 
 users_router = APIRouter(prefix="/users", tags=["users"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # 模拟验证码验证（开发阶段支持超级验证码）
 def verify_code(code: str) -> bool:
     return code == SUPER_VERIFICATION_CODE
 
-# 注册
-@users_router.post("/register", response_model=Token)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    if not (user.email or user.phone):
-        raise HTTPException(status_code=400, detail="必须提供邮箱或手机号")
-    if not verify_code(user.verification_code):
-        raise HTTPException(status_code=400, detail="验证码错误")
-
-    query = db.query(User)
-    if user.email:
-        if query.filter(User.email == user.email).first():
-            raise HTTPException(status_code=400, detail="邮箱已被注册")
-    if user.phone:
-        if query.filter(User.phone == user.phone).first():
-            raise HTTPException(status_code=400, detail="手机号已被注册")
-
+# 用户路由使用异步会话，数据库等待不占用线程；同步的查询逻辑通过 run_sync 复用
+# 认证相关读写都要求强一致，统一走主库
+# 注册、登录、找回密码：bcrypt 在进程池中执行，数据库会话只在哈希完成后才短暂占用
+def _check_identifier_taken(db: Session, email, phone):
+    """一次查询同时检查邮箱和手机号"""
+    conditions = []
+    if email:
+        conditions.append(User.email == email)
+    if phone:
+        conditions.append(User.phone == phone)
+    # 唯一索引同样约束已软删除的用户
+    taken = db.query(User.email, User.phone).execution_options(include_deleted=True).filter(or_(*conditions)).first()
+    if taken is None:
+        return
+    if email and taken.email == email:
+        raise HTTPException(status_code=400, detail="邮箱已被注册")
+    raise HTTPException(status_code=400, detail="手机号已被注册")
+
+def _duplicate_detail(error: IntegrityError):
+    """把唯一索引冲突翻译为与预检查一致的错误信息"""
+    message = str(error.orig).lower()
+    if "email" in message:
+        return "邮箱已被注册"
+    if "phone" in message:
+        return "手机号已被注册"
+    return None
+
+def _create_user(db: Session, user: UserCreate, password_hash: str):
+    user_uuid = uuid7()
     new_user = User(
+        uuid=str(user_uuid),
+        # UUIDv7 的前半部分是时间戳，取随机的后半部分生成用户名
+        username=f"user_{user_uuid.hex[-16:]}",
         email=user.email,
         phone=user.phone,
-        password_hash=get_password_hash(user.password),
+        password_hash=password_hash,
         user_level=UserLevel.FREE,
         user_status=UserStatus.ACTIVE
     )
     db.add(new_user)
+    try:
+        db.flush()
+    except IntegrityError as e:
+        db.rollback()
+        detail = _duplicate_detail(e)
+        if detail is None:
+            raise
+        raise HTTPException(status_code=400, detail=detail)
+    refresh_token = create_refresh_token(db, new_user.id)
     db.commit()
-    db.refresh(new_user)
+    identifier_filter.add(user.email, user.phone)
+    return new_user, refresh_token
+
+@users_router.post("/register", response_model=Token)
+async def register(user: UserCreate):
+    if not (user.email or user.phone):
+        raise HTTPException(status_code=400, detail="必须提供邮箱或手机号")
+    if not verify_code(user.verification_code):
+        raise HTTPException(status_code=400, detail="验证码错误")
+
+    # 过滤器判定"一定未注册"时跳过预检查；预检查只是为了在哈希前尽早拒绝，
+    # 最终以唯一索引为准，并发注册同样会得到 400
+    if identifier_filter.might_be_taken(user.email, user.phone):
+        async with AsyncSessionLocal(info={"use_primary": True}) as db:
+            await db.run_sync(_check_identifier_taken, user.email, user.phone)
 
-    token = create_access_token({"sub": new_user.username})
-    return Token(access_token=token)
+    password_hash = await get_password_hash_async(user.password)
+    async with AsyncSessionLocal(info={"use_primary": True}) as db:
+        new_user, refresh_token = await db.run_sync(_create_user, user, password_hash)
+
+    token = create_user_access_token(new_user)
+    return Token(access_token=token, refresh_token=refresh_token)
+
+def _get_user_by_identifier(db: Session, email, phone):
+    query = db.query(User)
+    db_user = None
+    if email:
+        db_user = query.filter(User.email == email).first()
+    elif phone:
+        db_user = query.filter(User.phone == phone).first()
+    return db_user
+
+def _issue_refresh_token(db: Session, user_id: int) -> str:
+    refresh_token = create_refresh_token(db, user_id)
+    db.commit()
+    return refresh_token
 
 # 登录
 @users_router.post("/login", response_model=Token)
-def login(user: UserLogin, db: Session = Depends(get_db)):
+async def login(user: UserLogin):
     if not (user.email or user.phone):
         raise HTTPException(status_code=400, detail="必须提供邮箱或手机号")
 
-    query = db.query(User)
-    db_user = None
-    if user.email:
-        db_user = query.filter(User.email == user.email).first()
-    elif user.phone:
-        db_user = query.filter(User.phone == user.phone).first()
+    # 查询完成即释放连接，再进行密码校验
+    async with AsyncSessionLocal(info={"use_primary": True}) as db:
+        db_user = await db.run_sync(_get_user_by_identifier, user.email, user.phone)
 
-    if not db_user or not verify_password(user.password, db_user.password_hash):
+    if not db_user or not await verify_password_async(user.password, db_user.password_hash):
         raise HTTPException(status_code=400, detail="邮箱/手机号或密码错误")
 
-    token = create_access_token({"sub": db_user.username})
-    return Token(access_token=token)
+    async with AsyncSessionLocal(info={"use_primary": True}) as db:
+        refresh_token = await db.run_sync(_issue_refresh_token, db_user.id)
+    token = create_user_access_token(db_user)
+    return Token(access_token=token, refresh_token=refresh_token)
+
+# 刷新令牌：轮换刷新令牌并签发新的访问令牌，不做密码校验
+@users_router.post("/token/refresh", response_model=Token)
+async def refresh_token(data: RefreshTokenRequest, uow: AsyncUnitOfWork = Depends(get_async_write_uow)):
+    user, new_refresh_token = await uow.session.run_sync(rotate_refresh_token, data.refresh_token)
+    await uow.release()
+    token = create_user_access_token(user)
+    return Token(access_token=token, refresh_token=new_refresh_token)
+
+# 吊销刷新令牌（退出登录）
+@users_router.post("/token/revoke", response_model=dict)
+async def revoke_token(data: RefreshTokenRequest, uow: AsyncUnitOfWork = Depends(get_async_write_uow)):
+    await uow.session.run_sync(revoke_refresh_token, data.refresh_token)
+    return {"msg": "已退出登录"}
 
 # 修改用户资料
 @users_router.put("/profile", response_model=dict)
-def update_profile(update: UserUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_db)):
-    # 这里可用 OAuth2 获取 current_user
-    # 简化示例，不加 OAuth2
-    user = db.query(User).first()  # 临时取第一个用户
+async def update_profile(update: UserUpdate, uow: AsyncUnitOfWork = Depends(get_async_write_uow), current_user: UserSnapshot = Depends(get_current_user_async)):
+    user = await uow.session.get(User, current_user.id)
     if not user:
         raise HTTPException(status_code=404, detail="用户不存在")
 
     for field, value in update.dict(exclude_none=True).items():
         setattr(user, field, value)
-    db.commit()
-    db.refresh(user)
+    await uow.commit()
     return {"msg": "资料更新成功"}
 
+def _update_password(db: Session, email, phone, password_hash: str) -> bool:
+    query = db.query(User)
+    user = None
+    if email:
+        user = query.filter(User.email == email).first()
+    elif phone:
+        user = query.filter(User.phone == phone).first()
+
+    if not user:
+        return False
+
+    user.password_hash = password_hash
+    # 重置密码后所有已签发的刷新令牌失效
+    revoke_user_refresh_tokens(db, user.id)
+    db.commit()
+    return True
+
 # 找回密码
 @users_router.post("/reset-password", response_model=dict)
-def reset_password(data: ResetPassword, db: Session = Depends(get_db)):
+async def reset_password(data: ResetPassword):
     if not (data.email or data.phone):
         raise HTTPException(status_code=400, detail="必须提供邮箱或手机号")
     if not verify_code(data.verification_code):
         raise HTTPException(status_code=400, detail="验证码错误")
 
-    query = db.query(User)
-    user = None
-    if data.email:
-        user = query.filter(User.email == data.email).first()
-    elif data.phone:
-        user = query.filter(User.phone == data.phone).first()
-
-    if not user:
+    password_hash = await get_password_hash_async(data.new_password)
+    async with AsyncSessionLocal(info={"use_primary": True}) as db:
+        updated = await db.run_sync(_update_password, data.email, data.phone, password_hash)
+    if not updated:
         raise HTTPException(status_code=404, detail="用户不存在")
-
-    user.password_hash = get_password_hash(data.new_password)
-    db.commit()
     return {"msg": "密码重置成功"}
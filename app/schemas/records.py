@@ -0,0 +1,40 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Literal, Optional
+from enum import Enum
+
+class RecordType(str, Enum):
+    INCOME = "income"
+    EXPENSE = "expense"
+    TRANSFER = "transfer"
+
+class RecordUpdate(BaseModel):
+    record_type: Optional[RecordType] = None
+    amount: Optional[Decimal] = Field(None, gt=0, max_digits=15, decimal_places=2)
+    record_date: Optional[datetime] = None
+    description: Optional[str] = None
+    category_id: Optional[int] = None
+    payment_account_id: Optional[int] = None
+    target_payment_account_id: Optional[int] = None
+    transfer_fee: Optional[Decimal] = Field(None, ge=0, max_digits=10, decimal_places=2)
+    tags: Optional[List[str]] = None
+    location: Optional[str] = Field(None, max_length=255)
+    weather: Optional[str] = Field(None, max_length=50)
+    mood: Optional[str] = Field(None, max_length=50)
+    project_name: Optional[str] = Field(None, max_length=100)
+    related_people: Optional[List[str]] = None
+    images: Optional[List[str]] = None
+    metadata: Optional[Dict[str, Any]] = None
+
+class RecordCreate(RecordUpdate):
+    record_type: RecordType
+    amount: Decimal = Field(..., gt=0, max_digits=15, decimal_places=2)
+    record_date: datetime
+    payment_account_id: int
+
+class RecordBulkOperation(BaseModel):
+    """批量写入的一行：op 缺省为 create；修改/删除需要 id"""
+    op: Literal["create", "update", "delete"] = "create"
+    id: Optional[int] = None
+    data: Optional[Dict[str, Any]] = None
@@ -0,0 +1,219 @@
+# app/services/record_archive.py
+import asyncio
+import enum
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import select, delete, extract
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload, defer
+from app.core.config import settings
+from app.core.money import to_cents, from_cents
+from app.core.segment_codec import CODEC, decode_segment, encode_segment
+from app.models.record import Record, RecordType
+from app.models.record_archive import RecordArchiveSegment, RecordArchiveRollup
+
+logger = logging.getLogger(__name__)
+
+records_table = Record.__table__
+
+
+def row_to_dict(row) -> dict:
+    """records 行（Core 查询结果）转为普通字典，枚举转为取值"""
+    return {key: (value.value if isinstance(value, enum.Enum) else value) for key, value in row.items()}
+
+
+class SegmentCache:
+    """解压后的归档段缓存（LRU），归档段只读，按 (ID, 校验和) 缓存即可"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, segment: RecordArchiveSegment) -> List[dict]:
+        key = (segment.id, segment.checksum)
+        with self._lock:
+            rows = self._data.get(key)
+            if rows is not None:
+                self._data.move_to_end(key)
+                return rows
+        rows = decode_segment(segment.payload)
+        # 按日期倒序保存，分页合并时无需再排序
+        rows.sort(key=sort_key, reverse=True)
+        with self._lock:
+            self._data[key] = rows
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+        return rows
+
+
+def sort_key(row: dict):
+    return (row["record_date"], row["created_at"] or datetime.min, row["id"])
+
+
+segment_cache = SegmentCache(settings.ARCHIVE_SEGMENT_CACHE_SIZE)
+
+
+# ---------------------------------------------------------------------------
+# 归档
+# ---------------------------------------------------------------------------
+
+def _month_key(value: datetime) -> str:
+    return value.strftime("%Y-%m")
+
+
+def _build_rollups(segment: RecordArchiveSegment, rows: List[dict]) -> List[RecordArchiveRollup]:
+    groups = {}
+    for row in rows:
+        key = (_month_key(row["record_date"]), row["record_type"], row["category_id"], row["creator_id"])
+        amount = to_cents(row["amount"])
+        group = groups.get(key)
+        if group is None:
+            groups[key] = [1, amount, amount, amount]
+        else:
+            group[0] += 1
+            group[1] += amount
+            group[2] = max(group[2], amount)
+            group[3] = min(group[3], amount)
+    return [
+        RecordArchiveRollup(
+            account_id=segment.account_id, month=month, record_type=RecordType(record_type),
+            category_id=category_id, creator_id=creator_id,
+            record_count=count, total_amount=from_cents(total),
+            max_amount=from_cents(max_amount), min_amount=from_cents(min_amount),
+        )
+        for (month, record_type, category_id, creator_id), (count, total, max_amount, min_amount) in groups.items()
+    ]
+
+
+def closed_year_cutoff(now: Optional[datetime] = None) -> int:
+    """早于返回年份（不含）的年份视为已关闭，可归档：整年都在热数据保留期之外"""
+    now = now or datetime.utcnow()
+    months = now.year * 12 + now.month - 1 - settings.ARCHIVE_HOT_MONTHS
+    return months // 12
+
+
+def archive_year(db: Session, account_id: int, year: int) -> int:
+    """把账本某一年的有效记录移入归档段，返回归档条数
+
+    已存在该年的归档段时（归档后又补录了旧记录）合并后重写。
+    删除走 Core 语句，不触发计数维护：归档记录仍计入账本/分类/用户计数。
+    已软删除的记录留在热表，由清理任务处理。
+    """
+    start, end = datetime(year, 1, 1), datetime(year + 1, 1, 1)
+    rows = [row_to_dict(row) for row in db.execute(
+        select(records_table).where(
+            records_table.c.account_id == account_id,
+            records_table.c.is_deleted == False,
+            records_table.c.record_date >= start,
+            records_table.c.record_date < end,
+        )
+    ).mappings()]
+    if not rows:
+        return 0
+    archived_ids = [row["id"] for row in rows]
+
+    segment = db.execute(
+        select(RecordArchiveSegment)
+        .options(selectinload(RecordArchiveSegment.rollups))
+        .where(RecordArchiveSegment.account_id == account_id, RecordArchiveSegment.year == year)
+        .with_for_update()
+    ).scalar_one_or_none()
+    if segment is None:
+        segment = RecordArchiveSegment(account_id=account_id, year=year, codec=CODEC)
+        db.add(segment)
+    else:
+        rows = decode_segment(segment.payload) + rows
+        segment.rollups.clear()
+
+    rows.sort(key=sort_key, reverse=True)
+    segment.payload, segment.checksum = encode_segment(rows)
+    segment.record_count = len(rows)
+    segment.min_date = rows[-1]["record_date"]
+    segment.max_date = rows[0]["record_date"]
+    segment.rollups.extend(_build_rollups(segment, rows))
+
+    # 按 ID 删除，期间新写入的同年记录不受影响，留待下次归档
+    for i in range(0, len(archived_ids), 1000):
+        db.execute(delete(records_table).where(records_table.c.id.in_(archived_ids[i:i + 1000])))
+    db.commit()
+    return len(archived_ids)
+
+
+def archive_closed_years(db: Session, limit: int = 100) -> Dict[str, int]:
+    """归档所有已关闭年份的热数据，每个 (账本, 年份) 单独提交"""
+    cutoff = closed_year_cutoff()
+    year_column = extract("year", records_table.c.record_date)
+    candidates = db.execute(
+        select(records_table.c.account_id, year_column)
+        .where(records_table.c.is_deleted == False, records_table.c.record_date < datetime(cutoff, 1, 1))
+        .group_by(records_table.c.account_id, year_column)
+        .limit(limit)
+    ).all()
+    db.rollback()
+
+    result = {"segments": 0, "records": 0}
+    for account_id, year in candidates:
+        try:
+            archived = archive_year(db, account_id, int(year))
+        except IntegrityError:
+            # 其他进程同时创建了同一归档段，下次再合并
+            db.rollback()
+            continue
+        if archived:
+            result["segments"] += 1
+            result["records"] += archived
+    if result["records"]:
+        logger.info("归档完成: %s", result)
+    return result
+
+
+def _archive_once() -> Dict[str, int]:
+    from app.core.database import SessionLocal
+    with SessionLocal(info={"use_primary": True}) as db:
+        return archive_closed_years(db)
+
+
+async def run_archive_loop(interval: float):
+    """后台定时归档，在线程中执行以免阻塞事件循环"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(_archive_once)
+        except Exception:
+            logger.exception("记录归档失败")
+
+
+# ---------------------------------------------------------------------------
+# 读取
+# ---------------------------------------------------------------------------
+
+def overlapping_segments(db: Session, account_id: int, date_from: Optional[datetime] = None,
+                         date_to: Optional[datetime] = None) -> List[RecordArchiveSegment]:
+    """与日期范围有交集的归档段（按年份倒序）
+
+    只加载元数据，payload 延迟加载：解压后的段已在缓存中时不再读取压缩数据。
+    """
+    query = (select(RecordArchiveSegment)
+             .options(defer(RecordArchiveSegment.payload))
+             .where(RecordArchiveSegment.account_id == account_id))
+    if date_from is not None:
+        query = query.where(RecordArchiveSegment.max_date >= date_from)
+    if date_to is not None:
+        query = query.where(RecordArchiveSegment.min_date <= date_to)
+    return list(db.scalars(query.order_by(RecordArchiveSegment.year.desc())))
+
+
+def segment_rows(segment: RecordArchiveSegment) -> List[dict]:
+    """归档段内的记录（按日期倒序），结果只读，不要修改"""
+    return segment_cache.get(segment)
+
+
+def segment_covered(segment: RecordArchiveSegment, date_from: Optional[datetime],
+                    date_to: Optional[datetime]) -> bool:
+    """日期范围完整覆盖归档段时，统计可直接使用月度汇总"""
+    return (date_from is None or date_from <= segment.min_date) and \
+        (date_to is None or date_to >= segment.max_date)
@@ -0,0 +1,259 @@
+# app/services/record_batch.py
+import logging
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import select, insert, update, bindparam, func, or_
+from sqlalchemy.orm import Session
+from app.core.counters import CounterDeltas, RECORD_COUNTER_FIELDS
+from app.core.tag_index import reindex_records, update_index_values, has_terms, INDEXED_FIELDS, TERM_FIELDS
+from app.core.uuid7 import uuid7_str
+from app.models.category import Category
+from app.models.payment_account import PaymentAccount
+from app.models.record import RecordType
+from app.services.record_archive import records_table
+
+logger = logging.getLogger(__name__)
+
+# 批量写入：一批操作先在内存中按顺序校验、模拟执行，再按类型和字段组合分组集中写库：
+# - 新增按字段组合分组，每组一条 executemany（支持 RETURNING 的数据库展开为多行 VALUES）；
+# - 修改/删除的目标记录用一次 IN 查询预取（FOR UPDATE），修改按变更字段组合分组 executemany，
+#   纯删除合并为 UPDATE ... WHERE id IN (...)；
+# - 绕过 ORM 刷新事件，计数和标签索引由 CounterDeltas / reindex_records 一次性维护；
+#   没有标签/人员的记录不碰索引表，标签不变只改金额日期的记录原地更新索引行。
+# 每条操作单独返回结果，校验失败的操作不影响同批其他操作。
+
+CREATE, UPDATE, DELETE = "create", "update", "delete"
+
+# 可写入的记录字段（metadata 为数据库列名；hash_value 由账单导入写入，接口 schema 不开放）
+WRITABLE_FIELDS = frozenset((
+    "record_type", "amount", "record_date", "description", "category_id", "payment_account_id",
+    "target_payment_account_id", "transfer_fee", "tags", "location", "weather", "mood",
+    "project_name", "related_people", "images", "metadata", "hash_value",
+))
+REQUIRED_FIELDS = ("record_type", "amount", "record_date", "payment_account_id")
+
+CHUNK_SIZE = 1000
+
+
+def _chunks(items: list, size: int = CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _clean_values(data: Optional[dict], partial: bool) -> dict:
+    """校验并转换字段值，失败时抛出 ValueError（错误信息直接返回给调用方）"""
+    if not isinstance(data, dict) or not data:
+        raise ValueError("缺少记录数据")
+    unknown = set(data) - WRITABLE_FIELDS
+    if unknown:
+        raise ValueError(f"不支持的字段: {', '.join(sorted(unknown))}")
+    values = {}
+    for key, value in data.items():
+        if key == "record_type" and value is not None:
+            try:
+                value = RecordType(value.value if isinstance(value, Enum) else value)
+            except ValueError:
+                raise ValueError("记录类型无效")
+        elif key in ("amount", "transfer_fee") and value is not None:
+            try:
+                value = Decimal(str(value))
+            except InvalidOperation:
+                raise ValueError("金额格式错误")
+            if key == "amount" and value <= 0:
+                raise ValueError("金额必须大于0")
+        elif key == "record_date" and isinstance(value, str):
+            try:
+                value = datetime.fromisoformat(value)
+            except ValueError:
+                raise ValueError("记录日期格式错误")
+        values[key] = value
+    missing = [key for key in REQUIRED_FIELDS if (key in values or not partial) and values.get(key) is None]
+    if missing:
+        raise ValueError(f"缺少必填字段: {', '.join(missing)}")
+    return values
+
+
+class _References:
+    """本批操作引用的支付账户、分类：各一次 IN 查询"""
+
+    def __init__(self, db: Session, account_id: int, parsed: list):
+        payment_ids, category_ids = set(), set()
+        for _, _, _, values in parsed:
+            if values:
+                payment_ids.update(values.get(key) for key in ("payment_account_id", "target_payment_account_id"))
+                category_ids.add(values.get("category_id"))
+        payment_ids.discard(None)
+        category_ids.discard(None)
+        self.payment_accounts = set(db.scalars(select(PaymentAccount.id).where(
+            PaymentAccount.id.in_(payment_ids), PaymentAccount.account_id == account_id
+        ))) if payment_ids else set()
+        self.categories = set(db.scalars(select(Category.id).where(
+            Category.id.in_(category_ids), or_(Category.account_id == account_id, Category.is_system == True)
+        ))) if category_ids else set()
+
+    def check(self, values: dict):
+        payment_accounts = self.payment_accounts
+        for key in ("payment_account_id", "target_payment_account_id"):
+            if key in values and values[key] is not None and values[key] not in payment_accounts:
+                raise ValueError("支付账户不存在")
+        category_id = values.get("category_id")
+        if category_id is not None and category_id not in self.categories:
+            raise ValueError("分类不存在")
+
+
+def _parse(operations: List[dict]) -> Tuple[list, dict]:
+    """逐条解析为 (序号, 操作, 记录ID, 字段值)；解析失败的记为错误结果"""
+    parsed, errors = [], {}
+    for index, operation in enumerate(operations):
+        kind = operation.get("op") if isinstance(operation, dict) else None
+        try:
+            if kind not in (CREATE, UPDATE, DELETE):
+                raise ValueError("不支持的操作类型")
+            record_id = operation.get("id")
+            if kind != CREATE and not isinstance(record_id, int):
+                raise ValueError("缺少记录ID")
+            values = _clean_values(operation.get("data"), kind == UPDATE) if kind != DELETE else None
+            parsed.append((index, kind, record_id, values))
+        except ValueError as e:
+            errors[index] = {"index": index, "op": kind, "success": False, "error": str(e)}
+    return parsed, errors
+
+
+def _prefetch(db: Session, account_id: int, ids: set, fields: set) -> Dict[int, dict]:
+    """一次 IN 查询取出修改/删除的目标记录，并加行锁，计数增量依赖这些旧值
+
+    只取计数、索引和本批修改涉及的列，images、metadata 等 JSON 列不必逐行解析。
+    """
+    c = records_table.c
+    columns = [c[name] for name in sorted({"id", "is_deleted", *RECORD_COUNTER_FIELDS, *INDEXED_FIELDS, *fields})]
+    rows = {}
+    for chunk in _chunks(sorted(ids)):
+        for row in db.execute(
+            select(*columns)
+            .where(c.id.in_(chunk), c.account_id == account_id, c.is_deleted == False)
+            .with_for_update()
+        ).mappings():
+            rows[row["id"]] = dict(row)
+    return rows
+
+
+def _insert_records(db: Session, rows: List[dict]) -> List[int]:
+    """同一字段组合的新增记录批量插入，按参数顺序返回新 ID
+
+    新 ID 按 uuid 对应回参数：要求 RETURNING 保持参数顺序会让 SQLite 退化为逐行插入。
+    """
+    c = records_table.c
+    stmt = insert(records_table)
+    returning = db.get_bind(clause=stmt).dialect.insert_executemany_returning
+    ids = {}
+    for chunk in _chunks(rows):
+        if returning:
+            ids.update(db.execute(stmt.returning(c.uuid, c.id), chunk).all())
+        else:
+            # 不支持 RETURNING 的数据库（MySQL）：executemany 后按 uuid 取回 ID
+            db.execute(stmt, chunk)
+            ids.update(db.execute(select(c.uuid, c.id).where(c.uuid.in_([row["uuid"] for row in chunk]))).all())
+    return [ids[row["uuid"]] for row in rows]
+
+
+def batch_operations(db: Session, account_id: int, creator_id: int, operations: List[dict]) -> Dict[str, Any]:
+    """批量新增/修改/删除记录
+
+    operations 每项为 {"op": "create"|"update"|"delete", "id": 记录ID（修改/删除）, "data": 字段（新增/修改）}，
+    同一批内按顺序生效（例如先改后删）。返回每项的结果以及成功/失败数，成功的操作一并提交。
+    """
+    parsed, results = _parse(operations)
+    references = _References(db, account_id, parsed)
+    original = _prefetch(db, account_id, {record_id for _, kind, record_id, _ in parsed if kind != CREATE},
+                         {key for _, kind, _, values in parsed if kind == UPDATE for key in values})
+
+    # 按顺序在内存中模拟执行，得到每条记录的最终状态
+    state = {record_id: dict(row) for record_id, row in original.items()}
+    changed = defaultdict(set)
+    creates = []
+    for index, kind, record_id, values in parsed:
+        try:
+            if values:
+                references.check(values)
+            if kind == CREATE:
+                creates.append((index, values))
+                continue
+            current = state.get(record_id)
+            if current is None or current["is_deleted"]:
+                raise ValueError("记录不存在")
+            if kind == UPDATE:
+                for key, value in values.items():
+                    if current[key] != value:
+                        current[key] = value
+                        changed[record_id].add(key)
+            else:
+                current["is_deleted"] = True
+                changed[record_id].add("is_deleted")
+            results[index] = {"index": index, "op": kind, "success": True, "id": record_id}
+        except ValueError as e:
+            results[index] = {"index": index, "op": kind, "success": False, "error": str(e)}
+
+    deltas = CounterDeltas()
+    index_rows, unindexed_ids, value_rows = [], [], []
+
+    # 新增：按字段组合分组，每组一条 executemany
+    shapes = defaultdict(list)
+    for index, values in creates:
+        row = {**values, "account_id": account_id, "creator_id": creator_id, "uuid": uuid7_str()}
+        shapes[tuple(sorted(row))].append((index, row))
+    for items in shapes.values():
+        ids = _insert_records(db, [row for _, row in items])
+        for (index, row), record_id in zip(items, ids):
+            row["id"] = record_id
+            deltas.add_record(row)
+            if row.get("tags") or row.get("related_people"):
+                index_rows.append(row)
+            results[index] = {"index": index, "op": CREATE, "success": True, "id": record_id}
+
+    # 修改：按变更字段组合分组；只改 is_deleted 的合并成一条 IN 更新
+    c = records_table.c
+    shapes = defaultdict(list)
+    deleted_ids = []
+    for record_id, keys in changed.items():
+        if keys == {"is_deleted"}:
+            deleted_ids.append(record_id)
+        else:
+            shapes[tuple(sorted(keys))].append(record_id)
+    version = func.coalesce(c.version, 0) + 1
+    for keys, record_ids in shapes.items():
+        db.execute(update(records_table).where(c.id == bindparam("_id")).values(version=version), [
+            {"_id": record_id, **{key: state[record_id][key] for key in keys}} for record_id in record_ids
+        ])
+    for chunk in _chunks(deleted_ids):
+        db.execute(update(records_table).where(c.id.in_(chunk)).values(is_deleted=True, version=version))
+
+    for record_id, keys in changed.items():
+        before, after = original[record_id], state[record_id]
+        if keys.intersection(RECORD_COUNTER_FIELDS):
+            deltas.add_record(before, -1)
+            deltas.add_record(after)
+        if not keys.intersection(INDEXED_FIELDS):
+            continue
+        if after["is_deleted"]:
+            if has_terms(before):
+                unindexed_ids.append(record_id)
+        elif keys.intersection(TERM_FIELDS):
+            if has_terms(before) or has_terms(after):
+                index_rows.append(after)
+        elif has_terms(after):
+            value_rows.append(after)
+
+    if deltas:
+        deltas.apply(db.connection())
+    if index_rows or unindexed_ids:
+        reindex_records(db.connection(), index_rows, unindexed_ids)
+    update_index_values(db.connection(), value_rows)
+    db.commit()
+
+    results = [results[index] for index in range(len(operations))]
+    succeeded = sum(1 for result in results if result["success"])
+    logger.info("账本 %s 批量操作 %d 条，成功 %d 条", account_id, len(results), succeeded)
+    return {"results": results, "succeeded": succeeded, "failed": len(results) - succeeded}
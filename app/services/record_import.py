@@ -0,0 +1,304 @@
+# app/services/record_import.py
+import csv
+import hashlib
+import io
+import json
+import logging
+import zipfile
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.record import RecordType
+from app.services.record_archive import records_table
+from app.services.record_batch import batch_operations
+
+logger = logging.getLogger(__name__)
+
+# 银行/支付宝/微信账单导入：逐行流式解析，按机构的列映射转换为记录；
+# 每行计算内容哈希写入 records.hash_value，每块一次 IN 查询跳过已导入的行，
+# 新行交给批量写入引擎，每块单独提交并回报进度。
+# 并发导入同一账单时由 (account_id, hash_value) 唯一索引兜底，冲突的行计为跳过。
+# 同一账单中内容完全相同的多行（同日同额的两笔消费）按出现次数区分哈希，
+# 重新导入有重叠的账单时逐行对应，既不漏导也不重复。
+
+
+@dataclass(frozen=True)
+class StatementMapping:
+    """一家机构账单的列映射"""
+    name: str
+    date: str                                   # 交易时间列
+    amount: str                                 # 金额列
+    description: Tuple[str, ...] = ()           # 依次拼接为描述的列
+    direction: Optional[str] = None             # 收/支列；为空时按金额正负判断
+    income_values: Tuple[str, ...] = ("收入",)
+    expense_values: Tuple[str, ...] = ("支出",)
+    transaction_id: Optional[str] = None        # 交易单号列，参与去重哈希
+    encoding: str = "utf-8-sig"                 # CSV 编码
+    date_formats: Tuple[str, ...] = (
+        "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d",
+        "%Y/%m/%d %H:%M:%S", "%Y/%m/%d %H:%M", "%Y/%m/%d", "%Y%m%d",
+    )
+
+
+STATEMENT_MAPPINGS: Dict[str, StatementMapping] = {}
+
+
+def register_mapping(mapping: StatementMapping):
+    """注册（或覆盖）机构的列映射"""
+    STATEMENT_MAPPINGS[mapping.name] = mapping
+
+
+register_mapping(StatementMapping(
+    name="alipay", date="交易时间", amount="金额", description=("交易对方", "商品说明"),
+    direction="收/支", transaction_id="交易订单号", encoding="gbk",
+))
+register_mapping(StatementMapping(
+    name="wechat", date="交易时间", amount="金额(元)", description=("交易对方", "商品"),
+    direction="收/支", transaction_id="交易单号",
+))
+# 通用银行流水：金额带正负号（支出为负）
+register_mapping(StatementMapping(
+    name="bank", date="交易日期", amount="交易金额", description=("摘要", "对方户名"),
+    transaction_id="流水号",
+))
+
+
+def get_mapping(name: str) -> StatementMapping:
+    mapping = STATEMENT_MAPPINGS.get(name)
+    if mapping is None:
+        raise HTTPException(status_code=400, detail="不支持的账单来源")
+    return mapping
+
+
+# ---------------------------------------------------------------------------
+# 解析：CSV / XLSX -> 行 -> 记录字段
+# ---------------------------------------------------------------------------
+
+def _csv_rows(stream: BinaryIO, encoding: str) -> Iterator[list]:
+    try:
+        yield from csv.reader(io.TextIOWrapper(stream, encoding=encoding, errors="replace", newline=""))
+    except csv.Error as e:
+        raise HTTPException(status_code=400, detail=f"CSV 格式错误: {e}")
+
+
+def _xlsx_rows(stream: BinaryIO) -> Iterator[list]:
+    try:
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+    except ImportError:
+        raise HTTPException(status_code=400, detail="服务器未安装 openpyxl，暂不支持 XLSX 账单")
+    # load_workbook 在生成器内调用，文件损坏时在第一次取行时才报错，一并转为 400
+    try:
+        # 只读模式按行读取，不把整个工作表载入内存
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"XLSX 文件无法读取: {e}")
+    try:
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            yield list(row)
+    except zipfile.BadZipFile as e:
+        raise HTTPException(status_code=400, detail=f"XLSX 文件已损坏: {e}")
+    finally:
+        workbook.close()
+
+
+def _text(value) -> str:
+    return "" if value is None else str(value).strip()
+
+
+def _parse_amount(value) -> Decimal:
+    if isinstance(value, (int, float, Decimal)):
+        return Decimal(str(value))
+    text = _text(value).replace(",", "").replace("¥", "").replace("￥", "")
+    try:
+        return Decimal(text)
+    except InvalidOperation:
+        raise ValueError(f"金额格式错误: {text}")
+
+
+def _parse_date(value, formats: Tuple[str, ...]) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    text = _text(value)
+    for fmt in formats:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"日期格式错误: {text}")
+
+
+def _row_values(row: list, columns: Dict[str, int], mapping: StatementMapping) -> Optional[dict]:
+    """一行账单 -> 记录字段；不计收支、金额为 0 的行返回 None"""
+    def cell(name):
+        index = columns.get(name)
+        return row[index] if index is not None and index < len(row) else None
+
+    amount = _parse_amount(cell(mapping.amount))
+    if mapping.direction:
+        direction = _text(cell(mapping.direction))
+        if direction in mapping.income_values:
+            record_type = RecordType.INCOME
+        elif direction in mapping.expense_values:
+            record_type = RecordType.EXPENSE
+        else:
+            return None
+    else:
+        record_type = RecordType.INCOME if amount > 0 else RecordType.EXPENSE
+    amount = abs(amount)
+    if not amount:
+        return None
+    description = " ".join(text for text in (_text(cell(name)) for name in mapping.description) if text)
+    return {
+        "record_type": record_type,
+        "amount": amount,
+        "record_date": _parse_date(cell(mapping.date), mapping.date_formats),
+        "description": description or None,
+        "transaction_id": (_text(cell(mapping.transaction_id)) or None) if mapping.transaction_id else None,
+    }
+
+
+def iter_statement_rows(stream: BinaryIO, mapping: StatementMapping,
+                        file_format: str = "csv") -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """逐行产出 (行号, 记录字段, 错误)；表头前的说明行、表尾汇总行和不计收支的行跳过"""
+    rows = _xlsx_rows(stream) if file_format == "xlsx" else _csv_rows(stream, mapping.encoding)
+    columns = None
+    for line, row in enumerate(rows, 1):
+        cells = [_text(value) for value in row]
+        if columns is None:
+            # 支付宝/微信账单前有若干行说明，以同时包含日期列和金额列的行作为表头
+            if mapping.date in cells and mapping.amount in cells:
+                columns = {name: index for index, name in enumerate(cells) if name}
+            continue
+        if len(cells) <= columns[mapping.date] or not cells[columns[mapping.date]]:
+            continue
+        try:
+            values = _row_values(row, columns, mapping)
+        except ValueError as e:
+            yield line, None, str(e)
+            continue
+        if values is not None:
+            yield line, values, None
+    if columns is None:
+        raise HTTPException(status_code=400, detail="未找到账单表头")
+
+
+def iter_statement_chunks(stream: BinaryIO, mapping: StatementMapping, file_format: str = "csv",
+                          chunk_size: int = None) -> Iterator[list]:
+    """按块产出解析结果，并为每行生成去重用的内容键（相同内容按出现次数区分）"""
+    chunk_size = chunk_size or settings.IMPORT_CHUNK_SIZE
+    occurrences = Counter()
+    chunk = []
+    for line, values, error in iter_statement_rows(stream, mapping, file_format):
+        if values is not None:
+            content = json.dumps([
+                values["record_type"].value, str(values["amount"]), values["record_date"].isoformat(),
+                values["description"], values["transaction_id"],
+            ], ensure_ascii=False)
+            occurrences[content] += 1
+            values["content_key"] = f"{content}#{occurrences[content]}"
+        chunk.append((line, values, error))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ---------------------------------------------------------------------------
+# 写入：每块一次哈希查询去重，新行批量写入并提交
+# ---------------------------------------------------------------------------
+
+def _record_hash(account_id: int, payment_account_id: int, content_key: str) -> str:
+    return hashlib.sha256(f"{account_id}|{payment_account_id}|{content_key}".encode("utf-8")).hexdigest()
+
+
+def _imported_hashes(db: Session, account_id: int, hashes: Iterable[str]) -> set:
+    """已导入的内容哈希；已删除的记录也算已导入，用户删掉的导入记录不会被重新导入"""
+    hashes = set(hashes)
+    if not hashes:
+        return set()
+    c = records_table.c
+    return set(db.scalars(select(c.hash_value).where(c.account_id == account_id, c.hash_value.in_(hashes))))
+
+
+def _create_operation(values: dict, payment_account_id: int, category_id: Optional[int],
+                      source: str, hash_value: str) -> dict:
+    metadata = {"source": source}
+    if values["transaction_id"]:
+        metadata["transaction_id"] = values["transaction_id"]
+    return {"op": "create", "data": {
+        "record_type": values["record_type"], "amount": values["amount"],
+        "record_date": values["record_date"], "description": values["description"],
+        "payment_account_id": payment_account_id, "category_id": category_id,
+        "metadata": metadata, "hash_value": hash_value,
+    }}
+
+
+def import_rows(db: Session, account_id: int, creator_id: int, payment_account_id: int,
+                rows: list, source: str, category_id: Optional[int] = None) -> Dict[str, Any]:
+    """导入一块解析结果并提交，返回本块的 imported / skipped / failed 数及错误明细"""
+    result = {"rows": len(rows), "imported": 0, "skipped": 0, "failed": 0, "errors": []}
+    hashes = {}
+    for line, values, error in rows:
+        if values is not None:
+            hashes[line] = _record_hash(account_id, payment_account_id, values["content_key"])
+    existing = _imported_hashes(db, account_id, hashes.values())
+
+    outcomes = iter(())
+    while True:
+        pending = [(line, values) for line, values, _ in rows
+                   if values is not None and hashes[line] not in existing]
+        if not pending:
+            break
+        operations = [_create_operation(values, payment_account_id, category_id, source, hashes[line])
+                      for line, values in pending]
+        try:
+            outcomes = iter(batch_operations(db, account_id, creator_id, operations)["results"])
+            break
+        except IntegrityError:
+            # 并发导入同一账单：另一请求在去重查询之后写入了部分行，唯一索引冲突，
+            # 本块回滚后重新查询哈希，已被写入的行按跳过处理
+            db.rollback()
+            imported = _imported_hashes(db, account_id, hashes.values())
+            if imported <= existing:
+                raise
+            existing = imported
+
+    for line, values, error in rows:
+        if values is None:
+            result["failed"] += 1
+            result["errors"].append({"line": line, "error": error})
+        elif hashes[line] in existing:
+            result["skipped"] += 1
+        else:
+            item = next(outcomes)
+            if item["success"]:
+                result["imported"] += 1
+            else:
+                result["failed"] += 1
+                result["errors"].append({"line": line, "error": item["error"]})
+    return result
+
+
+def import_statement(db: Session, account_id: int, creator_id: int, payment_account_id: int,
+                     stream: BinaryIO, mapping: StatementMapping, file_format: str = "csv",
+                     category_id: Optional[int] = None,
+                     progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """导入整份账单，每块提交后调用 progress(累计进度)"""
+    summary = {"rows": 0, "imported": 0, "skipped": 0, "failed": 0}
+    for chunk in iter_statement_chunks(stream, mapping, file_format):
+        result = import_rows(db, account_id, creator_id, payment_account_id, chunk, mapping.name, category_id)
+        for key in summary:
+            summary[key] += result[key]
+        if progress is not None:
+            progress(dict(summary))
+    logger.info("账本 %s 导入 %s 账单: %s", account_id, mapping.name, summary)
+    return summary
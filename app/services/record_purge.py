@@ -0,0 +1,87 @@
+# app/services/record_purge.py
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict
+from sqlalchemy import select, delete, func, or_
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.tag_index import reindex_records
+from app.models.account import Account
+from app.models.account_member import AccountMember
+from app.models.devices import Device
+from app.services.record_archive import records_table
+
+logger = logging.getLogger(__name__)
+
+# 软删除记录的清理：删除时间（软删除时 updated_at 随之更新）早于保留期，
+# 且账本所有成员的设备都已在删除之后同步过（设备已拿到删除标记），才物理删除。
+# 分类、支付账户等仍被记录或归档段引用，只清理记录。
+
+
+def _member_sync_watermark():
+    """记录所属账本的所有者和成员的设备中最早的 last_sync_at；没有已同步设备时为 NULL（不限制）
+
+    按外层 records 行关联子查询，每个账本单独计算水位，一个账本的离线设备不影响其他账本。
+    """
+    c = records_table.c
+    owner = select(Account.owner_id).where(Account.id == c.account_id).correlate(records_table)
+    members = select(AccountMember.user_id).where(AccountMember.account_id == c.account_id).correlate(records_table)
+    return (
+        select(func.min(Device.last_sync_at))
+        .where(or_(Device.user_id.in_(owner), Device.user_id.in_(members)), Device.last_sync_at.isnot(None))
+        .correlate(records_table)
+        .scalar_subquery()
+    )
+
+
+def purgeable_record_ids(db: Session, retention_days: int, limit: int):
+    c = records_table.c
+    watermark = _member_sync_watermark()
+    return db.scalars(
+        select(c.id)
+        .where(
+            c.is_deleted == True,
+            c.updated_at < datetime.utcnow() - timedelta(days=retention_days),
+            or_(watermark.is_(None), c.updated_at < watermark),
+        )
+        .order_by(c.id)
+        .limit(limit)
+    ).all()
+
+
+def purge_deleted_records(db: Session, retention_days: int = None, batch_size: int = 1000,
+                          max_batches: int = 100) -> Dict[str, int]:
+    """分批物理删除可清理的软删除记录，每批单独提交"""
+    if retention_days is None:
+        retention_days = settings.SOFT_DELETE_RETENTION_DAYS
+    result = {"records": 0, "batches": 0}
+    for _ in range(max_batches):
+        ids = purgeable_record_ids(db, retention_days, batch_size)
+        if not ids:
+            break
+        # 软删除时索引行已移除，这里再清理一次以防遗留
+        reindex_records(db.connection(), [], ids)
+        db.execute(delete(records_table).where(records_table.c.id.in_(ids), records_table.c.is_deleted == True))
+        db.commit()
+        result["records"] += len(ids)
+        result["batches"] += 1
+    if result["records"]:
+        logger.info("软删除记录清理完成: %s", result)
+    return result
+
+
+def _purge_once() -> Dict[str, int]:
+    from app.core.database import SessionLocal
+    with SessionLocal(info={"use_primary": True}) as db:
+        return purge_deleted_records(db)
+
+
+async def run_purge_loop(interval: float):
+    """后台定时清理，在线程中执行以免阻塞事件循环"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(_purge_once)
+        except Exception:
+            logger.exception("软删除记录清理失败")
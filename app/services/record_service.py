@@ -0,0 +1,721 @@
+# app/services/record_service.py
+import heapq
+from datetime import datetime, timedelta
+from itertools import islice
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import select, func, or_, and_, extract, exists
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+from app.models.category import Category
+from app.models.category_closure import CategoryClosure
+from app.models.payment_account import PaymentAccount
+from app.models.record import Record, RecordType
+from app.models.record_archive import RecordArchiveRollup
+from app.models.record_count import RecordMonthCount
+from app.models.record_tag import RecordTag, RecordPerson
+from app.core.tag_index import normalize_terms
+from app.core.money import CENT, to_cents, from_cents, cents_column, sum_cents_column
+from app.core.category_tree import ancestor_map
+from app.core.pagination import NEXT, PREV, encode_cursor, decode_cursor
+from app.core.config import settings
+from app.models.user import User
+from app.services.record_archive import (
+    records_table, overlapping_segments, segment_rows, segment_covered,
+)
+from app.services import record_batch
+from app.services.record_views import RecordView, LIST_FIELDS, EXPORT_FIELDS, projection, fetch_views, stream_views
+
+
+def _record_type_value(value) -> str:
+    return value.value if isinstance(value, RecordType) else value
+
+
+def _average(cents: int, count: int) -> Decimal:
+    return (from_cents(cents) / count).quantize(CENT)
+
+
+def _percentage(part_cents: int, total_cents: int):
+    return round(Decimal(part_cents * 100) / total_cents, 2) if total_cents else 0
+
+
+# 月度计数表能精确回答的过滤条件
+COUNTER_FILTERS = {"record_type", "date_from", "date_to"}
+
+
+def _month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def _next_month_start(value: datetime) -> datetime:
+    return datetime(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+class RecordService:
+    """记录查询服务：热表与归档段透明合并，调用方无需关心记录是否已归档"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ------------------------------------------------------------------
+    # 过滤条件：热表转成 SQL 条件，归档段在内存中逐条匹配，两者语义一致
+    # ------------------------------------------------------------------
+
+    def _hot_conditions(self, account_id: int, filters: Dict[str, Any]) -> list:
+        c = records_table.c
+        conditions = [c.account_id == account_id, c.is_deleted == False]
+        if filters.get("record_type"):
+            conditions.append(c.record_type == RecordType(_record_type_value(filters["record_type"])))
+        if filters.get("date_from"):
+            conditions.append(c.record_date >= filters["date_from"])
+        if filters.get("date_to"):
+            conditions.append(c.record_date <= filters["date_to"])
+        if filters.get("category_id"):
+            conditions.append(c.category_id == filters["category_id"])
+        if filters.get("min_amount") is not None:
+            conditions.append(c.amount >= filters["min_amount"])
+        if filters.get("max_amount") is not None:
+            conditions.append(c.amount <= filters["max_amount"])
+        if filters.get("search"):
+            term = f"%{filters['search']}%"
+            conditions.append(or_(c.description.like(term), c.location.like(term)))
+        tags = normalize_terms(filters.get("tags"))
+        if tags:
+            conditions.append(c.id.in_(self._tag_record_ids(account_id, tags, filters.get("tag_mode", "any"))))
+        if filters.get("person"):
+            conditions.append(c.id.in_(select(RecordPerson.record_id).where(
+                RecordPerson.account_id == account_id, RecordPerson.person == filters["person"]
+            )))
+        return conditions
+
+    @staticmethod
+    def _tag_record_ids(account_id: int, tags: List[str], mode: str):
+        """命中标签的记录 ID 子查询：any 为任一标签（OR），all 为全部标签（AND）"""
+        query = select(RecordTag.record_id).where(RecordTag.account_id == account_id, RecordTag.tag.in_(tags))
+        if mode == "all":
+            query = query.group_by(RecordTag.record_id).having(func.count(func.distinct(RecordTag.tag)) == len(tags))
+        return query
+
+    @staticmethod
+    def _archive_match(row: dict, filters: Dict[str, Any]) -> bool:
+        if filters.get("record_type") and row["record_type"] != _record_type_value(filters["record_type"]):
+            return False
+        if filters.get("date_from") and row["record_date"] < filters["date_from"]:
+            return False
+        if filters.get("date_to") and row["record_date"] > filters["date_to"]:
+            return False
+        if filters.get("category_id") and row["category_id"] != filters["category_id"]:
+            return False
+        if filters.get("min_amount") is not None and row["amount"] < Decimal(str(filters["min_amount"])):
+            return False
+        if filters.get("max_amount") is not None and row["amount"] > Decimal(str(filters["max_amount"])):
+            return False
+        if filters.get("search"):
+            term = filters["search"].lower()
+            if term not in (row.get("description") or "").lower() and term not in (row.get("location") or "").lower():
+                return False
+        tags = normalize_terms(filters.get("tags"))
+        if tags:
+            row_tags = set(normalize_terms(row.get("tags")))
+            matched = all(t in row_tags for t in tags) if filters.get("tag_mode") == "all" else bool(row_tags & set(tags))
+            if not matched:
+                return False
+        if filters.get("person") and filters["person"] not in normalize_terms(row.get("related_people")):
+            return False
+        return True
+
+    # 归档段只在需要时解压：先用段元数据（日期范围、行数）和月度汇总判断，
+    # 确实要读出记录时才按顺序逐段解压
+
+    def _archive_segments(self, account_id: int, filters: Dict[str, Any]) -> list:
+        """与日期范围有交集的归档段元数据（按年份倒序，不加载 payload）"""
+        return overlapping_segments(self.db, account_id, filters.get("date_from"), filters.get("date_to"))
+
+    def _known_counts(self, segments: list, filters: Dict[str, Any]) -> Dict[int, int]:
+        """不解压即可知道命中数的归档段：日期范围完整覆盖且只按类型过滤，命中数取自段行数或月度汇总"""
+        if not self._active_filters(filters) <= COUNTER_FILTERS:
+            return {}
+        covered = [s.id for s in segments if segment_covered(s, filters.get("date_from"), filters.get("date_to"))]
+        if not covered:
+            return {}
+        if not filters.get("record_type"):
+            return {s.id: s.record_count for s in segments if s.id in covered}
+        r = RecordArchiveRollup
+        counts = dict(self.db.execute(
+            select(r.segment_id, func.sum(r.record_count))
+            .where(r.segment_id.in_(covered), r.record_type == RecordType(_record_type_value(filters["record_type"])))
+            .group_by(r.segment_id)
+        ).all())
+        return {segment_id: int(counts.get(segment_id, 0)) for segment_id in covered}
+
+    def _iter_archived(self, segments: list, filters: Dict[str, Any], skip: int = 0,
+                       ascending: bool = False) -> Iterator[dict]:
+        """逐段解压并按顺序产出匹配的归档记录（默认日期倒序），跳过前 skip 条
+
+        同一账本的归档段按年份互不重叠，逐段拼接即为全局顺序；命中数已知的段被整段跳过时不解压。
+        """
+        known = self._known_counts(segments, filters) if skip else {}
+        for segment in (reversed(segments) if ascending else segments):
+            count = known.get(segment.id)
+            if count is not None and skip >= count:
+                skip -= count
+                continue
+            rows = segment_rows(segment)
+            for row in (reversed(rows) if ascending else rows):
+                if not self._archive_match(row, filters):
+                    continue
+                if skip:
+                    skip -= 1
+                    continue
+                yield row
+
+    @staticmethod
+    def _order(query):
+        c = records_table.c
+        return query.order_by(c.record_date.desc(), c.created_at.desc(), c.id.desc())
+
+    # ------------------------------------------------------------------
+    # 分页列表
+    # ------------------------------------------------------------------
+
+    def _hot_page(self, conditions: list, offset: int, limit: int) -> List[RecordView]:
+        query = self._order(projection(LIST_FIELDS).where(*conditions)).offset(offset).limit(limit)
+        return fetch_views(self.db, query, LIST_FIELDS)
+
+    def _attach_names(self, records: List[RecordView]):
+        """批量补充分类、支付账户、创建者名称（每种一次 IN 查询）
+
+        记录可能引用已软删除的分类/支付账户，名称查询不走全局软删除过滤。
+        """
+        lookups = (
+            ("category_id", Category, Category.name, "category_name"),
+            ("payment_account_id", PaymentAccount, PaymentAccount.name, "payment_account_name"),
+            ("creator_id", User, User.nickname, "creator_name"),
+        )
+        for key, model, column, target in lookups:
+            ids = {getattr(r, key) for r in records if getattr(r, key) is not None}
+            names = dict(self.db.execute(select(model.id, column).where(model.id.in_(ids)),
+                                         execution_options={"include_deleted": True}).all()) if ids else {}
+            for record in records:
+                setattr(record, target, names.get(getattr(record, key)))
+
+    def get_records_paginated(self, account_id: int, page: int = 1, page_size: int = 20,
+                              filters: Optional[Dict[str, Any]] = None,
+                              include_total: bool = True) -> Dict[str, Any]:
+        """分页获取记录（按日期倒序），历史范围自动合并归档段
+
+        总数来自 count_records（total_exact 为 False 时是估算值）；include_total=False 时不计算总数。
+        """
+        filters = filters or {}
+        page = max(page, 1)
+        offset = (page - 1) * page_size
+        conditions = self._hot_conditions(account_id, filters)
+        segments = self._archive_segments(account_id, filters)
+
+        # 每页多取一条判断是否还有下一页
+        if not segments:
+            records = self._hot_page(conditions, offset, page_size + 1)
+        elif not self.db.scalar(select(exists().where(
+                *conditions, records_table.c.record_date <= segments[0].max_date))):
+            # 常见情况：热表记录都比归档新，先取热表，热表不够一页时才读归档
+            records = self._hot_page(conditions, offset, page_size + 1)
+            if len(records) <= page_size:
+                # 只有热表取空时才需要热表条数来定位归档中的起点
+                if records or not offset:
+                    hot_total = offset + len(records)
+                else:
+                    hot_total = self.db.scalar(select(func.count()).select_from(records_table).where(*conditions))
+                archived = self._iter_archived(segments, filters, skip=max(offset - hot_total, 0))
+                records += [RecordView.from_dict(row) for row in islice(archived, page_size + 1 - len(records))]
+        else:
+            # 归档后补录的旧记录与归档交错，按排序键归并
+            hot = self._hot_page(conditions, 0, offset + page_size + 1)
+            archived = (RecordView.from_dict(row) for row in self._iter_archived(segments, filters))
+            merged = heapq.merge(hot, archived, key=lambda v: v.sort_key, reverse=True)
+            records = list(islice(merged, offset, offset + page_size + 1))
+        has_next = len(records) > page_size
+        records = records[:page_size]
+
+        total, exact = None, True
+        if include_total:
+            if not has_next and (records or page == 1):
+                # 最后一页：总数可直接算出
+                total = offset + len(records)
+            else:
+                counted = self.count_records(account_id, filters)
+                total, exact = counted["total"], counted["exact"]
+                if records:
+                    # 估算值不能小于已经确定存在的记录数
+                    total = max(total, offset + len(records) + has_next)
+
+        self._attach_names(records)
+        return {
+            "records": [r.to_dict() for r in records],
+            "pagination": {
+                "page": page,
+                "page_size": page_size,
+                "total": total,
+                "total_exact": exact,
+                "total_pages": (total + page_size - 1) // page_size if total is not None else None,
+                "has_next": has_next,
+                "has_prev": page > 1,
+            },
+            "filters_applied": filters,
+            "generated_at": datetime.now().isoformat(),
+        }
+
+    # ------------------------------------------------------------------
+    # 键集分页：按 (record_date, created_at, id) 定位，任意深度的页都只扫描 page_size 行
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _keyset_condition(key: tuple, direction: str):
+        """排序键在游标之后（next，更旧）或之前（prev，更新）的记录"""
+        c = records_table.c
+        record_date, created_at, record_id = key
+        if direction == NEXT:
+            return and_(c.record_date <= record_date, or_(
+                c.record_date < record_date,
+                c.created_at < created_at,
+                and_(c.created_at == created_at, c.id < record_id),
+            ))
+        return and_(c.record_date >= record_date, or_(
+            c.record_date > record_date,
+            c.created_at > created_at,
+            and_(c.created_at == created_at, c.id > record_id),
+        ))
+
+    @staticmethod
+    def _cursor_filters(filters: Dict[str, Any], key: Optional[tuple], direction: str) -> Dict[str, Any]:
+        """把游标位置并入日期范围，只读取与游标方向有交集的归档段"""
+        filters = dict(filters)
+        if key is not None:
+            bound = "date_to" if direction == NEXT else "date_from"
+            current = filters.get(bound)
+            pick = min if direction == NEXT else max
+            filters[bound] = key[0] if current is None else pick(current, key[0])
+        return filters
+
+    def _archived_after(self, segments: list, filters: Dict[str, Any], key: Optional[tuple], direction: str):
+        """游标之后的归档记录，按 direction 的顺序逐条产出（逐段解压）"""
+        for row in self._iter_archived(segments, filters, ascending=direction == PREV):
+            view = RecordView.from_dict(row)
+            if key is None or (view.sort_key < key if direction == NEXT else view.sort_key > key):
+                yield view
+
+    def get_records_cursor(self, account_id: int, cursor: Optional[str] = None, page_size: int = 20,
+                           filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """键集分页获取记录（按日期倒序），支持全部过滤条件和归档记录
+
+        cursor 取自上次响应的 next_cursor（更旧的一页）或 prev_cursor（更新的一页）。
+        """
+        filters = filters or {}
+        key, direction = decode_cursor(cursor)
+        if key is not None and len(key) != 3:
+            raise HTTPException(status_code=400, detail="无效的分页游标")
+        c = records_table.c
+        conditions = self._hot_conditions(account_id, filters)
+        if key is not None:
+            conditions.append(self._keyset_condition(key, direction))
+        query = projection(LIST_FIELDS).where(*conditions)
+        if direction == NEXT:
+            query = self._order(query)
+        else:
+            query = query.order_by(c.record_date.asc(), c.created_at.asc(), c.id.asc())
+        # 多取一条判断是否还有下一页
+        records = fetch_views(self.db, query.limit(page_size + 1), LIST_FIELDS)
+        archive_filters = self._cursor_filters(filters, key, direction)
+        segments = self._archive_segments(account_id, archive_filters)
+        # 热表已取满且归档记录全部排在其后时，不读取归档
+        if segments and not (len(records) > page_size and (
+                segments[0].max_date < records[-1].record_date if direction == NEXT
+                else segments[-1].min_date > records[-1].record_date)):
+            archived = self._archived_after(segments, archive_filters, key, direction)
+            merged = heapq.merge(records, archived, key=lambda v: v.sort_key, reverse=direction == NEXT)
+            records = list(islice(merged, page_size + 1))
+        more = len(records) > page_size
+        records = records[:page_size]
+        if direction == PREV:
+            records.reverse()
+
+        has_next = more if direction == NEXT else key is not None
+        has_prev = key is not None if direction == NEXT else more
+        self._attach_names(records)
+        return {
+            "records": [r.to_dict() for r in records],
+            "pagination": {
+                "page_size": page_size,
+                "next_cursor": encode_cursor(records[-1].sort_key, NEXT) if has_next and records else None,
+                "prev_cursor": encode_cursor(records[0].sort_key, PREV) if has_prev and records else None,
+                "has_next": has_next,
+                "has_prev": has_prev,
+            },
+            "filters_applied": filters,
+            "generated_at": datetime.now().isoformat(),
+        }
+
+    def search_records(self, account_id: int, keyword: str, page: int = 1, page_size: int = 20,
+                       filters: Optional[Dict[str, Any]] = None, include_total: bool = True) -> Dict[str, Any]:
+        """按描述/地点关键词搜索（可叠加其他过滤条件）"""
+        return self.get_records_paginated(account_id, page, page_size, {**(filters or {}), "search": keyword},
+                                          include_total)
+
+    # ------------------------------------------------------------------
+    # 记录总数：月度计数表（含归档记录）随写入增量维护，常见过滤条件直接求和即为精确值；
+    # 其他过滤条件先用月度计数得到候选数，候选少时精确计数，候选多时抽样估算
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _active_filters(filters: Dict[str, Any]) -> set:
+        return {key for key, value in filters.items() if key != "tag_mode" and value not in (None, "", [])}
+
+    @staticmethod
+    def _whole_months(filters: Dict[str, Any]) -> bool:
+        """日期范围是否恰好覆盖整月（date_to 为月末最后一秒之后的任意时刻）"""
+        date_from, date_to = filters.get("date_from"), filters.get("date_to")
+        if not all(isinstance(value, datetime) for value in (date_from, date_to) if value):
+            return False
+        if date_from and date_from != _month_start(date_from):
+            return False
+        if date_to and (date_to + timedelta(seconds=1)) < _next_month_start(date_to):
+            return False
+        return True
+
+    def _month_count(self, account_id: int, filters: Dict[str, Any]) -> int:
+        """日期范围所在整月（向外取整）的记录数"""
+        conditions = [RecordMonthCount.account_id == account_id]
+        if filters.get("record_type"):
+            conditions.append(RecordMonthCount.record_type == RecordType(_record_type_value(filters["record_type"])))
+        if filters.get("date_from"):
+            conditions.append(RecordMonthCount.month >= filters["date_from"].strftime("%Y-%m"))
+        if filters.get("date_to"):
+            conditions.append(RecordMonthCount.month <= filters["date_to"].strftime("%Y-%m"))
+        return int(self.db.scalar(select(func.coalesce(func.sum(RecordMonthCount.record_count), 0))
+                                  .where(*conditions)))
+
+    def _exact_count(self, account_id: int, filters: Dict[str, Any]) -> int:
+        """热表 COUNT 加归档命中数；归档段的命中数优先取段行数/月度汇总，其余段才解压计数"""
+        hot = self.db.scalar(select(func.count()).select_from(records_table)
+                             .where(*self._hot_conditions(account_id, filters)))
+        segments = self._archive_segments(account_id, filters)
+        known = self._known_counts(segments, filters)
+        unknown = [segment for segment in segments if segment.id not in known]
+        return hot + sum(known.values()) + sum(1 for _ in self._iter_archived(unknown, filters))
+
+    def _sampled_count(self, account_id: int, filters: Dict[str, Any], candidates: int) -> Optional[int]:
+        """取候选范围内最新的 COUNT_SAMPLE_SIZE 条热表记录，按命中比例估算；热表无候选时返回 None"""
+        c = records_table.c
+        coarse = {key: filters[key] for key in COUNTER_FILTERS if filters.get(key)}
+        conditions = [c.account_id == account_id, c.is_deleted == False]
+        if coarse.get("record_type"):
+            conditions.append(c.record_type == RecordType(_record_type_value(coarse["record_type"])))
+        # 与月度计数口径一致：日期范围向外取整到月
+        if coarse.get("date_from"):
+            conditions.append(c.record_date >= _month_start(coarse["date_from"]))
+        if coarse.get("date_to"):
+            conditions.append(c.record_date < _next_month_start(coarse["date_to"]))
+        # 样本用派生表而非 IN 子查询：MySQL 不支持 IN (... LIMIT)
+        sample = self._order(select(c.id).where(*conditions)).limit(settings.COUNT_SAMPLE_SIZE).subquery()
+        sampled, matched = self.db.execute(
+            select(func.count(), func.count(records_table.c.id))
+            .select_from(sample.outerjoin(records_table, and_(
+                records_table.c.id == sample.c.id, *self._hot_conditions(account_id, filters))))
+        ).one()
+        if not sampled:
+            return None
+        return min(max(round(candidates * matched / sampled), matched), candidates)
+
+    def count_records(self, account_id: int, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """符合过滤条件的记录数（含归档），返回 {"total": 数量, "exact": 是否精确}"""
+        filters = filters or {}
+        active = self._active_filters(filters)
+        candidates = self._month_count(account_id, filters)
+        if active <= COUNTER_FILTERS and self._whole_months(filters):
+            return {"total": candidates, "exact": True}
+        if candidates > settings.COUNT_EXACT_THRESHOLD:
+            estimate = self._sampled_count(account_id, filters, candidates)
+            if estimate is not None:
+                return {"total": estimate, "exact": False}
+        return {"total": self._exact_count(account_id, filters), "exact": True}
+
+    def export_records(self, account_id: int, filters: Optional[Dict[str, Any]] = None,
+                       batch_size: int = 1000) -> Iterator[RecordView]:
+        """按日期倒序逐条导出全部列（含归档记录），服务端游标分批读取"""
+        filters = filters or {}
+        hot = stream_views(self.db, self._order(projection(EXPORT_FIELDS).where(
+            *self._hot_conditions(account_id, filters))), EXPORT_FIELDS, batch_size)
+        archived = (RecordView.from_dict(row, EXPORT_FIELDS)
+                    for row in self._iter_archived(self._archive_segments(account_id, filters), filters))
+        return heapq.merge(hot, archived, key=lambda v: v.sort_key, reverse=True)
+
+    def get_record_detail(self, account_id: int, record_id: int) -> Optional[Dict[str, Any]]:
+        """单条记录详情（热表），关联对象按 record_detail 配置一次查询加载
+
+        关联的分类/支付账户即使已软删除也照常显示名称，只过滤记录本身。
+        """
+        record = self.db.scalars(
+            select(Record).where(Record.id == record_id, Record.account_id == account_id, Record.is_deleted == False),
+            execution_options={"loader_profile": "record_detail", "include_deleted": True},
+        ).unique().one_or_none()
+        if record is None:
+            return None
+        data = {field: getattr(record, field) for field in EXPORT_FIELDS}
+        data["record_type"] = _record_type_value(record.record_type)
+        data["account_name"] = record.account.name
+        data["category_name"] = record.category.name if record.category else None
+        data["payment_account_name"] = record.payment_account.name if record.payment_account else None
+        data["target_payment_account_name"] = (
+            record.target_payment_account.name if record.target_payment_account else None
+        )
+        data["creator_name"] = record.creator.nickname if record.creator else None
+        return data
+
+    def batch_operations(self, account_id: int, creator_id: int, operations: List[dict]) -> Dict[str, Any]:
+        """批量新增/修改/删除记录，逐条返回结果（见 record_batch.batch_operations）"""
+        return record_batch.batch_operations(self.db, account_id, creator_id, operations)
+
+    # ------------------------------------------------------------------
+    # 统计分析
+    # ------------------------------------------------------------------
+
+    # 聚合结果统一为 (月份, 类型, 分类, 笔数, 合计分, 最大分, 最小分)，金额均为整数分
+
+    def _hot_aggregates(self, conditions: list) -> List[Tuple]:
+        """热表按 (月份, 类型, 分类) 聚合"""
+        c = records_table.c
+        year, month = extract("year", c.record_date), extract("month", c.record_date)
+        cents = cents_column(c.amount)
+        query = (select(year, month, c.record_type, c.category_id, func.count(),
+                        sum_cents_column(c.amount), func.max(cents), func.min(cents))
+                 .where(*conditions)
+                 .group_by(year, month, c.record_type, c.category_id))
+        return [
+            (f"{int(y):04d}-{int(m):02d}", _record_type_value(t), cat, n, int(total), int(max_cents), int(min_cents))
+            for y, m, t, cat, n, total, max_cents, min_cents in self.db.execute(query)
+        ]
+
+    def _archive_aggregates(self, account_id: int, date_range) -> List[Tuple]:
+        """归档部分的聚合：完整覆盖的归档段读月度汇总，部分覆盖的解压后过滤"""
+        date_from, date_to = date_range or (None, None)
+        segments = overlapping_segments(self.db, account_id, date_from, date_to)
+        covered = [s.id for s in segments if segment_covered(s, date_from, date_to)]
+        result = []
+        if covered:
+            r = RecordArchiveRollup
+            query = (select(r.month, r.record_type, r.category_id, func.sum(r.record_count),
+                            sum_cents_column(r.total_amount), func.max(cents_column(r.max_amount)),
+                            func.min(cents_column(r.min_amount)))
+                     .where(r.segment_id.in_(covered))
+                     .group_by(r.month, r.record_type, r.category_id))
+            result += [(m, _record_type_value(t), cat, int(n), int(total), int(mx), int(mn))
+                       for m, t, cat, n, total, mx, mn in self.db.execute(query)]
+        filters = {"date_from": date_from, "date_to": date_to}
+        for segment in segments:
+            if segment.id in covered:
+                continue
+            for row in segment_rows(segment):
+                if self._archive_match(row, filters):
+                    cents = to_cents(row["amount"])
+                    result.append((row["record_date"].strftime("%Y-%m"), row["record_type"],
+                                   row["category_id"], 1, cents, cents, cents))
+        return result
+
+    def get_advanced_analytics(self, account_id: int,
+                               date_range: Optional[Tuple[datetime, datetime]] = None) -> Dict[str, Any]:
+        """收支概况、支出分类占比与月度趋势（包含归档数据）"""
+        filters = {"date_from": date_range[0], "date_to": date_range[1]} if date_range else {}
+        groups = self._hot_aggregates(self._hot_conditions(account_id, filters))
+        groups += self._archive_aggregates(account_id, date_range)
+
+        # 累加全部以整数分进行，返回前再转为 Decimal
+        totals = {t.value: {"amount": 0, "count": 0} for t in RecordType}
+        max_expense = min_expense = None
+        categories: Dict[Optional[int], Dict[str, Any]] = {}
+        months: Dict[str, Dict[str, Any]] = {}
+        for month, record_type, category_id, count, cents, max_cents, min_cents in groups:
+            totals[record_type]["amount"] += cents
+            totals[record_type]["count"] += count
+
+            item = months.setdefault(month, {"month": month, "monthly_income": 0,
+                                             "monthly_expense": 0, "monthly_records": 0})
+            item["monthly_records"] += count
+            if record_type == RecordType.INCOME.value:
+                item["monthly_income"] += cents
+            elif record_type == RecordType.EXPENSE.value:
+                item["monthly_expense"] += cents
+                max_expense = max_cents if max_expense is None else max(max_expense, max_cents)
+                min_expense = min_cents if min_expense is None else min(min_expense, min_cents)
+                category = categories.setdefault(category_id, {"category_id": category_id,
+                                                               "total_amount": 0, "record_count": 0})
+                category["total_amount"] += cents
+                category["record_count"] += count
+
+        income, expense = totals[RecordType.INCOME.value], totals[RecordType.EXPENSE.value]
+        names = {}
+        if categories:
+            names = {row.id: row for row in self.db.execute(
+                select(Category.id, Category.name, Category.icon_name, Category.color)
+                .where(Category.id.in_([k for k in categories if k is not None])),
+                execution_options={"include_deleted": True},
+            )}
+        category_stats = []
+        for category_id, item in sorted(categories.items(), key=lambda kv: kv[1]["total_amount"], reverse=True):
+            info = names.get(category_id)
+            category_stats.append({
+                **item,
+                "total_amount": from_cents(item["total_amount"]),
+                "category_name": info.name if info else "未分类",
+                "icon_name": info.icon_name if info else None,
+                "color": info.color if info else None,
+                "avg_amount": _average(item["total_amount"], item["record_count"]),
+                "percentage": _percentage(item["total_amount"], expense["amount"]),
+            })
+        for item in months.values():
+            item["monthly_income"] = from_cents(item["monthly_income"])
+            item["monthly_expense"] = from_cents(item["monthly_expense"])
+
+        return {
+            "basic_stats": {
+                "total_income": from_cents(income["amount"]),
+                "total_expense": from_cents(expense["amount"]),
+                "income_count": income["count"],
+                "expense_count": expense["count"],
+                "total_records": sum(t["count"] for t in totals.values()),
+                "avg_expense": _average(expense["amount"], expense["count"]) if expense["count"] else None,
+                "max_expense": None if max_expense is None else from_cents(max_expense),
+                "min_expense": None if min_expense is None else from_cents(min_expense),
+            },
+            "category_stats": category_stats,
+            "monthly_trend": sorted(months.values(), key=lambda m: m["month"], reverse=True)[:12],
+            "generated_at": datetime.now().isoformat(),
+        }
+
+    # ------------------------------------------------------------------
+    # 标签与关联人员统计：直接读倒排索引（包含已归档记录）
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _index_conditions(model, account_id: int, date_range, record_type=None) -> list:
+        conditions = [model.account_id == account_id]
+        if date_range:
+            conditions += [model.record_date >= date_range[0], model.record_date <= date_range[1]]
+        if record_type:
+            conditions.append(model.record_type == RecordType(_record_type_value(record_type)))
+        return conditions
+
+    def _term_counts(self, model, column, account_id: int, date_range, record_type, limit: int) -> List[Dict[str, Any]]:
+        total = sum_cents_column(model.amount).label("total_amount")
+        query = (select(column, func.count().label("record_count"), total)
+                 .where(*self._index_conditions(model, account_id, date_range, record_type))
+                 .group_by(column)
+                 .order_by(func.count().desc())
+                 .limit(limit))
+        return [{"name": name, "record_count": n, "total_amount": from_cents(cents)}
+                for name, n, cents in self.db.execute(query)]
+
+    def tag_counts(self, account_id: int, date_range: Optional[Tuple[datetime, datetime]] = None,
+                   record_type=None, limit: int = 50) -> List[Dict[str, Any]]:
+        """各标签的记录数与金额合计（按记录数倒序）"""
+        return self._term_counts(RecordTag, RecordTag.tag, account_id, date_range, record_type, limit)
+
+    def person_counts(self, account_id: int, date_range: Optional[Tuple[datetime, datetime]] = None,
+                      record_type=None, limit: int = 50) -> List[Dict[str, Any]]:
+        """各关联人员的记录数与金额合计"""
+        return self._term_counts(RecordPerson, RecordPerson.person, account_id, date_range, record_type, limit)
+
+    def tag_monthly_sums(self, account_id: int, tags: Optional[List[str]] = None,
+                         date_range: Optional[Tuple[datetime, datetime]] = None,
+                         record_type=RecordType.EXPENSE) -> List[Dict[str, Any]]:
+        """标签按月金额合计，默认统计支出"""
+        year, month = extract("year", RecordTag.record_date), extract("month", RecordTag.record_date)
+        conditions = self._index_conditions(RecordTag, account_id, date_range, record_type)
+        tags = normalize_terms(tags)
+        if tags:
+            conditions.append(RecordTag.tag.in_(tags))
+        query = (select(RecordTag.tag, year, month, func.count(), sum_cents_column(RecordTag.amount))
+                 .where(*conditions)
+                 .group_by(RecordTag.tag, year, month)
+                 .order_by(year.desc(), month.desc(), RecordTag.tag))
+        return [{"tag": tag, "month": f"{int(y):04d}-{int(m):02d}", "record_count": n, "total_amount": from_cents(cents)}
+                for tag, y, m, n, cents in self.db.execute(query)]
+
+    # ------------------------------------------------------------------
+    # 分类子树汇总：通过闭包表一次关联得到任意节点（含全部子分类）的合计
+    # ------------------------------------------------------------------
+
+    def _subtree_aggregates(self, account_id: int, ancestor_ids: List[int], date_range, record_type) -> List[Tuple]:
+        """按 (祖先分类, 月份) 聚合，返回 (ancestor_id, month, count, cents)"""
+        if not ancestor_ids:
+            return []
+        c, cc = records_table.c, CategoryClosure
+        filters = {"record_type": record_type}
+        if date_range:
+            filters.update(date_from=date_range[0], date_to=date_range[1])
+        year, month = extract("year", c.record_date), extract("month", c.record_date)
+        query = (select(cc.ancestor_id, year, month, func.count(), sum_cents_column(c.amount))
+                 .join_from(records_table, cc, cc.descendant_id == c.category_id)
+                 .where(*self._hot_conditions(account_id, filters), cc.ancestor_id.in_(ancestor_ids))
+                 .group_by(cc.ancestor_id, year, month))
+        result = [(ancestor, f"{int(y):04d}-{int(m):02d}", n, int(cents))
+                  for ancestor, y, m, n, cents in self.db.execute(query)]
+
+        # 归档部分先按叶子分类聚合，再映射到祖先
+        archived = [g for g in self._archive_aggregates(account_id, date_range)
+                    if not record_type or g[1] == _record_type_value(record_type)]
+        wanted = set(ancestor_ids)
+        ancestors = ancestor_map(self.db, (g[2] for g in archived))
+        for month_key, _, category_id, n, total, _, _ in archived:
+            for ancestor in ancestors.get(category_id, ()):
+                if ancestor in wanted:
+                    result.append((ancestor, month_key, n, total))
+        return result
+
+    def get_category_subtree_stats(self, account_id: int, category_id: int,
+                                   date_range: Optional[Tuple[datetime, datetime]] = None,
+                                   record_type=RecordType.EXPENSE) -> Dict[str, Any]:
+        """分类及其全部子分类的金额合计、记录数和月度趋势"""
+        months: Dict[str, Dict[str, Any]] = {}
+        for _, month, n, cents in self._subtree_aggregates(account_id, [category_id], date_range, record_type):
+            item = months.setdefault(month, {"month": month, "total_amount": 0, "record_count": 0})
+            item["total_amount"] += cents
+            item["record_count"] += n
+        total = sum(m["total_amount"] for m in months.values())
+        for item in months.values():
+            item["total_amount"] = from_cents(item["total_amount"])
+        trend = sorted(months.values(), key=lambda m: m["month"], reverse=True)
+        return {
+            "category_id": category_id,
+            "total_amount": from_cents(total),
+            "record_count": sum(m["record_count"] for m in trend),
+            "monthly_trend": trend,
+        }
+
+    def get_category_rollups(self, account_id: int, parent_id: Optional[int] = None,
+                             date_range: Optional[Tuple[datetime, datetime]] = None,
+                             record_type=RecordType.EXPENSE) -> List[Dict[str, Any]]:
+        """某分类的直接子分类（默认一级分类）各自子树的合计，用于逐级下钻"""
+        query = select(Category.id, Category.name, Category.icon_name, Category.color).where(
+            Category.parent_id == parent_id if parent_id is not None else Category.parent_id.is_(None),
+            Category.is_deleted == False,
+            # 系统预设分类属于默认账户，所有账本共用（与批量写入的分类校验一致）
+            or_(Category.account_id == account_id, Category.is_system == True),
+        )
+        nodes = {row.id: row for row in self.db.execute(query)}
+        totals = {node_id: {"total_amount": 0, "record_count": 0} for node_id in nodes}
+        for ancestor, _, n, cents in self._subtree_aggregates(account_id, list(nodes), date_range, record_type):
+            totals[ancestor]["total_amount"] += cents
+            totals[ancestor]["record_count"] += n
+        grand_total = sum(t["total_amount"] for t in totals.values())
+        result = [
+            {
+                "category_id": node_id,
+                "category_name": node.name,
+                "icon_name": node.icon_name,
+                "color": node.color,
+                "total_amount": from_cents(totals[node_id]["total_amount"]),
+                "record_count": totals[node_id]["record_count"],
+                "percentage": _percentage(totals[node_id]["total_amount"], grand_total),
+            }
+            for node_id, node in nodes.items()
+        ]
+        return sorted(result, key=lambda item: item["total_amount"], reverse=True)
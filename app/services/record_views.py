@@ -0,0 +1,123 @@
+# app/services/record_views.py
+import enum
+import json
+from datetime import datetime
+from typing import Dict, Iterator, Optional, Sequence
+from sqlalchemy import select, type_coerce, Text, JSON
+from sqlalchemy.orm import Session
+from app.models.record import Record
+
+# 记录只读视图：按列投影的 Core 查询结果行（元组）直接包装成 __slots__ 对象，
+# 不创建 ORM 实例、不进入 identity map；字段按位置读取，JSON 列取原始文本，首次访问时才解析。
+
+records_table = Record.__table__
+JSON_FIELDS = frozenset(c.name for c in records_table.columns if isinstance(c.type, JSON))
+
+# 列表/搜索使用的列（不含图片、元数据等详情字段）
+LIST_FIELDS = (
+    "id", "uuid", "record_type", "amount", "record_date", "description",
+    "account_id", "creator_id", "payment_account_id", "target_payment_account_id", "category_id",
+    "transfer_fee", "location", "project_name", "tags", "related_people",
+    "version", "created_at", "updated_at",
+)
+# 导出使用全部列
+EXPORT_FIELDS = tuple(c.name for c in records_table.columns)
+
+_positions: Dict[tuple, Dict[str, int]] = {}
+
+
+def _position_map(fields: Sequence[str]) -> Dict[str, int]:
+    fields = tuple(fields)
+    positions = _positions.get(fields)
+    if positions is None:
+        positions = _positions[fields] = {name: i for i, name in enumerate(fields)}
+    return positions
+
+
+class RecordView:
+    """记录只读视图（元组 + 位置映射），未投影的字段读取为 None"""
+
+    __slots__ = ("_row", "_positions", "_decoded", "category_name", "payment_account_name", "creator_name")
+
+    def __init__(self, row: Sequence, positions: Dict[str, int], decoded: Optional[dict] = None):
+        self._row = row
+        self._positions = positions
+        self._decoded = decoded
+        self.category_name = self.payment_account_name = self.creator_name = None
+
+    @classmethod
+    def from_dict(cls, row: dict, fields: Sequence[str] = LIST_FIELDS) -> "RecordView":
+        """由已解码的字典（如归档段中的记录）构造视图"""
+        decoded = {f: row.get(f) for f in fields if f in JSON_FIELDS}
+        return cls(tuple(row.get(f) for f in fields), _position_map(fields), decoded)
+
+    def _value(self, field: str):
+        i = self._positions.get(field)
+        return None if i is None else self._row[i]
+
+    def _json(self, field: str):
+        decoded = self._decoded
+        if decoded is None:
+            decoded = self._decoded = {}
+        if field not in decoded:
+            raw = self._value(field)
+            decoded[field] = json.loads(raw) if isinstance(raw, str) and raw else raw
+        return decoded[field]
+
+    def raw_json(self, field: str) -> Optional[str]:
+        """JSON 列的原始文本（导出时可直接写出，无需解析再序列化）"""
+        if self._decoded is not None and field in self._decoded:
+            value = self._decoded[field]
+            return None if value is None else json.dumps(value, ensure_ascii=False)
+        return self._value(field)
+
+    @property
+    def fields(self):
+        return tuple(self._positions)
+
+    @property
+    def sort_key(self):
+        return (self.record_date, self.created_at or datetime.min, self.id)
+
+    def to_dict(self) -> dict:
+        data = {field: getattr(self, field) for field in self._positions}
+        data["category_name"] = self.category_name
+        data["payment_account_name"] = self.payment_account_name
+        data["creator_name"] = self.creator_name
+        return data
+
+
+def _column_property(field: str):
+    if field in JSON_FIELDS:
+        return property(lambda self: self._json(field))
+
+    def getter(self):
+        value = self._value(field)
+        return value.value if isinstance(value, enum.Enum) else value
+    return property(getter)
+
+
+for _field in EXPORT_FIELDS:
+    setattr(RecordView, _field, _column_property(_field))
+
+
+def projection(fields: Sequence[str] = LIST_FIELDS):
+    """投影查询：JSON 列按文本读取，跳过驱动层的 JSON 解析"""
+    columns = [
+        type_coerce(records_table.c[f], Text).label(f) if f in JSON_FIELDS else records_table.c[f]
+        for f in fields
+    ]
+    return select(*columns)
+
+
+def fetch_views(db: Session, query, fields: Sequence[str] = LIST_FIELDS):
+    positions = _position_map(fields)
+    return [RecordView(row, positions) for row in db.execute(query)]
+
+
+def stream_views(db: Session, query, fields: Sequence[str] = EXPORT_FIELDS, batch_size: int = 1000) -> Iterator[RecordView]:
+    """服务端游标分批读取，导出大量记录时内存占用恒定"""
+    positions = _position_map(fields)
+    result = db.execute(query.execution_options(stream_results=True, yield_per=batch_size))
+    for row in result:
+        yield RecordView(row, positions)
@@ -0,0 +1,100 @@
+"""批量写入基准：batch_operations 的新增/修改/删除吞吐
+
+按批调用 batch_operations（与 /records:bulk 每块一次调用相同），统计每秒处理的记录数。
+--profile 时用 cProfile 输出最耗时的函数，便于定位计数维护、标签索引等开销。
+
+    python scripts/bench_batch.py --records 200000 --batch-size 1000
+    python scripts/bench_batch.py --records 50000 --tags --profile
+"""
+import argparse
+import cProfile
+import pstats
+import random
+import time
+from datetime import datetime, timedelta
+
+from bench_common import setup_database, seed_ledger
+
+
+def _operations(count: int, payment_account_id: int, category_ids: list, tags: bool) -> list:
+    start = datetime(2024, 1, 1)
+    operations = []
+    for i in range(count):
+        data = {
+            "record_type": "expense" if i % 5 else "income",
+            "amount": f"{random.randint(100, 99999) / 100:.2f}",
+            "record_date": start + timedelta(minutes=i * 7),
+            "description": f"基准记录 {i}",
+            "payment_account_id": payment_account_id,
+            "category_id": category_ids[i % len(category_ids)],
+        }
+        if tags:
+            data["tags"] = ["日常", f"标签{i % 20}"]
+        operations.append({"op": "create", "data": data})
+    return operations
+
+
+def _run(label: str, db, account_id: int, user_id: int, batches: list) -> float:
+    from app.services.record_batch import batch_operations
+
+    total = sum(len(batch) for batch in batches)
+    began = time.perf_counter()
+    results = []
+    for batch in batches:
+        results.append(batch_operations(db, account_id, user_id, batch))
+    elapsed = time.perf_counter() - began
+    failed = sum(result["failed"] for result in results)
+    print(f"{label:>6}: {total} 条, {elapsed:.2f} 秒, {total / elapsed:>8.0f} 条/秒" + (f", 失败 {failed}" if failed else ""))
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="数据库连接串，默认使用临时 SQLite 文件")
+    parser.add_argument("--records", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--tags", action="store_true", help="记录带标签（计入标签索引维护）")
+    parser.add_argument("--profile", action="store_true")
+    args = parser.parse_args()
+
+    setup_database(args.url, prefix="bench_batch_")
+    user_id, account_id, payment_account_id = seed_ledger()
+
+    from sqlalchemy import select
+    from app.core.counters import find_drift, find_month_count_drift
+    from app.core.database import SessionLocal
+    from app.models.category import Category
+
+    profiler = cProfile.Profile() if args.profile else None
+    with SessionLocal(info={"use_primary": True}) as db:
+        category_ids = db.scalars(select(Category.id).where(Category.is_system == True)).all()
+        operations = _operations(args.records, payment_account_id, category_ids, args.tags)
+        batches = [operations[i:i + args.batch_size] for i in range(0, len(operations), args.batch_size)]
+        if profiler:
+            profiler.enable()
+        _run("新增", db, account_id, user_id, batches)
+
+        from app.models.record import Record
+        ids = db.scalars(select(Record.id).where(Record.account_id == account_id).order_by(Record.id)).all()
+        updates = [{"op": "update", "id": record_id, "data": {"amount": f"{random.randint(100, 99999) / 100:.2f}",
+                                                              "description": "已修改"}}
+                   for record_id in ids]
+        _run("修改", db, account_id, user_id, [updates[i:i + args.batch_size]
+                                              for i in range(0, len(updates), args.batch_size)])
+        deletes = [{"op": "delete", "id": record_id} for record_id in ids[::2]]
+        _run("删除", db, account_id, user_id, [deletes[i:i + args.batch_size]
+                                              for i in range(0, len(deletes), args.batch_size)])
+        if profiler:
+            profiler.disable()
+
+        drift = find_drift(db)
+        month_drift = find_month_count_drift(db)
+        if any(drift.values()) or month_drift:
+            print(f"计数不一致: {drift} {month_drift}")
+
+    if profiler:
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+
+
+if __name__ == "__main__":
+    main()
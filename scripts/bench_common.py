@@ -0,0 +1,112 @@
+"""基准脚本的公共部分：在导入 app 之前准备数据库
+
+settings 和引擎在导入 app 时创建，脚本须先调用 setup_database() 再导入 app 模块。
+未指定 --url 时使用临时 SQLite 文件，脚本结束后删除。
+"""
+import atexit
+import os
+import random
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 合成记录的日期范围
+START = datetime(2020, 1, 1)
+DAYS = 5 * 365
+
+
+def setup_database(url: str = None, prefix: str = "bench_") -> str:
+    """设置 DATABASE_URL 等环境变量，返回实际使用的连接串"""
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    if url is None:
+        workdir = tempfile.mkdtemp(prefix=prefix)
+        atexit.register(shutil.rmtree, workdir, True)
+        url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["DATABASE_URL"] = url
+    os.environ.setdefault("DATABASE_REPLICA_URLS", "")
+    os.environ.setdefault("SQL_ECHO", "False")
+    return url
+
+
+def seed_ledger():
+    """建表并创建一个用户、账本和支付账户，返回 (user_id, account_id, payment_account_id)"""
+    from uuid import uuid4
+    from app.core.database import SessionLocal
+    from app.core.init_db import init_database
+    from app.models.account import Account
+    from app.models.payment_account import PaymentAccount, PaymentAccountType
+    from app.models.user import User
+
+    init_database()
+    with SessionLocal(info={"use_primary": True}) as db:
+        user = User(username=f"bench_{uuid4().hex[:12]}", password_hash="-", nickname="基准测试")
+        db.add(user)
+        db.flush()
+        account = Account(name="基准账本", owner_id=user.id)
+        db.add(account)
+        db.flush()
+        payment = PaymentAccount(name="现金", account_type=PaymentAccountType.SAVINGS,
+                                 account_id=account.id, created_by=user.id)
+        db.add(payment)
+        db.commit()
+        return user.id, account.id, payment.id
+
+
+def seed_accounts(user_id: int, account_id: int, payment_account_id: int, count: int):
+    """在 seed_ledger 的账本之外再建 count - 1 个账本，返回 ([(账本ID, 支付账户ID)], 系统分类ID)"""
+    from sqlalchemy import select
+    from app.core.database import SessionLocal
+    from app.models.account import Account
+    from app.models.category import Category
+    from app.models.payment_account import PaymentAccount, PaymentAccountType
+
+    with SessionLocal(info={"use_primary": True}) as db:
+        accounts = [(account_id, payment_account_id)]
+        for i in range(count - 1):
+            account = Account(name=f"基准账本{i}", owner_id=user_id)
+            db.add(account)
+            db.flush()
+            payment = PaymentAccount(name="现金", account_type=PaymentAccountType.SAVINGS,
+                                     account_id=account.id, created_by=user_id)
+            db.add(payment)
+            db.flush()
+            accounts.append((account.id, payment.id))
+        db.commit()
+        categories = db.scalars(select(Category.id).where(Category.is_system == True)).all()
+    return accounts, categories
+
+
+def load_records(count: int, accounts: list, categories: list, user_id: int, chunk: int = 50000):
+    """绕过 ORM 直接 executemany 写入随机记录（START 起 DAYS 天内），千万级数据也能在几分钟内生成"""
+    from app.core.config import settings
+    from app.core.database import engine
+    from app.core.uuid7 import uuid7
+
+    dialect = engine.dialect
+    columns = ("uuid", "record_type", "amount", "record_date", "description", "account_id", "creator_id",
+               "payment_account_id", "category_id", "is_deleted", "version")
+    placeholder = "?" if dialect.paramstyle == "qmark" else "%s"
+    sql = f"INSERT INTO records ({', '.join(columns)}) VALUES ({', '.join([placeholder] * len(columns))})"
+    sqlite = dialect.name == "sqlite"
+    rng = random.Random(42)
+    for start in range(0, count, chunk):
+        rows = []
+        for i in range(start, min(start + chunk, count)):
+            account_id, payment_account_id = accounts[rng.randrange(len(accounts))]
+            record_date = START + timedelta(minutes=rng.randrange(DAYS * 24 * 60))
+            value = uuid7()
+            rows.append((
+                value.bytes if settings.UUID_BINARY_STORAGE else str(value),
+                "INCOME" if rng.random() < 0.15 else "EXPENSE",
+                f"{rng.randint(100, 500000) / 100:.2f}",
+                f"{record_date:%Y-%m-%d %H:%M:%S.%f}" if sqlite else record_date,
+                f"合成记录 {i}", account_id, user_id, payment_account_id,
+                categories[rng.randrange(len(categories))], False, 1,
+            ))
+        with engine.begin() as conn:
+            conn.exec_driver_sql(sql, rows)
+        if (start // chunk) % 20 == 19:
+            print(f"  已写入 {start + len(rows)} 条")
@@ -0,0 +1,161 @@
+"""登录基准：并发登录时登录接口和无关接口的延迟分位数
+
+启动本地 uvicorn（或使用 --base-url 指定的已运行服务），先通过注册接口创建测试用户，
+再用 --concurrency 个协程持续登录 --duration 秒，同时每 50ms 探测一次 GET /。
+bcrypt 占满线程池时无关接口也会排队，探测延迟的 p99 反映这一点。
+
+--mode threadpool 模拟改动前的做法：bcrypt 在 FastAPI 共享线程池中执行（不经过进程池和排队上限），
+用于和默认的进程池模式对比（未模拟旧实现在哈希期间占用数据库连接）。
+
+    python scripts/bench_login.py --concurrency 64
+    python scripts/bench_login.py --concurrency 64 --mode threadpool
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "bench-password"
+
+# threadpool 模式的启动代码：把进程池调度替换为线程池后再启动 uvicorn
+THREADPOOL_BOOTSTRAP = """
+import sys, uvicorn
+from starlette.concurrency import run_in_threadpool
+import app.core.hashing as hashing
+
+async def _run_in_threadpool(func, *args):
+    return await run_in_threadpool(func, *args)
+
+hashing._run_in_pool = _run_in_threadpool
+uvicorn.run("app.main:app", port=int(sys.argv[1]), log_level="warning")
+"""
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentiles(samples: list) -> str:
+    if not samples:
+        return "无数据"
+    samples = sorted(samples)
+
+    def at(q):
+        return samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+
+    return f"p50 {at(0.5):7.1f}ms  p95 {at(0.95):7.1f}ms  p99 {at(0.99):7.1f}ms  ({len(samples)} 次)"
+
+
+async def _wait_ready(client: httpx.AsyncClient, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("服务启动超时")
+
+
+async def _register(client: httpx.AsyncClient, emails: list):
+    semaphore = asyncio.Semaphore(8)
+
+    async def one(email):
+        async with semaphore:
+            response = await client.post("/users/register", json={
+                "email": email, "password": PASSWORD, "verification_code": "0000",
+            })
+            # 重复运行时用户已存在
+            if response.status_code not in (200, 400):
+                raise RuntimeError(f"注册失败: {response.status_code} {response.text}")
+
+    await asyncio.gather(*(one(email) for email in emails))
+
+
+async def _load(client: httpx.AsyncClient, emails: list, concurrency: int, duration: float) -> dict:
+    login_times, probe_times, statuses = [], [], {}
+    deadline = time.monotonic() + duration
+
+    async def login_worker(offset):
+        i = offset
+        while time.monotonic() < deadline:
+            began = time.perf_counter()
+            response = await client.post("/users/login", json={"email": emails[i % len(emails)], "password": PASSWORD})
+            login_times.append(time.perf_counter() - began)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            i += concurrency
+
+    async def probe():
+        while time.monotonic() < deadline:
+            began = time.perf_counter()
+            await client.get("/")
+            probe_times.append(time.perf_counter() - began)
+            await asyncio.sleep(0.05)
+
+    began = time.perf_counter()
+    await asyncio.gather(probe(), *(login_worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - began
+    return {"login": login_times, "probe": probe_times, "statuses": statuses, "elapsed": elapsed}
+
+
+async def run(base_url: str, users: int, concurrency: int, duration: float):
+    limits = httpx.Limits(max_connections=concurrency + 8, max_keepalive_connections=concurrency + 8)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        await _wait_ready(client)
+        emails = [f"bench_login_{i}@example.com" for i in range(users)]
+        await _register(client, emails)
+        result = await _load(client, emails, concurrency, duration)
+    logins = len(result["login"])
+    print(f"并发 {concurrency}, {duration:.0f} 秒, 登录 {logins} 次 ({logins / result['elapsed']:.1f} 次/秒), "
+          f"状态码 {result['statuses']}")
+    print(f"  登录   {_percentiles(result['login'])}")
+    print(f"  GET /  {_percentiles(result['probe'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", help="已运行服务的地址；不指定时在临时 SQLite 库上启动本地 uvicorn")
+    parser.add_argument("--mode", choices=("pool", "threadpool"), default="pool",
+                        help="启动本地服务时 bcrypt 的执行方式：进程池（当前实现）或共享线程池（改动前）")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=20)
+    args = parser.parse_args()
+
+    if args.base_url:
+        asyncio.run(run(args.base_url, args.users, args.concurrency, args.duration))
+        return
+
+    port = _free_port()
+    with tempfile.TemporaryDirectory(prefix="bench_login_") as workdir:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+            "DATABASE_REPLICA_URLS": "",
+            "ADMISSION_ENABLED": "False",
+            "SQL_ECHO": "False",
+        }
+        if args.mode == "threadpool":
+            command = [sys.executable, "-c", THREADPOOL_BOOTSTRAP, str(port)]
+        else:
+            command = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"]
+        server = subprocess.Popen(command, cwd=ROOT, env=env)
+        try:
+            asyncio.run(run(f"http://127.0.0.1:{port}", args.users, args.concurrency, args.duration))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""分页基准：对比键集分页与 OFFSET 分页在第 1 页和深页（默认第 1000 页）的耗时
+
+键集分页按游标直接定位，深页耗时应与第 1 页相同；OFFSET 分页要先跳过前面的行，耗时随页码增长。
+生成 --records 条记录（分布在 --accounts 个账本），在第一个账本上逐页取到最深的页码，
+记下各目标页的游标，再分别重复 --repeat 次计时，输出中位数和 p95。
+
+    python scripts/bench_pagination.py --records 1000000 --accounts 10 --pages 1,100,1000
+"""
+import argparse
+import statistics
+import time
+
+from bench_common import setup_database, seed_ledger, seed_accounts, load_records
+
+
+def _ms(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] * 1000
+
+
+def _timed(repeat: int, func, *args, **kwargs):
+    func(*args, **kwargs)  # 预热
+    timings = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        func(*args, **kwargs)
+        timings.append(time.perf_counter() - began)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="数据库连接串，默认使用临时 SQLite 文件")
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--accounts", type=int, default=10)
+    parser.add_argument("--pages", default="1,100,1000", help="要对比的页码，逗号分隔")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+    pages = sorted({int(page) for page in args.pages.split(",")})
+
+    setup_database(args.url, prefix="bench_pagination_")
+    user_id, account_id, payment_account_id = seed_ledger()
+
+    from sqlalchemy import func, select, text
+    from app.core.database import SessionLocal, engine
+    from app.models.record import Record
+    from app.services.record_service import RecordService
+
+    accounts, categories = seed_accounts(user_id, account_id, payment_account_id, args.accounts)
+    began = time.perf_counter()
+    load_records(args.records, accounts, categories, user_id)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    print(f"生成 {args.records} 条记录: {time.perf_counter() - began:.0f} 秒")
+
+    with SessionLocal(info={"use_primary": True}) as db:
+        service = RecordService(db)
+        total = db.scalar(select(func.count()).where(Record.account_id == account_id))
+        print(f"账本 {account_id} 共 {total} 条记录，每页 {args.page_size} 条")
+        if total < pages[-1] * args.page_size:
+            parser.error(f"记录不足 {pages[-1]} 页，请增大 --records 或减小 --accounts")
+
+        # 逐页前进，记下每个目标页的游标
+        cursors, cursor = {}, None
+        for page in range(1, pages[-1] + 1):
+            if page in pages:
+                cursors[page] = cursor
+            if page < pages[-1]:
+                cursor = service.get_records_cursor(account_id, cursor=cursor,
+                                                    page_size=args.page_size)["pagination"]["next_cursor"]
+
+        print(f"{'页码':>6}{'键集 中位数/p95 (ms)':>24}{'OFFSET 中位数/p95 (ms)':>26}")
+        for page in pages:
+            keyset_page = service.get_records_cursor(account_id, cursor=cursors[page], page_size=args.page_size)
+            offset_page = service.get_records_paginated(account_id, page=page, page_size=args.page_size,
+                                                        include_total=False)
+            # 两种分页取到的应是同一页
+            assert [r["id"] for r in keyset_page["records"]] == [r["id"] for r in offset_page["records"]]
+            keyset = _timed(args.repeat, service.get_records_cursor, account_id, cursor=cursors[page],
+                            page_size=args.page_size)
+            offset = _timed(args.repeat, service.get_records_paginated, account_id, page=page,
+                            page_size=args.page_size, include_total=False)
+            db.rollback()
+            print(f"{page:>6}{statistics.median(keyset) * 1000:>14.2f} /{_ms(keyset, 0.95):>8.2f}"
+                  f"{statistics.median(offset) * 1000:>16.2f} /{_ms(offset, 0.95):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
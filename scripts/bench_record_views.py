@@ -0,0 +1,104 @@
+"""记录视图基准：每 10k 行的内存与 CPU，记录视图（Core 投影 + __slots__）对比 ORM 实例
+
+分别用两种方式读取同一批记录并序列化为字典：
+- ORM：db.query(Record) 取完整实例（进入 identity map），再按列表字段转字典；
+- 视图：projection(LIST_FIELDS) + fetch_views，JSON 列按需解析。
+统计读取阶段和"读取 + 序列化"的 CPU 时间（process_time）以及 tracemalloc 峰值内存，取多次运行的中位数；
+会话在读取后关闭，峰值内存包含结果在会话关闭前占用的全部对象。
+
+    python scripts/bench_record_views.py --rows 10000 --repeat 5
+"""
+import argparse
+import gc
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from bench_common import setup_database, seed_ledger
+
+
+def _seed(account_id: int, user_id: int, payment_account_id: int, rows: int):
+    from app.core.database import SessionLocal
+    from app.services.record_batch import batch_operations
+
+    start = datetime(2024, 1, 1)
+    with SessionLocal(info={"use_primary": True}) as db:
+        for offset in range(0, rows, 1000):
+            batch_operations(db, account_id, user_id, [{"op": "create", "data": {
+                "record_type": "expense", "amount": f"{i % 500 + 1}.50", "record_date": start + timedelta(minutes=i),
+                "description": f"午餐 {i}", "payment_account_id": payment_account_id, "location": "公司楼下",
+                "tags": ["餐饮", f"标签{i % 10}"], "related_people": ["小王"],
+                "images": [f"https://example.com/{i}.jpg"], "metadata": {"source": "bench", "index": i},
+            }} for i in range(offset, min(offset + 1000, rows))])
+
+
+def _measure(func) -> dict:
+    """CPU 时间和峰值内存分两次运行测量（tracemalloc 本身会拖慢执行）"""
+    gc.collect()
+    began = time.process_time()
+    result = func()
+    cpu = time.process_time() - began
+    del result
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return {"cpu": cpu, "peak": peak}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="数据库连接串，默认使用临时 SQLite 文件")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_database(args.url, prefix="bench_record_views_")
+    user_id, account_id, payment_account_id = seed_ledger()
+    _seed(account_id, user_id, payment_account_id, args.rows)
+
+    from app.core.database import SessionLocal
+    from app.models.record import Record
+    from app.services.record_views import LIST_FIELDS, fetch_views, projection, records_table
+
+    c = records_table.c
+    order = (c.record_date.desc(), c.created_at.desc(), c.id.desc())
+
+    def orm_rows(db):
+        return db.query(Record).filter(Record.account_id == account_id).order_by(*order).limit(args.rows).all()
+
+    def view_rows(db):
+        query = projection(LIST_FIELDS).where(c.account_id == account_id).order_by(*order).limit(args.rows)
+        return fetch_views(db, query)
+
+    def orm_dict(record):
+        data = {field: getattr(record, field) for field in LIST_FIELDS}
+        data["record_type"] = record.record_type.value
+        return data
+
+    cases = {
+        "ORM 读取": lambda db: orm_rows(db),
+        "视图读取": lambda db: view_rows(db),
+        "ORM 读取+序列化": lambda db: [orm_dict(r) for r in orm_rows(db)],
+        "视图读取+序列化": lambda db: [v.to_dict() for v in view_rows(db)],
+    }
+    scale = 10_000 / args.rows
+    print(f"{args.rows} 行, 重复 {args.repeat} 次, 以下为每 10k 行的中位数")
+    for name, case in cases.items():
+        samples = []
+        for _ in range(args.repeat):
+            # 每次读取使用新会话，ORM 的 identity map 不会复用上一次的实例
+            def run():
+                with SessionLocal(info={"use_primary": True}) as db:
+                    return case(db)
+            samples.append(_measure(run))
+        cpu = statistics.median(s["cpu"] for s in samples) * scale
+        peak = statistics.median(s["peak"] for s in samples) * scale
+        print(f"  {name:<12} CPU {cpu * 1000:>8.1f} ms   峰值内存 {peak / 1024 / 1024:>7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""注册基准：已有大量用户时，开启/关闭已注册标识过滤器的注册吞吐
+
+先批量写入 --users 个用户（默认 100 万），再直接调用注册路由函数：
+- 关闭过滤器（未重建时的行为）：每次注册先查一次邮箱/手机号是否已被占用；
+- 开启过滤器：过滤器判定"一定未注册"时跳过预检查，只剩插入。
+bcrypt 耗时与过滤器无关且远大于数据库开销，基准中替换为预先算好的哈希，只比较数据库路径。
+
+    python scripts/bench_register.py --users 1000000 --registrations 5000
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from bench_common import setup_database
+
+
+def _seed_users(count: int, chunk: int = 20000) -> float:
+    from sqlalchemy import insert
+    from app.core.database import engine
+    from app.core.uuid7 import uuid7_str
+    from app.models.user import User, UserLevel, UserStatus
+
+    began = time.perf_counter()
+    for start in range(0, count, chunk):
+        rows = [{
+            "uuid": uuid7_str(), "username": f"seed_{i}", "email": f"seed_{i}@example.com",
+            "phone": f"1{i:010d}", "password_hash": "-", "user_level": UserLevel.FREE,
+            "user_status": UserStatus.ACTIVE,
+        } for i in range(start, min(start + chunk, count))]
+        with engine.begin() as conn:
+            conn.execute(insert(User.__table__), rows)
+    return time.perf_counter() - began
+
+
+async def _register_many(emails: list, concurrency: int) -> dict:
+    from fastapi import HTTPException
+    from app.routes.user import register
+    from app.schemas.users import UserCreate
+
+    statuses = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(email):
+        async with semaphore:
+            try:
+                await register(UserCreate(email=email, password="bench-password", verification_code="0000"))
+                status = 200
+            except HTTPException as e:
+                status = e.status_code
+            statuses[status] = statuses.get(status, 0) + 1
+
+    began = time.perf_counter()
+    await asyncio.gather(*(one(email) for email in emails))
+    return {"elapsed": time.perf_counter() - began, "statuses": statuses}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="数据库连接串，默认使用临时 SQLite 文件")
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--registrations", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    setup_database(args.url, prefix="bench_register_")
+    from app.core import hashing
+    from app.core.bloom import identifier_filter
+    from app.core.database import SessionLocal
+    from app.core.init_db import init_database
+    from app.routes import user as user_routes
+
+    init_database()
+    print(f"写入 {args.users} 个用户: {_seed_users(args.users):.1f} 秒")
+
+    password_hash = hashing.get_password_hash("bench-password")
+
+    async def precomputed_hash(password):
+        return password_hash
+
+    user_routes.get_password_hash_async = precomputed_hash
+
+    tracemalloc.start()
+    began = time.perf_counter()
+    with SessionLocal(info={"use_primary": True}) as db:
+        count = identifier_filter.rebuild(db)
+    rebuilt = time.perf_counter() - began
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"重建过滤器: {count} 个标识, {rebuilt:.1f} 秒, 位图 {identifier_filter._filter.num_bits / 8 / 1024 / 1024:.1f} MB, "
+          f"重建峰值内存 {peak / 1024 / 1024:.1f} MB")
+
+    taken = [f"seed_{i}@example.com" for i in range(0, args.users, max(args.users // 200, 1))]
+    asyncio.run(_compare(identifier_filter, taken, args.registrations, args.concurrency))
+
+
+async def _compare(identifier_filter, taken: list, registrations: int, concurrency: int):
+    """同一事件循环内依次测量关闭/开启过滤器，结束时释放异步连接池"""
+    from app.core.database import dispose_async_engine
+
+    ready = identifier_filter._filter
+    try:
+        for label, use_filter in (("关闭过滤器", False), ("开启过滤器", True)):
+            identifier_filter._filter = ready if use_filter else None
+            emails = [f"new_{int(use_filter)}_{i}@example.com" for i in range(registrations)]
+            fresh = await _register_many(emails, concurrency)
+            duplicate = await _register_many(taken, concurrency)
+            print(f"{label}: 新用户 {registrations / fresh['elapsed']:>7.0f} 次/秒 {fresh['statuses']}, "
+                  f"已注册邮箱 {len(taken) / duplicate['elapsed']:>7.0f} 次/秒 {duplicate['statuses']}")
+    finally:
+        await dispose_async_engine()
+
+
+if __name__ == "__main__":
+    main()
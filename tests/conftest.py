@@ -0,0 +1,84 @@
+# tests/conftest.py
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from uuid import uuid4
+
+# settings 在导入时读取环境变量，测试库和开关必须在导入 app 之前设置
+_TEST_DIR = tempfile.mkdtemp(prefix="bookkeeping-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TEST_DIR, 'test.db')}"
+os.environ["DATABASE_REPLICA_URLS"] = ""
+# 未声明加载配置的关系访问直接报错，N+1 回归在测试中失败
+os.environ["ORM_RAISE_ON_LAZY_LOAD"] = "True"
+os.environ["ADMISSION_ENABLED"] = "False"
+
+import pytest
+from app.core.database import SessionLocal, engine
+from app.core.init_db import init_database
+from app.models.account import Account
+from app.models.payment_account import PaymentAccount, PaymentAccountType
+from app.models.record import RecordType
+from app.models.user import User
+from app.services.record_batch import batch_operations
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    init_database()
+    yield
+    engine.dispose()
+    shutil.rmtree(_TEST_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal(info={"use_primary": True})
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def owner(db):
+    user = User(username=f"user_{uuid4().hex[:12]}", password_hash="-", nickname="测试用户")
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def account(db, owner):
+    account = Account(name="测试账本", owner_id=owner.id)
+    db.add(account)
+    db.commit()
+    return account
+
+
+@pytest.fixture
+def payment_account(db, account, owner):
+    payment_account = PaymentAccount(name="现金", account_type=PaymentAccountType.SAVINGS,
+                                     account_id=account.id, created_by=owner.id)
+    db.add(payment_account)
+    db.commit()
+    return payment_account
+
+
+@pytest.fixture
+def add_records(db, account, owner, payment_account):
+    """批量写入记录，返回新记录 ID；dates 为记录日期列表，其余字段可通过关键字参数覆盖"""
+    def add(dates, record_type=RecordType.EXPENSE, amount="10.00", **values):
+        operations = [{"op": "create", "data": {
+            "record_type": record_type, "amount": amount, "record_date": date,
+            "payment_account_id": payment_account.id, **values,
+        }} for date in dates]
+        result = batch_operations(db, account.id, owner.id, operations)
+        assert result["failed"] == 0, result
+        return [item["id"] for item in result["results"]]
+    return add
+
+
+def month_dates(year: int, month: int, count: int):
+    """某月内 count 个不同的记录日期（按时间递增）"""
+    return [datetime(year, month, 1 + i % 28, 8 + i // 28 % 12, i // 336 % 60) for i in range(count)]
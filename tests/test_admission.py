@@ -0,0 +1,81 @@
+# tests/test_admission.py
+import asyncio
+import pytest
+from app.core import admission
+from app.core.admission import AdmissionControlMiddleware, LevelState, DEFAULT_LIMITS, AUTH_CLASS, BULK_CLASS
+from app.core.config import settings
+from app.core.security import create_access_token
+
+
+@pytest.fixture
+def levels(monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", True)
+    fresh = {name: LevelState(limits) for name, limits in DEFAULT_LIMITS.items()}
+    monkeypatch.setattr(admission, "admission_levels", fresh)
+    return fresh
+
+
+def _scope(path, token=None):
+    headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+    return {"type": "http", "path": path, "headers": headers}
+
+
+def _call(middleware, scope):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+    asyncio.run(middleware(scope, None, send))
+    return sent[0]["status"] if sent else 200
+
+
+def test_admission_is_off_by_default():
+    assert settings.ADMISSION_ENABLED is False
+
+
+def test_requests_are_classified_by_route_and_level(levels):
+    middleware = AdmissionControlMiddleware(lambda scope, receive, send: asyncio.sleep(0))
+    premium = create_access_token({"sub": "someone", "lvl": "premium"})
+    assert middleware._resolve_class(_scope("/users/login")) == AUTH_CLASS
+    assert middleware._resolve_class(_scope("/users/token/refresh", premium)) == AUTH_CLASS
+    assert middleware._resolve_class(_scope("/records:import", premium)) == BULK_CLASS
+    assert middleware._resolve_class(_scope("/records", premium)) == "premium"
+    assert middleware._resolve_class(_scope("/records")) == "free"
+
+
+def test_auth_routes_do_not_drain_the_free_bucket(levels):
+    middleware = AdmissionControlMiddleware(lambda scope, receive, send: asyncio.sleep(0))
+    for _ in range(int(DEFAULT_LIMITS["free"].burst) + 10):
+        assert _call(middleware, _scope("/users/login")) == 200
+    assert levels["free"].admitted == 0
+    assert _call(middleware, _scope("/records")) == 200
+
+
+def test_long_streams_use_their_own_slots(levels):
+    async def scenario():
+        release = asyncio.Event()
+
+        async def app(scope, receive, send):
+            if scope["path"] in admission.BULK_PATHS:
+                await release.wait()
+
+        middleware = AdmissionControlMiddleware(app)
+        statuses = []
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+        uploads = [asyncio.create_task(middleware(_scope("/records:bulk"), None, send))
+                   for _ in range(DEFAULT_LIMITS[BULK_CLASS].concurrency)]
+        await asyncio.sleep(0)
+        # 批量通道已满：新的批量请求立即 503，普通请求不受影响
+        await middleware(_scope("/records:bulk"), None, send)
+        await middleware(_scope("/records"), None, send)
+        release.set()
+        await asyncio.gather(*uploads)
+        return statuses
+
+    assert asyncio.run(scenario()) == [503]
+    assert levels["free"].admitted == 1
+    assert levels[BULK_CLASS].admitted == DEFAULT_LIMITS[BULK_CLASS].concurrency
+    assert levels["free"].avg_service_time < 0.05
@@ -0,0 +1,145 @@
+# tests/test_category_tree.py
+from datetime import datetime
+from decimal import Decimal
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import Session
+from app.core.category_tree import closure, move_category, merge_categories
+from app.core.config import settings
+from app.core.counters import find_drift
+from app.models.account import Account
+from app.models.category import Category
+from app.models.record import RecordType
+from app.services.record_service import RecordService
+
+
+def _category(db, account, name, parent=None, **values):
+    category = Category(name=name, level=1 if parent is None else parent.level + 1, account_id=account.id,
+                        parent_id=parent.id if parent is not None else None, **values)
+    db.add(category)
+    db.commit()
+    return category
+
+
+def _closure(db, ids):
+    return set(db.execute(select(closure.c.ancestor_id, closure.c.descendant_id, closure.c.depth)
+                          .where(closure.c.descendant_id.in_(ids))).all())
+
+
+def _expected_closure(db, ids):
+    """按 parent_id 链推算的闭包行"""
+    parents = dict(db.execute(select(Category.id, Category.parent_id),
+                              execution_options={"include_deleted": True}).all())
+    rows = set()
+    for category_id in ids:
+        node, depth = category_id, 0
+        while node is not None:
+            rows.add((node, category_id, depth))
+            node, depth = parents[node], depth + 1
+    return rows
+
+
+@pytest.fixture
+def tree(db, account):
+    food = _category(db, account, "餐饮")
+    breakfast = _category(db, account, "早餐", food)
+    bun = _category(db, account, "包子", breakfast)
+    travel = _category(db, account, "出行")
+    return food, breakfast, bun, travel
+
+
+def test_new_categories_get_closure_rows(db, tree):
+    ids = [c.id for c in tree]
+    assert _closure(db, ids) == _expected_closure(db, ids)
+
+
+def test_move_rewrites_closure_and_paths(db, account, tree):
+    food, breakfast, bun, travel = tree
+    move_category(db, breakfast.id, travel.id)
+    ids = [c.id for c in tree]
+    assert _closure(db, ids) == _expected_closure(db, ids)
+    db.refresh(bun)
+    assert (bun.level, bun.full_path) == (3, "出行/早餐/包子")
+
+    other = Account(name="别人的账本", owner_id=account.owner_id)
+    db.add(other)
+    db.commit()
+    foreign = _category(db, other, "外部")
+    system = _category(db, account, "系统", is_system=True)
+    for category, parent in ((travel, bun), (breakfast, foreign), (foreign, travel), (system, travel)):
+        with pytest.raises(HTTPException) as error:
+            move_category(db, category.id, parent.id)
+        assert error.value.status_code == 400
+    db.refresh(breakfast)
+    assert breakfast.parent_id == travel.id and breakfast.full_path == "出行/早餐"
+    assert _closure(db, ids) == _expected_closure(db, ids)
+
+
+def test_merge_moves_records_children_and_counters(db, account, owner, tree, add_records):
+    food, breakfast, bun, travel = tree
+    add_records([datetime(2024, 1, 1)] * 3, category_id=breakfast.id)
+    add_records([datetime(2024, 1, 2)], category_id=travel.id)
+
+    assert merge_categories(db, breakfast.id, travel.id) == 3
+    ids = [c.id for c in tree]
+    assert _closure(db, ids) == _expected_closure(db, ids)
+    db.refresh(bun)
+    db.refresh(travel)
+    assert bun.parent_id == travel.id and bun.full_path == "出行/包子"
+    assert travel.record_count == 4
+    drift = find_drift(db)
+    assert not set(drift["categories"]) & set(ids)
+    assert account.id not in drift["accounts"]
+
+
+def test_merge_rejects_other_accounts_system_and_mismatched_types(db, owner, account, tree, add_records):
+    food, breakfast, bun, travel = tree
+    other = Account(name="别人的账本", owner_id=owner.id)
+    db.add(other)
+    db.commit()
+    foreign = _category(db, other, "外部")
+    system = _category(db, account, "系统", is_system=True)
+    salary = _category(db, account, "工资")
+    add_records([datetime(2024, 2, 1)], category_id=food.id)
+    add_records([datetime(2024, 2, 1)], record_type=RecordType.INCOME, category_id=salary.id)
+
+    for source, target in ((food, foreign), (system, travel), (food, salary)):
+        with pytest.raises(HTTPException) as error:
+            merge_categories(db, source.id, target.id)
+        assert error.value.status_code == 400
+    db.refresh(food)
+    assert not food.is_deleted and food.record_count == 1
+
+
+def test_hard_delete_with_foreign_keys_enforced(db, account):
+    # SQLite 默认不检查外键，单独开一个强制外键的连接，模拟 MySQL/TiDB
+    engine = create_engine(settings.DATABASE_URL)
+    event.listen(engine, "connect", lambda connection, _: connection.execute("PRAGMA foreign_keys=ON"))
+    try:
+        with Session(engine) as session:
+            parent = Category(name="临时", level=1, account_id=account.id)
+            session.add(parent)
+            session.flush()
+            child = Category(name="临时子类", level=2, account_id=account.id, parent_id=parent.id)
+            session.add(child)
+            session.commit()
+            ids = [parent.id, child.id]
+            session.delete(child)
+            session.commit()
+            session.delete(parent)
+            session.commit()
+            assert _closure(session, ids) == set()
+    finally:
+        engine.dispose()
+
+
+def test_rollups_include_shared_system_categories(db, account, add_records):
+    # 系统预设分类挂在默认账户下，其他账本的记录也可以使用
+    food = db.scalar(select(Category).where(Category.is_system == True, Category.name == "餐饮"))
+    assert food.account_id != account.id
+    add_records([datetime(2024, 3, 1)], category_id=food.id)
+
+    rollups = {item["category_id"]: item for item in RecordService(db).get_category_rollups(account.id)}
+    assert rollups[food.id]["total_amount"] == Decimal("10.00")
+    assert rollups[food.id]["record_count"] == 1
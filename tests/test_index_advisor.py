@@ -0,0 +1,55 @@
+# tests/test_index_advisor.py
+from datetime import datetime
+from sqlalchemy import select
+from app.core.index_advisor import IndexAdvisor, extract_shape
+from app.core.pagination import NEXT
+from app.models import Base
+from app.models.record_archive import RecordArchiveSegment
+from app.models.record import RecordType
+from app.services.record_archive import records_table
+from app.services.record_service import RecordService
+
+c = records_table.c
+ORDER = (c.record_date.desc(), c.created_at.desc(), c.id.desc())
+
+
+def _keyset_page(*conditions):
+    key = (datetime(2024, 1, 1), datetime(2024, 1, 2), 10)
+    return select(records_table).where(
+        c.account_id == 1, c.is_deleted == False, *conditions, RecordService._keyset_condition(key, NEXT)
+    ).order_by(*ORDER)
+
+
+def test_keyset_or_branches_are_not_equality_columns():
+    shape = extract_shape(_keyset_page())
+    assert shape.equality == ("account_id",)
+    assert shape.ranges == ("record_date",)
+    assert shape.order_by == ("record_date", "created_at", "id")
+    assert shape.soft_delete_filter
+
+
+def test_proposals_skip_covered_shapes():
+    advisor = IndexAdvisor(max_shapes=10)
+    for stmt in (_keyset_page(), _keyset_page(c.record_type == RecordType.INCOME)):
+        advisor.capture(stmt, "", None)
+
+    proposals = advisor.propose(Base.metadata, "sqlite")
+    # 账本内键集分页已由 idx_records_live_account_cursor 覆盖，只建议按类型筛选的索引
+    assert [p.columns for p in proposals] == [("account_id", "record_type", "record_date", "created_at", "id")]
+    assert proposals[0].partial
+    assert IndexAdvisor.render_table_args(proposals[0]).startswith("live_index(")
+
+
+def test_prefix_proposals_merge_into_longer_ones():
+    advisor = IndexAdvisor(max_shapes=10)
+    by_category = select(records_table).where(c.account_id == 1, c.category_id == 2)
+    advisor.capture(by_category, "", None)
+    advisor.capture(by_category.order_by(*ORDER), "", None)
+    segments = RecordArchiveSegment.__table__
+    # (account_id, year) 已由唯一约束覆盖
+    advisor.capture(select(segments).where(segments.c.account_id == 1, segments.c.year == 2020), "", None)
+
+    proposals = advisor.propose(Base.metadata, "sqlite")
+    assert [(p.columns, p.executions) for p in proposals] == [
+        (("account_id", "category_id", "record_date", "created_at", "id"), 2)
+    ]
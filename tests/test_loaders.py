@@ -0,0 +1,47 @@
+# tests/test_loaders.py
+from datetime import datetime
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import InvalidRequestError
+from app.core.config import settings
+from app.models.record import Record
+
+
+@pytest.fixture
+def record_id(add_records, db, account):
+    ids = add_records([datetime(2024, 5, 1)], description="午饭")
+    db.expire_all()
+    return ids[0]
+
+
+def test_lazy_load_is_disabled_in_tests():
+    assert settings.ORM_RAISE_ON_LAZY_LOAD
+
+
+def test_record_list_profile_loads_declared_relationships(db, record_id, payment_account):
+    record = db.scalars(select(Record).where(Record.id == record_id),
+                        execution_options={"loader_profile": "record_list"}).unique().one()
+    assert record.payment_account.name == payment_account.name
+    assert record.creator.nickname == "测试用户"
+
+
+def test_record_list_profile_raises_on_undeclared_lazy_load(db, record_id):
+    record = db.scalars(select(Record).where(Record.id == record_id),
+                        execution_options={"loader_profile": "record_list"}).unique().one()
+    with pytest.raises(InvalidRequestError):
+        record.account
+    # 预加载对象上的关系同样禁止懒加载
+    with pytest.raises(InvalidRequestError):
+        record.payment_account.account
+
+
+def test_query_without_profile_raises_on_lazy_load(db, record_id):
+    record = db.scalars(select(Record).where(Record.id == record_id)).one()
+    with pytest.raises(InvalidRequestError):
+        record.category
+
+
+def test_allow_lazy_load_opts_out(db, record_id, account):
+    record = db.scalars(select(Record).where(Record.id == record_id),
+                        execution_options={"allow_lazy_load": True}).one()
+    assert record.account.id == account.id
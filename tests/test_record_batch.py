@@ -0,0 +1,88 @@
+# tests/test_record_batch.py
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import select
+from app.core.counters import find_drift, find_month_count_drift
+from app.models.category import Category
+from app.models.record import RecordType
+from app.models.record_tag import RecordTag, RecordPerson
+from app.services.record_batch import batch_operations
+from tests.conftest import month_dates
+
+
+def _categories(db, account, *names):
+    categories = [Category(name=name, level=1, account_id=account.id) for name in names]
+    db.add_all(categories)
+    db.commit()
+    return categories
+
+
+def _assert_no_drift(db, account, owner, categories):
+    drift = find_drift(db)
+    assert account.id not in drift["accounts"]
+    assert owner.id not in drift["users"]
+    assert not set(drift["categories"]) & {c.id for c in categories}
+    assert not [key for key in find_month_count_drift(db) if key[0] == account.id]
+
+
+def test_mixed_batch_keeps_counters_and_month_counts(db, account, owner, payment_account, add_records):
+    food, travel = _categories(db, account, "餐饮", "出行")
+    ids = add_records(month_dates(2024, 1, 6), category_id=food.id)
+    ids += add_records(month_dates(2024, 2, 4), record_type=RecordType.INCOME, amount="99.50", category_id=travel.id)
+    _assert_no_drift(db, account, owner, [food, travel])
+
+    result = batch_operations(db, account.id, owner.id, [
+        {"op": "update", "id": ids[0], "data": {"amount": "12.34"}},
+        {"op": "update", "id": ids[1], "data": {"record_date": datetime(2024, 3, 5)}},
+        {"op": "update", "id": ids[2], "data": {"category_id": travel.id, "record_type": RecordType.INCOME}},
+        {"op": "update", "id": ids[3], "data": {"description": "只改描述"}},
+        {"op": "delete", "id": ids[4]},
+        # 同批内先改后删：以删除为准
+        {"op": "update", "id": ids[6], "data": {"amount": "1.00"}},
+        {"op": "delete", "id": ids[6]},
+        {"op": "delete", "id": ids[4]},
+        {"op": "create", "data": {"record_type": "expense", "amount": "5", "record_date": "2024-04-01T08:00:00",
+                                  "payment_account_id": payment_account.id, "category_id": food.id}},
+        {"op": "update", "id": 10 ** 9, "data": {"amount": "1"}},
+    ])
+
+    assert [item["success"] for item in result["results"]] == [True] * 7 + [False, True, False]
+    assert result["results"][7]["error"] == result["results"][9]["error"] == "记录不存在"
+    _assert_no_drift(db, account, owner, [food, travel])
+    db.refresh(account)
+    db.refresh(food)
+    assert account.total_records == 9
+    assert food.record_count == 5
+    assert food.total_amount == Decimal("12.34") + Decimal("10.00") * 3 + Decimal("5")
+
+
+def _index(db, model, record_id):
+    column = model.tag if model is RecordTag else model.person
+    return db.execute(select(column, model.amount, model.record_date)
+                      .where(model.record_id == record_id).order_by(column)).all()
+
+
+def test_tag_index_follows_batch_updates(db, account, owner, add_records):
+    tagged, untagged, tagged_to_delete = add_records(
+        month_dates(2024, 5, 3), tags=["午餐", "公司"], related_people=["小王"]
+    )
+    batch_operations(db, account.id, owner.id, [{"op": "update", "id": untagged, "data": {"tags": None,
+                                                                                         "related_people": None}}])
+    assert _index(db, RecordTag, untagged) == _index(db, RecordPerson, untagged) == []
+
+    # 只改金额和日期：索引行原地更新
+    moved = datetime(2024, 6, 1, 12)
+    batch_operations(db, account.id, owner.id, [
+        {"op": "update", "id": tagged, "data": {"amount": "66.00", "record_date": moved}},
+        {"op": "update", "id": untagged, "data": {"amount": "7.00"}},
+        {"op": "delete", "id": tagged_to_delete},
+    ])
+    assert _index(db, RecordTag, tagged) == [("公司", Decimal("66.00"), moved), ("午餐", Decimal("66.00"), moved)]
+    assert _index(db, RecordPerson, tagged) == [("小王", Decimal("66.00"), moved)]
+    assert _index(db, RecordTag, untagged) == []
+    assert _index(db, RecordTag, tagged_to_delete) == _index(db, RecordPerson, tagged_to_delete) == []
+
+    # 改标签：重建索引行
+    batch_operations(db, account.id, owner.id, [{"op": "update", "id": tagged, "data": {"tags": "晚餐"}}])
+    assert _index(db, RecordTag, tagged) == [("晚餐", Decimal("66.00"), moved)]
+    assert _index(db, RecordPerson, tagged) == [("小王", Decimal("66.00"), moved)]
@@ -0,0 +1,118 @@
+# tests/test_record_bulk.py
+import json
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import OperationalError
+from app.core.config import settings
+from app.core.security import create_user_access_token
+from app.main import app
+from app.models.account import Account
+from app.routes import record as record_routes
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def headers(owner):
+    return {"Authorization": f"Bearer {create_user_access_token(owner)}"}
+
+
+def _post(client, headers, account, body: bytes, content_type="application/x-ndjson"):
+    response = client.post("/records:bulk", params={"account_id": account.id}, content=body,
+                           headers={**headers, "Content-Type": content_type})
+    assert response.status_code == 200, response.text
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def _record(payment_account, amount="12.50", **values):
+    return {"record_type": "expense", "amount": amount, "record_date": "2024-05-01T12:00:00",
+            "payment_account_id": payment_account.id, **values}
+
+
+def _frame(item) -> bytes:
+    data = json.dumps(item).encode("utf-8")
+    return len(data).to_bytes(4, "big") + data
+
+
+def test_ndjson_mixed_operations(client, headers, account, payment_account, add_records):
+    existing = add_records(["2024-04-01T08:00:00"] * 2)
+    lines = [
+        json.dumps(_record(payment_account)),                                   # 直接给记录
+        json.dumps({"op": "update", "id": existing[0], "data": {"amount": "1.00"}}),
+        json.dumps({"op": "delete", "id": existing[1]}),
+        "",                                                                     # 空行忽略
+        "{不是 JSON",
+        json.dumps({"op": "delete"}),                                           # 缺少 ID
+        json.dumps(_record(payment_account, amount="-5")),                      # 校验失败
+    ]
+    results = _post(client, headers, account, "\n".join(lines).encode("utf-8"))
+
+    summary = results.pop()["summary"]
+    assert summary == {"total": 6, "succeeded": 3, "failed": 3, "chunks": 1}
+    assert [(r["line"], r["success"]) for r in results] == [
+        (1, True), (2, True), (3, True), (5, False), (6, False), (7, False)
+    ]
+    assert results[0]["op"] == "create" and results[1]["id"] == existing[0]
+    assert results[3]["error"] == "JSON 格式错误"
+
+
+def test_length_prefixed_body_commits_in_chunks(client, headers, account, payment_account, monkeypatch):
+    monkeypatch.setattr(settings, "RECORD_BULK_CHUNK_SIZE", 2)
+    body = b"".join(_frame(_record(payment_account, amount=str(i + 1))) for i in range(5))
+    results = _post(client, headers, account, body, record_routes.LENGTH_PREFIXED_MEDIA_TYPE)
+
+    assert results.pop()["summary"] == {"total": 5, "succeeded": 5, "failed": 0, "chunks": 3}
+    assert all(r["success"] for r in results)
+
+
+def test_truncated_frame_and_oversize_line_report_error(client, headers, account, payment_account, monkeypatch):
+    frames = _frame(_record(payment_account)) + _frame(_record(payment_account))[:-3]
+    results = _post(client, headers, account, frames, record_routes.LENGTH_PREFIXED_MEDIA_TYPE)
+    summary = results[-1]["summary"]
+    assert summary["error"] == "请求体不完整"
+    assert (summary["succeeded"], summary["chunks"]) == (1, 1)
+
+    monkeypatch.setattr(settings, "RECORD_BULK_MAX_ITEM_BYTES", 64)
+    body = (json.dumps(_record(payment_account, description="x" * 200)) + "\n").encode("utf-8")
+    summary = _post(client, headers, account, body)[-1]["summary"]
+    assert summary["error"] == "单行超过 64 字节"
+    assert summary["total"] == 0
+
+
+def test_database_error_still_returns_summary(client, headers, account, payment_account, monkeypatch):
+    monkeypatch.setattr(settings, "RECORD_BULK_CHUNK_SIZE", 1)
+    calls = []
+    real = record_routes.batch_operations
+
+    def failing_second_chunk(db, *args):
+        calls.append(1)
+        if len(calls) == 2:
+            raise OperationalError("INSERT", {}, Exception("磁盘已满"))
+        return real(db, *args)
+
+    monkeypatch.setattr(record_routes, "batch_operations", failing_second_chunk)
+    body = "\n".join(json.dumps(_record(payment_account)) for _ in range(3)).encode("utf-8")
+    results = _post(client, headers, account, body)
+
+    summary = results[-1]["summary"]
+    assert (summary["succeeded"], summary["chunks"]) == (1, 1)
+    assert summary["error"] == "数据库写入失败，第 2 块及之后的内容未写入"
+    assert len(results) == 2
+
+
+def test_ledger_without_write_access_is_404(client, headers, db, payment_account):
+    from app.models.user import User
+    stranger = User(username="bulk_stranger", password_hash="-", nickname="陌生人")
+    db.add(stranger)
+    db.commit()
+    foreign = Account(name="别人的账本", owner_id=stranger.id)
+    db.add(foreign)
+    db.commit()
+    response = client.post("/records:bulk", params={"account_id": foreign.id},
+                           content=json.dumps(_record(payment_account)).encode("utf-8"), headers=headers)
+    assert response.status_code == 404
+    assert response.json()["detail"] == "账本不存在或无写入权限"
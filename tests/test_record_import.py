@@ -0,0 +1,78 @@
+# tests/test_record_import.py
+import io
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from app.models.record import Record
+from app.services import record_import
+from app.services.record_import import get_mapping, import_statement, iter_statement_chunks, import_rows
+
+BANK_CSV = (
+    "交易日期,交易金额,摘要,对方户名,流水号\n"
+    "2024-03-01,-25.50,午餐,食堂,A001\n"
+    "2024-03-01,-25.50,午餐,食堂,A001\n"
+    "2024-03-02,8000,工资,公司,A002\n"
+).encode("utf-8")
+
+
+def _csv_rows():
+    return [line.split(",") for line in BANK_CSV.decode("utf-8").splitlines()]
+
+
+def _chunks():
+    return list(iter_statement_chunks(io.BytesIO(BANK_CSV), get_mapping("bank")))
+
+
+def _count(db, account):
+    return db.scalar(select(func.count()).select_from(Record).where(Record.account_id == account.id))
+
+
+def test_reimport_skips_existing_rows(db, account, owner, payment_account):
+    first = import_statement(db, account.id, owner.id, payment_account.id, io.BytesIO(BANK_CSV), get_mapping("bank"))
+    assert (first["imported"], first["skipped"]) == (3, 0)
+    again = import_statement(db, account.id, owner.id, payment_account.id, io.BytesIO(BANK_CSV), get_mapping("bank"))
+    assert (again["imported"], again["skipped"]) == (0, 3)
+    assert _count(db, account) == 3
+
+
+def test_concurrent_import_conflict_counts_as_skipped(db, account, owner, payment_account, monkeypatch):
+    # 模拟另一请求在去重查询之后写入了同一账单：第一次查询看不到已导入的行
+    import_rows(db, account.id, owner.id, payment_account.id, _chunks()[0][:2], "bank")
+    lookup = record_import._imported_hashes
+    calls = []
+
+    def stale_first(*args):
+        calls.append(args)
+        return set() if len(calls) == 1 else lookup(*args)
+
+    monkeypatch.setattr(record_import, "_imported_hashes", stale_first)
+
+    result = import_rows(db, account.id, owner.id, payment_account.id, _chunks()[0], "bank")
+    assert (result["imported"], result["skipped"], result["failed"]) == (1, 2, 0)
+    assert len(calls) == 2
+    assert _count(db, account) == 3
+
+
+def test_corrupt_xlsx_is_bad_request():
+    pytest.importorskip("openpyxl")
+    with pytest.raises(HTTPException) as error:
+        list(iter_statement_chunks(io.BytesIO(b"not a workbook"), get_mapping("bank"), "xlsx"))
+    assert error.value.status_code == 400
+
+
+def test_xlsx_statement_imports(db, account, owner, payment_account):
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["银行流水明细"])                          # 表头前的说明行
+    for row in _csv_rows():
+        sheet.append(row)
+    stream = io.BytesIO()
+    workbook.save(stream)
+    stream.seek(0)
+
+    result = import_statement(db, account.id, owner.id, payment_account.id, stream, get_mapping("bank"), "xlsx")
+    assert (result["imported"], result["skipped"], result["failed"]) == (3, 0, 0)
+    # 与同一份 CSV 账单内容相同，重复导入全部跳过
+    again = import_statement(db, account.id, owner.id, payment_account.id, io.BytesIO(BANK_CSV), get_mapping("bank"))
+    assert (again["imported"], again["skipped"]) == (0, 3)
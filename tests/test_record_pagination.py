@@ -0,0 +1,112 @@
+# tests/test_record_pagination.py
+from datetime import datetime
+import pytest
+from sqlalchemy import select
+from app.services import record_archive
+from app.services.record_archive import archive_year, records_table
+from app.services.record_service import RecordService
+from tests.conftest import month_dates
+
+
+@pytest.fixture
+def ledger(db, account, add_records):
+    """2019、2020 年的记录归档，2024 年的留在热表；返回按列表顺序（日期倒序）排列的全部 ID"""
+    add_records(month_dates(2019, 6, 30))
+    add_records(month_dates(2020, 3, 25), description="归档")
+    add_records(month_dates(2024, 1, 40))
+    archive_year(db, account.id, 2019)
+    archive_year(db, account.id, 2020)
+    service = RecordService(db)
+    expected = [row["id"] for row in service.get_records_paginated(account.id, page_size=1000)["records"]]
+    assert len(expected) == 95
+    assert db.scalar(select(records_table.c.id).where(records_table.c.account_id == account.id,
+                                                      records_table.c.record_date < datetime(2021, 1, 1))) is None
+    return expected
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    """记录归档段的解压次数（清空解压缓存）"""
+    calls = []
+    decode = record_archive.decode_segment
+    monkeypatch.setattr(record_archive, "decode_segment", lambda payload: calls.append(1) or decode(payload))
+    record_archive.segment_cache._data.clear()
+    return calls
+
+
+def _walk(service, account_id, page_size, **filters):
+    ids, cursor, pages = [], None, []
+    while True:
+        page = service.get_records_cursor(account_id, cursor, page_size, filters)
+        pages.append(page)
+        ids += [row["id"] for row in page["records"]]
+        cursor = page["pagination"]["next_cursor"]
+        if cursor is None:
+            return ids, pages
+
+
+def test_cursor_pages_cross_hot_archive_boundary(db, account, ledger):
+    service = RecordService(db)
+    ids, pages = _walk(service, account.id, 7)
+    assert ids == ledger
+    assert not pages[-1]["pagination"]["has_next"]
+
+    # 从末页往回翻到第一页
+    back, cursor = [], pages[-1]["pagination"]["prev_cursor"]
+    while cursor:
+        page = service.get_records_cursor(account.id, cursor, 7)
+        back = [row["id"] for row in page["records"]] + back
+        cursor = page["pagination"]["prev_cursor"]
+    assert back + [row["id"] for row in pages[-1]["records"]] == ledger
+
+
+def test_offset_pages_match_cursor_order(db, account, ledger):
+    service = RecordService(db)
+    ids = []
+    for page in range(1, 12):
+        result = service.get_records_paginated(account.id, page, 9)
+        ids += [row["id"] for row in result["records"]]
+        assert result["pagination"]["total"] == 95
+    assert ids == ledger
+
+
+def test_filters_apply_to_archived_records(db, account, ledger):
+    service = RecordService(db)
+    ids, _ = _walk(service, account.id, 4, search="归档")
+    assert len(ids) == 25
+    assert service.count_records(account.id, {"search": "归档"}) == {"total": 25, "exact": True}
+
+
+def test_hot_pages_do_not_decode_archive(db, account, ledger, decodes):
+    service = RecordService(db)
+    first = service.get_records_cursor(account.id, None, 10)
+    second = service.get_records_cursor(account.id, first["pagination"]["next_cursor"], 10)
+    service.get_records_paginated(account.id, 2, 10)
+    assert [row["id"] for row in first["records"] + second["records"]] == ledger[:20]
+    assert decodes == []
+
+
+def test_deep_offset_skips_whole_segments(db, account, ledger, decodes):
+    # 2019 段在 2024 热表和 2020 段之后，起点落在 2019 段时 2020 段整段跳过不解压
+    page = RecordService(db).get_records_paginated(account.id, 8, 10)
+    assert [row["id"] for row in page["records"]] == ledger[70:80]
+    assert len(decodes) == 1
+
+
+def test_exact_count_uses_segment_metadata(db, account, ledger, decodes):
+    service = RecordService(db)
+    date_range = {"date_from": datetime(2019, 6, 3), "date_to": datetime(2024, 12, 31, 23, 59, 59)}
+    # 日期不是整月，走精确计数：完整覆盖的 2020 段用行数，只有部分覆盖的 2019 段解压
+    assert service.count_records(account.id, date_range) == {"total": 91, "exact": True}
+    assert len(decodes) == 1
+    assert service.count_records(account.id, {"date_from": datetime(2019, 1, 1, 12)})["total"] == 95
+
+
+def test_late_records_interleave_with_archive(db, account, ledger, add_records):
+    late = add_records([datetime(2020, 3, 10, 12), datetime(2019, 6, 15, 12)])
+    service = RecordService(db)
+    ids, _ = _walk(service, account.id, 6)
+    offset = [row["id"] for page in range(1, 18) for row in service.get_records_paginated(account.id, page, 6)["records"]]
+    assert ids == offset
+    assert sorted(ids) == sorted(ledger + late)
+    assert service.count_records(account.id)["total"] == 97
@@ -0,0 +1,54 @@
+# tests/test_record_purge.py
+from datetime import datetime, timedelta
+from sqlalchemy import select, update
+from app.models.account import Account
+from app.models.devices import Device
+from app.models.payment_account import PaymentAccount, PaymentAccountType
+from app.models.record import RecordType
+from app.models.user import User
+from app.services.record_archive import records_table
+from app.services.record_batch import batch_operations
+from app.services.record_purge import purgeable_record_ids, purge_deleted_records
+
+
+def _deleted_record(db, suffix: str, deleted_at: datetime, device_synced_at: datetime) -> int:
+    """新建账本和所有者设备，写入一条记录后软删除，删除时间改为 deleted_at"""
+    user = User(username=f"purge_{suffix}_{datetime.utcnow().timestamp()}", password_hash="-")
+    db.add(user)
+    db.flush()
+    account = Account(name=f"账本{suffix}", owner_id=user.id)
+    db.add(account)
+    db.flush()
+    payment_account = PaymentAccount(name="现金", account_type=PaymentAccountType.SAVINGS, account_id=account.id)
+    db.add_all([payment_account, Device(user_id=user.id, device_name="手机", last_sync_at=device_synced_at)])
+    db.commit()
+    record_id = batch_operations(db, account.id, user.id, [{"op": "create", "data": {
+        "record_type": RecordType.EXPENSE, "amount": "1.00", "record_date": datetime(2024, 1, 1),
+        "payment_account_id": payment_account.id,
+    }}])["results"][0]["id"]
+    batch_operations(db, account.id, user.id, [{"op": "delete", "id": record_id}])
+    db.execute(update(records_table).where(records_table.c.id == record_id).values(updated_at=deleted_at))
+    db.commit()
+    return record_id
+
+
+def test_watermark_is_computed_per_account(db):
+    now = datetime.utcnow()
+    deleted_at = now - timedelta(days=60)
+    # A 账本的设备在删除之后同步过；B 账本的设备从删除前就没有再同步
+    synced = _deleted_record(db, "A", deleted_at, device_synced_at=now - timedelta(days=1))
+    stale = _deleted_record(db, "B", deleted_at, device_synced_at=now - timedelta(days=90))
+
+    ids = set(purgeable_record_ids(db, retention_days=30, limit=1000))
+    assert synced in ids
+    assert stale not in ids
+
+
+def test_purge_respects_retention_and_removes_rows(db):
+    now = datetime.utcnow()
+    recent = _deleted_record(db, "C", now - timedelta(days=5), device_synced_at=now)
+    old = _deleted_record(db, "D", now - timedelta(days=60), device_synced_at=now)
+
+    purge_deleted_records(db, retention_days=30)
+    remaining = set(db.scalars(select(records_table.c.id).where(records_table.c.id.in_([recent, old]))))
+    assert remaining == {recent}
@@ -0,0 +1,27 @@
+# tests/test_record_service.py
+from datetime import datetime
+from app.models.category import Category
+from app.models.record import RecordType
+from app.services.record_service import RecordService
+
+
+def test_names_of_soft_deleted_references_are_kept(db, account, payment_account, add_records):
+    category = Category(name="旧分类", level=1, account_id=account.id)
+    db.add(category)
+    db.commit()
+    record_id = add_records([datetime(2024, 3, 1)], category_id=category.id)[0]
+    category.is_deleted = True
+    payment_account.is_deleted = True
+    db.commit()
+
+    service = RecordService(db)
+    record = service.get_records_paginated(account.id)["records"][0]
+    assert record["category_name"] == "旧分类"
+    assert record["payment_account_name"] == "现金"
+
+    detail = service.get_record_detail(account.id, record_id)
+    assert detail["category_name"] == "旧分类"
+    assert detail["payment_account_name"] == "现金"
+
+    stats = service.get_advanced_analytics(account.id)["category_stats"]
+    assert [item["category_name"] for item in stats] == ["旧分类"]
@@ -0,0 +1,71 @@
+# tests/test_record_tags.py
+from decimal import Decimal
+import pytest
+from sqlalchemy import delete
+from app.core.tag_index import backfill_tag_index
+from app.models.record_tag import RecordTag, RecordPerson
+from app.services.record_archive import archive_year
+from app.services.record_service import RecordService
+from tests.conftest import month_dates
+
+
+@pytest.fixture
+def tagged(db, account, add_records):
+    """2020 年的出差记录归档，其余留在热表；返回各组记录 ID"""
+    trip = add_records(month_dates(2020, 3, 2), amount="100.00", tags=["出差", "报销"])
+    meals = add_records(month_dates(2024, 1, 3), amount="20.00", tags=["出差"])
+    gifts = add_records(month_dates(2024, 2, 1), amount="50.00", tags="礼物", related_people=["小王"])
+    plain = add_records(month_dates(2024, 2, 2))
+    assert archive_year(db, account.id, 2020) == 2
+    return trip, meals, gifts, plain
+
+
+def _ids(service, account, **filters):
+    return {row["id"] for row in service.get_records_paginated(account.id, page_size=100, filters=filters)["records"]}
+
+
+def _counts(service, account):
+    return {item["name"]: (item["record_count"], item["total_amount"]) for item in service.tag_counts(account.id)}
+
+
+def test_tag_filters_any_and_all(db, account, tagged):
+    trip, meals, gifts, plain = tagged
+    service = RecordService(db)
+    assert _ids(service, account, tags=["出差", "礼物"]) == set(trip + meals + gifts)
+    assert _ids(service, account, tags=["出差", "礼物"], tag_mode="all") == set()
+    # 只有已归档的记录同时带两个标签
+    assert _ids(service, account, tags=["出差", "报销"], tag_mode="all") == set(trip)
+    assert _ids(service, account, tags="报销") == set(trip)
+
+    cursor_ids = {row["id"] for row in service.get_records_cursor(
+        account.id, page_size=100, filters={"tags": ["出差"]})["records"]}
+    assert cursor_ids == set(trip + meals)
+
+
+def test_tag_counts_and_monthly_sums(db, account, tagged):
+    service = RecordService(db)
+    assert _counts(service, account) == {
+        "出差": (5, Decimal("260.00")), "报销": (2, Decimal("200.00")), "礼物": (1, Decimal("50.00")),
+    }
+    assert [item["name"] for item in service.person_counts(account.id)] == ["小王"]
+
+    assert service.tag_monthly_sums(account.id, tags=["出差"]) == [
+        {"tag": "出差", "month": "2024-01", "record_count": 3, "total_amount": Decimal("60.00")},
+        {"tag": "出差", "month": "2020-03", "record_count": 2, "total_amount": Decimal("200.00")},
+    ]
+
+
+def test_backfill_rebuilds_index_including_archive(db, account, tagged):
+    service = RecordService(db)
+    before = _counts(service, account)
+    db.execute(delete(RecordTag).where(RecordTag.account_id == account.id))
+    db.execute(delete(RecordPerson).where(RecordPerson.account_id == account.id))
+    db.commit()
+    assert _counts(service, account) == {}
+
+    backfill_tag_index(db, batch_size=2)
+    assert _counts(service, account) == before
+    assert [item["name"] for item in service.person_counts(account.id)] == ["小王"]
+    # 重复回填不会产生重复索引行
+    backfill_tag_index(db)
+    assert _counts(service, account) == before
@@ -0,0 +1,108 @@
+# tests/test_routing.py
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, insert, select
+from app.core import routing
+from app.core.routing import RecentWrites, ReplicaSet, RoutingSession
+
+metadata = MetaData()
+# 每个库写入自己的名字，读到哪个名字就说明查询走了哪个库
+source = Table("source", metadata, Column("name", String(20)))
+items = Table("items", metadata, Column("id", Integer, primary_key=True), Column("name", String(20)))
+
+
+def _engine(path, name):
+    engine = create_engine(f"sqlite:///{path}")
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(source).values(name=name))
+    return engine
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    primary = _engine(tmp_path / "primary.db", "primary")
+    replica = _engine(tmp_path / "replica.db", "replica")
+    monkeypatch.setattr(routing, "recent_writes", RecentWrites())
+    session_class = type("TestRoutingSession", (RoutingSession,), {
+        "primary_engine": primary, "replica_set": ReplicaSet([replica]),
+    })
+    yield lambda **info: session_class(info=info)
+    primary.dispose()
+    replica.dispose()
+
+
+def _reads_from(session):
+    return session.scalar(select(source.c.name))
+
+
+def test_reads_go_to_replica_until_session_writes(session_factory):
+    with session_factory() as session:
+        assert _reads_from(session) == "replica"
+        session.execute(insert(items).values(name="新记录"))
+        assert _reads_from(session) == "primary"
+        # 同一会话内读到自己刚写入、尚未提交的行
+        assert session.scalar(select(items.c.name)) == "新记录"
+
+    with session_factory(use_primary=True) as session:
+        assert _reads_from(session) == "primary"
+
+
+def test_user_is_pinned_to_primary_after_commit(session_factory, monkeypatch):
+    with session_factory(user_id=1) as session:
+        session.execute(insert(items).values(name="新记录"))
+        session.commit()
+
+    with session_factory(user_id=1) as session:
+        assert _reads_from(session) == "primary"
+    with session_factory(user_id=2) as session:
+        assert _reads_from(session) == "replica"
+    with session_factory() as session:
+        assert _reads_from(session) == "replica"
+
+    # 水位过期后恢复读副本
+    monkeypatch.setattr(routing.settings, "READ_YOUR_WRITES_SECONDS", 0)
+    routing.recent_writes.mark(1)
+    with session_factory(user_id=1) as session:
+        assert _reads_from(session) == "replica"
+
+
+def test_uncommitted_write_does_not_pin_user(session_factory):
+    with session_factory(user_id=1) as session:
+        session.execute(insert(items).values(name="回滚"))
+        session.rollback()
+    with session_factory(user_id=1) as session:
+        assert _reads_from(session) == "replica"
+
+
+def test_unhealthy_replica_falls_back_to_primary(session_factory):
+    with session_factory() as session:
+        session.replica_set.mark_unhealthy(session.replica_set.engines[0])
+        assert _reads_from(session) == "primary"
+
+
+def test_read_only_session_rejects_writes(session_factory):
+    with session_factory(read_only=True) as session:
+        with pytest.raises(RuntimeError):
+            session.execute(insert(items).values(name="禁止"))
+
+
+def test_recent_writes_stay_within_max_size(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(routing.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(routing.settings, "READ_YOUR_WRITES_SECONDS", 10)
+    writes = RecentWrites(max_size=3)
+    for user_id in range(1, 6):
+        writes.mark(user_id)
+    # 全部仍在水位内：超出容量时淘汰最早写入的用户
+    assert len(writes) == 3
+    assert [writes.is_pinned(user_id) for user_id in range(1, 6)] == [False, False, True, True, True]
+
+    # 再次写入的用户移到末尾，不会被先淘汰
+    writes.mark(3)
+    writes.mark(6)
+    assert [writes.is_pinned(user_id) for user_id in (3, 4, 5, 6)] == [True, False, True, True]
+
+    # 过期的从头部清理
+    clock[0] += 11
+    writes.mark(7)
+    assert len(writes) == 1 and writes.is_pinned(7) and not writes.is_pinned(6)
@@ -0,0 +1,58 @@
+# tests/test_security.py
+from datetime import datetime, timedelta
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+from app.core.security import create_refresh_token, rotate_refresh_token, revoke_refresh_token
+from app.models.refresh_token import RefreshToken
+
+
+def _login(db, user):
+    token = create_refresh_token(db, user.id)
+    db.commit()
+    return token
+
+
+def _assert_rejected(db, token):
+    with pytest.raises(HTTPException) as error:
+        rotate_refresh_token(db, token)
+    assert error.value.status_code == 401
+
+
+def test_rotation_issues_new_token_in_same_family(db, owner):
+    first = _login(db, owner)
+    user, second = rotate_refresh_token(db, first)
+    assert user.id == owner.id and second != first
+    families = set(db.scalars(select(RefreshToken.family_id).where(RefreshToken.user_id == owner.id)))
+    assert len(families) == 1
+    user, third = rotate_refresh_token(db, second)
+    assert third not in (first, second)
+
+
+def test_reuse_of_rotated_token_revokes_whole_family(db, owner):
+    stolen = _login(db, owner)
+    other_session = _login(db, owner)
+    _, current = rotate_refresh_token(db, stolen)
+
+    # 已轮换掉的令牌再次出现：视为泄露，整族吊销，合法持有者的新令牌也失效
+    _assert_rejected(db, stolen)
+    _assert_rejected(db, current)
+    # 同一用户其他登录（其他令牌族）不受影响
+    _, renewed = rotate_refresh_token(db, other_session)
+    assert renewed
+
+
+def test_expired_and_unknown_tokens_are_rejected(db, owner):
+    token = _login(db, owner)
+    db.query(RefreshToken).filter(RefreshToken.user_id == owner.id).update(
+        {RefreshToken.expires_at: datetime.utcnow() - timedelta(minutes=1)}, synchronize_session=False)
+    db.commit()
+    _assert_rejected(db, token)
+    _assert_rejected(db, "not-a-token")
+
+
+def test_logout_revokes_family(db, owner):
+    first = _login(db, owner)
+    _, second = rotate_refresh_token(db, first)
+    revoke_refresh_token(db, second)
+    _assert_rejected(db, second)
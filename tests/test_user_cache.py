@@ -0,0 +1,103 @@
+# tests/test_user_cache.py
+from contextlib import contextmanager
+from dataclasses import replace
+import pytest
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import event
+from app.core.database import UnitOfWork, engine
+from app.core.security import create_user_access_token, get_current_user
+from app.core.user_cache import user_cache
+from app.models.user import UserLevel
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    user_cache.clear()
+    yield
+    user_cache.clear()
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _authenticate(user):
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_user_access_token(user))
+    uow = UnitOfWork(read_only=True)
+    try:
+        return get_current_user(credentials, uow), uow.active
+    finally:
+        uow.release()
+
+
+def test_cached_user_is_resolved_without_sql(owner):
+    with count_queries() as statements:
+        snapshot, _ = _authenticate(owner)
+    assert snapshot.id == owner.id and statements
+
+    with count_queries() as statements:
+        cached, session_opened = _authenticate(owner)
+    assert cached == snapshot
+    assert statements == [] and not session_opened
+
+
+def test_only_tracked_fields_bump_version_and_invalidate(db, owner):
+    snapshot, _ = _authenticate(owner)
+    owner.bio = "简介不影响登录态"
+    db.commit()
+    assert owner.version == snapshot.version
+    assert user_cache.get(owner.username) == snapshot
+
+    owner.nickname = "新昵称"
+    db.flush()
+    assert owner.version == snapshot.version + 1
+    # 提交前不失效：其他请求此时读到的仍是旧数据
+    assert user_cache.get(owner.username) == snapshot
+    db.commit()
+    assert user_cache.get(owner.username) is None
+    assert _authenticate(owner)[0].nickname == "新昵称"
+
+
+def test_rollback_discards_pending_invalidation(db, owner):
+    snapshot, _ = _authenticate(owner)
+    owner.nickname = "不会提交"
+    db.flush()
+    db.rollback()
+    assert user_cache.get(owner.username) == snapshot
+    # 回滚后的下一次提交不会再带上已丢弃的失效
+    owner.bio = "无关字段"
+    db.commit()
+    assert user_cache.get(owner.username) == snapshot
+
+
+def test_stale_snapshot_is_not_written_back(db, owner):
+    stale, _ = _authenticate(owner)
+    owner.user_level = UserLevel.PREMIUM
+    db.commit()
+    # 提交前从副本读到的旧快照晚到，不能写回缓存
+    user_cache.put(owner.username, stale)
+    assert user_cache.get(owner.username) is None
+    fresh = replace(stale, version=owner.version, user_level=owner.user_level)
+    user_cache.put(owner.username, fresh)
+    assert user_cache.get(owner.username) == fresh
+
+
+def test_rename_invalidates_old_username(db, owner):
+    old_name = owner.username
+    snapshot, _ = _authenticate(owner)
+    owner.username = old_name + "_new"
+    db.commit()
+    assert user_cache.get(old_name) is None
+    # 旧令牌仍带旧用户名，旧快照不能再写回
+    user_cache.put(old_name, snapshot)
+    assert user_cache.get(old_name) is None
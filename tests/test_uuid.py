@@ -0,0 +1,40 @@
+# tests/test_uuid.py
+import time
+import uuid
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, insert, select, text
+from app.core import uuid7 as uuid7_module
+from app.core.uuid7 import uuid7, uuid7_timestamp
+from app.models.base import UUIDType
+
+
+def test_binary_uuid_round_trips_through_sqlite_blob():
+    table = Table("items", MetaData(), Column("id", Integer, primary_key=True),
+                  Column("uuid", UUIDType(binary=True), unique=True, nullable=False))
+    engine = create_engine("sqlite://")
+    table.create(engine)
+    values = [str(uuid7()) for _ in range(3)]
+    with engine.begin() as conn:
+        conn.execute(insert(table), [{"uuid": value} for value in values])
+        assert conn.execute(text("SELECT DISTINCT typeof(uuid), length(uuid) FROM items")).all() == [("blob", 16)]
+        assert conn.scalars(select(table.c.uuid).order_by(table.c.id)).all() == values
+        # record_batch 在不支持 RETURNING 的数据库上按 uuid 字符串 IN 查询取回 ID
+        found = conn.execute(select(table.c.uuid, table.c.id).where(table.c.uuid.in_(values[:2]))).all()
+        assert {value for value, _ in found} == set(values[:2])
+        assert conn.scalar(select(table.c.id).where(table.c.uuid == uuid.UUID(values[2]))) == 3
+    engine.dispose()
+
+
+def test_uuid7_strictly_increasing_within_one_millisecond(monkeypatch):
+    now_ns = 1_700_000_000_000 * 1_000_000
+    monkeypatch.setattr(uuid7_module, "_last_ms", 0)
+    monkeypatch.setattr(time, "time_ns", lambda: now_ns)
+    # 计数器 12 位，同一毫秒内最多 4096 个，超出后借用下一毫秒
+    values = [uuid7() for _ in range(5000)]
+    assert all(a < b for a, b in zip(values, values[1:]))
+    assert all(value.version == 7 and value.variant == uuid.RFC_4122 for value in values)
+    assert uuid7_timestamp(values[0]) == now_ns // 1_000_000 / 1000
+    assert uuid7_timestamp(values[-1]) > uuid7_timestamp(values[0])
+
+    # 时钟回拨：沿用上次时间戳继续递增
+    monkeypatch.setattr(time, "time_ns", lambda: now_ns - 5_000_000)
+    assert uuid7() > values[-1]